@@ -1,11 +1,19 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
+import asyncio
+import functools
 import pandas as pd
 import re
-import time
-import ssl
-import socket
-from urllib.parse import urljoin
+
+import address_engine
+import browser_fallback
+import crawl_engine
+import csv_sink
+import dedup_index
+import gnavi_json
+import html_parser
+import page_scan
+import politeness
+import tls_probe
 
 
 HEADERS = {
@@ -14,85 +22,31 @@ HEADERS = {
     'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
 }
 
-def check_ssl(url):
-    """URLのSSL証明書の有無をチェック"""
-    if not url or url == '':
-        return False
-    
-    try:
-        if url.startswith('https://'):
-            hostname = url.split('//')[1].split('/')[0].split(':')[0]
-            context = ssl.create_default_context()
-            with socket.create_connection((hostname, 443), timeout=5) as sock:
-                with context.wrap_socket(sock, server_hostname=hostname) as ssock:
-                    return True
-        return False
-    except Exception:
-        return False
+JOURNAL_PATH = '1-1.journal.sqlite'  # 中断したクロールを --resume で再開するためのジャーナル
 
-def split_address(full_address):
-    """住所を都道府県、市区町村、番地、建物名に分割"""
-    prefecture = ''
-    city = ''
-    street = ''
-    building = ''
-    
-    if not full_address:
-        return prefecture, city, street, building
-    
-    
-    full_address = re.sub(r'\s+', '', full_address)
-    
-    # todouhukenn
-    pref_pattern = r'^(北海道|青森県|岩手県|宮城県|秋田県|山形県|福島県|茨城県|栃木県|群馬県|埼玉県|千葉県|東京都|神奈川県|新潟県|富山県|石川県|福井県|山梨県|長野県|岐阜県|静岡県|愛知県|三重県|滋賀県|京都府|大阪府|兵庫県|奈良県|和歌山県|鳥取県|島根県|岡山県|広島県|山口県|徳島県|香川県|愛媛県|高知県|福岡県|佐賀県|長崎県|熊本県|大分県|宮崎県|鹿児島県|沖縄県)'
-    pref_match = re.match(pref_pattern, full_address)
-    
-    if pref_match:
-        prefecture = pref_match.group(1)
-        remaining = full_address[len(prefecture):]
-    else:
-        remaining = full_address
-    
-    # shikuchousonn
-    city_pattern = r'^(.+?[市区町村]|.+?郡.+?[町村])'
-    city_match = re.match(city_pattern, remaining)
-    
-    if city_match:
-        city = city_match.group(1)
-        remaining = remaining[len(city):]
-    
-    # tatemono
-    building_pattern = r'([ぁ-んァ-ヶー一-龠a-zA-Z]+(?:ビル|タワー|ハイツ|マンション|アパート|ビルディング|プラザ|センター|BLDG|Bldg|GATE)[^0-9]*[0-9]*[階F号]?.*?)$'
-    building_match = re.search(building_pattern, remaining)
-    
-    if building_match:
-        building = building_match.group(1)
-        street = remaining[:building_match.start()]
-    else:
-        street = remaining
-    
-    return prefecture, city, street, building
-
-def extract_email(soup):
-    """ページからメールアドレスを抽出"""
-    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    text = soup.get_text()
-    emails = re.findall(email_pattern, text)
-    return emails[0] if emails else ''
-
-def scrape_restaurant_detail(restaurant_url, session):
-    """個別店舗ページから詳細情報を取得"""
-    time.sleep(3)  
-    
-    print(f"  アクセス中...")
+def parse_restaurant_detail(html):
+    """店舗ページのHTMLから詳細情報を抽出（SSLは呼び出し側でチェック）"""
+    # 埋め込みJSON（__NEXT_DATA__ / JSON-LD）があればDOMを作らずに抽出
+    fields = gnavi_json.extract_store(html)
+    if fields and fields['店舗名'] and fields['住所']:
+        print(f"  店舗名: {fields['店舗名']} (JSON)")
+        print(f"  電話番号: {fields['電話番号']}")
+        print(f"  住所: {fields['住所']}")
+        return gnavi_json.to_record(fields, address_engine.split_address)
     
     try:
-        response = session.get(restaurant_url, headers=HEADERS, timeout=15)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
+        name_selectors = [
+            '.shop-name',
+            '.restaurant-name',
+            '[itemprop="name"]',
+            '[class*="shopname"]',
+            '[class*="storename"]'
+        ]
+        # 見出し・リンク・本文テキストなどを1回の走査でまとめて集める
+        page = page_scan.scan(html, name_selectors)
         
         
-        page_text = soup.get_text()
+        page_text = page.text
         
         # tennpo
         name = ''
@@ -101,9 +55,9 @@ def scrape_restaurant_detail(restaurant_url, session):
         exclude_keywords = ['特集', '忘年会', '歓迎会', '送別会', '新年会', '宴会', 'キャンペーン', '予約', '年会']
 
         # 1
-        h1_tags = soup.find_all('h1')
+        h1_tags = page.headings['h1']
         if h1_tags:
-            temp_name = h1_tags[0].get_text(strip=True)
+            temp_name = h1_tags[0]
             
             # check
             if not any(keyword in temp_name for keyword in exclude_keywords):
@@ -114,9 +68,8 @@ def scrape_restaurant_detail(restaurant_url, session):
 
         # 2
         if not name:
-            h2_tags = soup.find_all('h2')
-            for h2 in h2_tags:
-                temp_name = h2.get_text(strip=True)
+            h2_tags = page.headings['h2']
+            for temp_name in h2_tags:
                 if not any(keyword in temp_name for keyword in exclude_keywords) and len(temp_name) > 2:
                     name = temp_name
                     print(f"  店舗名 (h2): {name}")
@@ -124,17 +77,9 @@ def scrape_restaurant_detail(restaurant_url, session):
 
         # 3
         if not name:
-            name_selectors = [
-                '.shop-name',
-                '.restaurant-name',
-                '[itemprop="name"]',
-                '[class*="shopname"]',
-                '[class*="storename"]'
-            ]
             for selector in name_selectors:
-                elem = soup.select_one(selector)
-                if elem:
-                    temp_name = elem.get_text(strip=True)
+                temp_name = page.selected.get(selector)
+                if temp_name is not None:
                     if not any(keyword in temp_name for keyword in exclude_keywords) and len(temp_name) > 2:
                         name = temp_name
                         print(f"  店舗名 (セレクタ: {selector}): {name}")
@@ -163,7 +108,7 @@ def scrape_restaurant_detail(restaurant_url, session):
             print(f"  住所: {full_address}")
         
         
-        prefecture, city, street, building = split_address(full_address)
+        prefecture, city, street, building = address_engine.split_address(full_address)
         print(f"  → 都道府県: {prefecture}")
         print(f"  → 市区町村: {city}")
         print(f"  → 番地: {street}")
@@ -173,9 +118,9 @@ def scrape_restaurant_detail(restaurant_url, session):
         email = ''
         
         # 1: mailto
-        mailto_links = soup.find_all('a', href=re.compile(r'mailto:'))
+        mailto_links = page.mailtos
         if mailto_links:
-            email = mailto_links[0].get('href').replace('mailto:', '').strip()
+            email = mailto_links[0].replace('mailto:', '').strip()
             print(f"  メール: {email}")
         
         # 2 seikihyougenn
@@ -194,25 +139,19 @@ def scrape_restaurant_detail(restaurant_url, session):
         
         # 3 otoiwase
         if not email:
-            contact_sections = soup.find_all(['div', 'p', 'span'], text=re.compile(r'[Ee]-?mail|メール|お問い合わせ'))
-            for section in contact_sections:
-                parent = section.find_parent()
-                if parent:
-                    parent_text = parent.get_text()
-                    email_matches = re.findall(email_pattern, parent_text)
-                    if email_matches:
-                        email = email_matches[0]
-                        print(f"  メール: {email}")
-                        break
+            for parent_text in page.contact_texts:
+                email_matches = re.findall(email_pattern, parent_text)
+                if email_matches:
+                    email = email_matches[0]
+                    print(f"  メール: {email}")
+                    break
         
         # url
         official_url = ''
         
         url_keywords = ['ホームページ', '公式', 'オフィシャル', 'HP', 'WEB', 'ウェブサイト', 'Website']
         
-        for link in soup.find_all('a', href=True):
-            link_text = link.get_text(strip=True)
-            link_href = link.get('href', '')
+        for link_href, link_text in page.anchors:
             
             
             if any(keyword in link_text for keyword in url_keywords):
@@ -232,9 +171,6 @@ def scrape_restaurant_detail(restaurant_url, session):
                         print(f"  公式URL: {official_url}")
                         break
         
-        # ssl
-        has_ssl = check_ssl(official_url)
-        
         return {
             '店舗名': name,
             '電話番号': tel,
@@ -244,117 +180,103 @@ def scrape_restaurant_detail(restaurant_url, session):
             '番地': street,
             '建物名': building,
             'URL': official_url,
-            'SSL': has_ssl
+            'SSL': False
         }
     
     except Exception as e:
         print(f"  ✗ エラー: {e}")
         return None
 
-def scrape_restaurant_list(base_search_url, max_records=50):
-    """レストラン一覧ページから店舗URLを取得してスクレイピング"""
-    session = requests.Session()
-    restaurants_data = []
-    visited_urls = set()  # choufuku
+def extract_restaurant_links(html):
+    """一覧ページのHTMLから店舗ページへのリンクを抽出"""
+    # ItemList(JSON-LD)があればDOMを作らずに取得
+    restaurant_links = gnavi_json.listing_links(html)
+    if restaurant_links:
+        return restaurant_links
     
-    page = 1
-    max_pages = 10
+    soup = html_parser.make_soup(html)
     
-    while len(restaurants_data) < max_records and page <= max_pages:
-        print(f"\n{'='*60}")
-        print(f"ページ {page} (取得済み: {len(restaurants_data)}/{max_records})")
-        print('='*60)
-        
-        time.sleep(3)  
-        
+    restaurant_links = []
+    for link in soup.find_all('a', href=True):
+        href = link.get('href', '')
         
-        if page == 1:
-            list_url = base_search_url
-        else:
-            if '?' in base_search_url:
-                list_url = f"{base_search_url}&p={page}"
-            else:
-                list_url = f"{base_search_url}?p={page}"
-        
-        print(f"アクセス: {list_url}")
-        
-        try:
-            response = session.get(list_url, headers=HEADERS, timeout=15)
-            response.encoding = 'utf-8'
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            
-            all_links = soup.find_all('a', href=True)
-            restaurant_links = []
-            
-            for link in all_links:
-                href = link.get('href', '')
-                
-                if '/restaurant/' in href or 'r.gnavi.co.jp' in href:
-                    restaurant_links.append(link)
-            
-            print(f"発見: {len(restaurant_links)} 件のリンク")
-            
-            if not restaurant_links:
-                print("リンクが見つかりません")
-                break
-            
-            # scr
-            for idx, link in enumerate(restaurant_links):
-                if len(restaurants_data) >= max_records:
-                    break
-                
-                restaurant_url = link.get('href')
-                
-                
-                if restaurant_url and not restaurant_url.startswith('http'):
-                    restaurant_url = urljoin('https://r.gnavi.co.jp', restaurant_url)
-                
-                # check
-                if not restaurant_url or 'gnavi.co.jp' not in restaurant_url:
-                    continue
-                
-                # chouhuku
-                if restaurant_url in visited_urls:
-                    print(f"  ⊘ スキップ（重複）: {restaurant_url}")
-                    continue
-                
-                visited_urls.add(restaurant_url)
-                
-                print(f"\n[{len(restaurants_data)+1}/{max_records}] {restaurant_url}")
-                
-                restaurant_data = scrape_restaurant_detail(restaurant_url, session)
-                
-                if restaurant_data and restaurant_data['店舗名']:
-                    # check
-                    if not restaurant_data['市区町村'] or not restaurant_data['番地']:
-                        print(f"  ⊘ スキップ（住所情報不足）: 市区町村={restaurant_data['市区町村']}, 番地={restaurant_data['番地']}")
-                        continue
-                    
-                    
-                    duplicate = False
-                    for existing in restaurants_data:
-                        if existing['店舗名'] == restaurant_data['店舗名']:
-                            duplicate = True
-                            print(f"  ⊘ スキップ（店舗名重複）: {restaurant_data['店舗名']}")
-                            break
-                    
-                    if not duplicate:
-                        restaurants_data.append(restaurant_data)
-                        print(f"  ✓ 取得成功！")
-                else:
-                    print(f"  ✗ 取得失敗")
-            
-            page += 1
-            
-        except Exception as e:
-            print(f"✗ エラー: {e}")
-            break
+        if '/restaurant/' in href or 'r.gnavi.co.jp' in href:
+            restaurant_links.append(href)
     
-    return restaurants_data
+    return restaurant_links
+
+def accept_restaurant(restaurant_data, restaurants_data, dedup):
+    """取得結果を採用するかどうか（必須項目と、dedup_index での重複・類似をチェック）"""
+    if not restaurant_data or not restaurant_data['店舗名']:
+        print(f"  ✗ 取得失敗")
+        return False
+    
+    # check
+    if not restaurant_data['市区町村'] or not restaurant_data['番地']:
+        print(f"  ⊘ スキップ（住所情報不足）: 市区町村={restaurant_data['市区町村']}, 番地={restaurant_data['番地']}")
+        return False
+    
+    match = dedup.find(restaurant_data)
+    if match:
+        reason = '重複' if match.kind == 'exact' else f"類似 {match.similarity:.0%}"
+        print(f"  ⊘ スキップ（{reason}）: {restaurant_data['店舗名']} ≒ {match.name}")
+        return False
+    
+    print(f"  ✓ 取得成功！")
+    return True
+
+def scrape_restaurant_list(base_search_url, max_records=50, resume=False, hybrid=False, hybrid_email=False,
+                           on_record=None, dedup_path=':memory:'):
+    """レストラン一覧ページから店舗URLを取得してスクレイピング（asyncioで並行取得）
+
+    hybrid=True なら、URL・住所が取れなかった店舗だけ headless Chrome で開き直して補完する
+    （hybrid_email=True ならメールアドレスがない店舗も。ほぼ全件がブラウザ経由になる）
+    on_record(record): 採用したレコードをその都度受け取る（CSVへの追記用）
+    dedup_path: 重複チェックの索引（ファイルを指定すると、過去の実行で取得した店舗も重複として除く）
+    """
+    required = browser_fallback.WITH_EMAIL if hybrid_email else browser_fallback.REQUIRED_FIELDS
+    # 店舗ページの取得とブラウザ側のリダイレクト確認で、ホストごとのアクセス間隔を共有する
+    scheduler = politeness.PolitenessScheduler()
+    escalate = (browser_fallback.BrowserFallback(parse_restaurant_detail, required=required, scheduler=scheduler)
+                if hybrid else None)
+    dedup = dedup_index.DedupIndex(dedup_path)
+
+    def record(restaurant_data):
+        # 再開時にジャーナルから戻したレコードもここを通るので、索引に入れ直される
+        dedup.add(restaurant_data)
+        if on_record:
+            on_record(restaurant_data)
+
+    try:
+        return asyncio.run(crawl_engine.crawl(
+            base_search_url,
+            parse_listing=extract_restaurant_links,
+            parse_detail=parse_restaurant_detail,
+            accept=functools.partial(accept_restaurant, dedup=dedup),
+            ssl_probe=tls_probe.default_probe(),
+            escalate=escalate,
+            headers=HEADERS,
+            max_records=max_records,
+            journal_path=JOURNAL_PATH,
+            resume=resume,
+            on_record=record,
+            scheduler=scheduler,
+        ))
+    finally:
+        dedup.close()
+        if escalate:
+            escalate.close()
+            print(escalate.summary())
 
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--resume', action='store_true', help='前回中断したところから再開')
+    parser.add_argument('--hybrid', action='store_true', help='取れなかった項目がある店舗だけブラウザで取り直す')
+    parser.add_argument('--hybrid-email', action='store_true', help='--hybrid でメールアドレスがない店舗も取り直す')
+    parser.add_argument('--dedup-index', default=':memory:', help='実行をまたいで重複を除くための索引ファイル')
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("ぐるなび Webスクレイピングツール (課題1-1 改善版)")
     print("=" * 60)
@@ -366,35 +288,22 @@ def main():
     print(f"目標: 50件")
     print("\n開始...")
     
-    # scr
-    restaurants_data = scrape_restaurant_list(search_url, max_records=50)
+    # scr（採用した店舗はその都度CSVに追記する）
+    with csv_sink.CSVSink('1-1.csv') as sink:
+        restaurants_data = scrape_restaurant_list(search_url, max_records=50, resume=args.resume,
+                                                  hybrid=args.hybrid, hybrid_email=args.hybrid_email,
+                                                  on_record=sink.write,
+                                                  dedup_path=args.dedup_index)
     
     # result
     print("\n" + "=" * 60)
     print(f"完了！取得: {len(restaurants_data)} 件")
     print("=" * 60)
     
-    if restaurants_data:
-        
-        df = pd.DataFrame(restaurants_data)
-        
-        # karamu
-        columns_order = ['店舗名', '電話番号', 'メールアドレス', '都道府県', '市区町村', '番地', '建物名', 'URL', 'SSL']
-        df = df[columns_order]
-        
-        # CSV
-        output_file = '1-1.csv'
-        df.to_csv(output_file, index=False, encoding='utf-8-sig')
-        
-        print(f"\n✓ 保存: {output_file}")
+    if sink.rows:
+        print(f"\n{sink.summary()}")
         print("\nサンプル:")
-        print(df.head(3).to_string())
-        
-        # print
-        print(f"\n統計:")
-        print(f"  店舗名あり: {df['店舗名'].notna().sum()} 件")
-        print(f"  電話番号あり: {df['電話番号'].notna().sum()} 件")
-        print(f"  都道府県あり: {df['都道府県'].notna().sum()} 件")
+        print(pd.DataFrame(sink.sample).to_string())
     else:
         print("\n✗ データなし")
 
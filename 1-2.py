@@ -1,15 +1,25 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
-from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import pandas as pd
 import re
 import time
+import functools
 import ssl
 import socket
 
+import address_engine
+import chrome_profile
+import csv_sink
+import dedup_index
+import driver_pool
+import gnavi_json
+import official_site
+import politeness
+import selenium_waits
+import url_frontier
+
 def check_ssl(url):
     """URLのSSL証明書の有無をチェック"""
     if not url or url == '':
@@ -21,97 +31,10 @@ def check_ssl(url):
     else:
         return False
 
-def split_address(full_address):
-    """住所を都道府県、市区町村、番地、建物名に分割"""
-    prefecture = ''
-    city = ''
-    street = ''
-    building = ''
-    
-    if not full_address:
-        return prefecture, city, street, building
-    
-    # space delete
-    full_address = re.sub(r'\s+', '', full_address)
-    
-    # todouhukenn
-    pref_pattern = r'^(北海道|青森県|岩手県|宮城県|秋田県|山形県|福島県|茨城県|栃木県|群馬県|埼玉県|千葉県|東京都|神奈川県|新潟県|富山県|石川県|福井県|山梨県|長野県|岐阜県|静岡県|愛知県|三重県|滋賀県|京都府|大阪府|兵庫県|奈良県|和歌山県|鳥取県|島根県|岡山県|広島県|山口県|徳島県|香川県|愛媛県|高知県|福岡県|佐賀県|長崎県|熊本県|大分県|宮崎県|鹿児島県|沖縄県)'
-    pref_match = re.match(pref_pattern, full_address)
-    
-    if pref_match:
-        prefecture = pref_match.group(1)
-        remaining = full_address[len(prefecture):]
-    else:
-        remaining = full_address
-    
-    # sikuchousonn
-    city_pattern = r'^(.+?[市区町村]|.+?郡.+?[町村])'
-    city_match = re.match(city_pattern, remaining)
-    
-    if city_match:
-        city = city_match.group(1)
-        remaining = remaining[len(city):]
-    
-    # tetemono
-    building = ''
-    if remaining:
-        building_patterns = [
-            r'([ぁ-んァ-ヶー一-龠a-zA-Z0-9\s]+(?:ビル|タワー|ハイツ|マンション|アパート|ビルディング|プラザ|センター|BLDG|Bldg|GATE|ビレッジ|コート|レジデンス|パーク|スクエア|テラス|荘|館|ハウス).*?)$',
-            r'([ぁ-んァ-ヶー一-龠a-zA-Z0-9\s]{2,}[0-9]+[階F号室]+.*?)$',
-            r'([0-9]+[階F号室]+.*?)$'
-        ]
-        
-        for pattern in building_patterns:
-            building_match = re.search(pattern, remaining)
-            if building_match:
-                building = building_match.group(1).strip()
-                street = remaining[:building_match.start()].strip()
-                break
-        
-        if not building:
-            street = remaining.strip()
-    
-    if building:
-        building = re.sub(r'\s+', '', building)
-    
-    return prefecture, city, street, building
-
-def setup_driver():
-    """Seleniumドライバーのセットアップ"""
-    options = webdriver.ChromeOptions()
-    
-    
-    options.add_argument('user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-    
-    
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    
-    
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--start-maximized')
-    
-    
-    
-    
-    try:
-        service = Service()
-        driver = webdriver.Chrome(service=service, options=options)
-    except:
-        driver = webdriver.Chrome(options=options)
-    
-    # webdriver
-    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-        'source': '''
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            })
-        '''
-    })
-    
-    return driver
+def setup_driver(headless=False, data_only=False):
+    """Seleniumドライバーのセットアップ（headless=True ならウィンドウを出さない、data_only=True なら画像・フォント・広告を読み込まない）"""
+    return chrome_profile.create_driver(headless=headless, data_only=data_only, stealth=True,
+                                        user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
 
 def extract_email(driver):
     """ページからメールアドレスを抽出"""
@@ -128,100 +51,61 @@ def extract_email(driver):
         return ''
 
 def get_official_url(driver):
-    """オフィシャルページのURLを取得"""
+    """オフィシャルページのURLを取得（リンクをクリックせず、hrefから求める）"""
     try:
-        link_keywords = [
-            "//a[contains(text(), 'ホームページ')]",
-            "//a[contains(text(), 'オフィシャル')]",
-            "//a[contains(text(), '公式')]",
-            "//a[contains(text(), 'HP')]",
-            "//a[contains(text(), 'WEB')]",
-            "//a[contains(text(), 'ウェブサイト')]",
-            "//a[contains(@href, 'url.asp')]"
-        ]
-        
-        for xpath in link_keywords:
-            try:
-                link_elem = driver.find_element(By.XPATH, xpath)
-                
-                original_window = driver.current_window_handle
-                original_url = driver.current_url
-                
-                # JavaScript
-                driver.execute_script("arguments[0].click();", link_elem)
-                time.sleep(3)
-                
-                # check
-                if len(driver.window_handles) > 1:
-                    for window in driver.window_handles:
-                        if window != original_window:
-                            driver.switch_to.window(window)
-                            official_url = driver.current_url
-                            
-                            # except url
-                            if 'gnavi.co.jp' not in official_url:
-                                driver.close()
-                                driver.switch_to.window(original_window)
-                                return official_url
-                            
-                            driver.close()
-                            driver.switch_to.window(original_window)
-                else:
-                    # 
-                    if driver.current_url != original_url and 'gnavi.co.jp' not in driver.current_url:
-                        official_url = driver.current_url
-                        driver.back()
-                        time.sleep(2)
-                        return official_url
-                    elif driver.current_url != original_url:
-                        driver.back()
-                        time.sleep(2)
-            except:
-                continue
-        
-        return ''
+        return official_site.get_official_url(driver)
     except Exception:
         return ''
 
 def scrape_restaurant_detail(driver, restaurant_url):
     """個別店舗ページから詳細情報を取得"""
-    time.sleep(3)  
+    politeness.wait(restaurant_url)  # ドライバーが複数でもホスト単位で間隔を守る
     
     print(f"  アクセス中...")
     
     try:
         driver.get(restaurant_url)
-        time.sleep(2)
+        selenium_waits.wait_until(driver, 'detail', selenium_waits.page_ready())
         
         page_text = driver.page_source
         
+        # 埋め込みJSON（__NEXT_DATA__ / JSON-LD）があれば店舗名・電話番号・住所はそこから取得
+        fields = gnavi_json.extract_store(page_text) or {}
+        
         # tennpo
-        name = ''
-        h1_tags = driver.find_elements(By.TAG_NAME, 'h1')
-        if h1_tags:
-            name = h1_tags[0].text.strip()
+        name = fields.get('店舗名', '')
+        if not name:
+            h1_tags = driver.find_elements(By.TAG_NAME, 'h1')
+            if h1_tags:
+                name = h1_tags[0].text.strip()
+        if name:
             print(f"  店舗名: {name}")
         
         # tell
-        tel = ''
-        tel_pattern = r'(\d{2,4}[-\s]?\d{2,4}[-\s]?\d{4})'
-        tel_matches = re.findall(tel_pattern, page_text)
-        if tel_matches:
-            tel = tel_matches[0]
-            tel = re.sub(r'\s+', '', tel)
+        tel = fields.get('電話番号', '')
+        if not tel:
+            # scriptの中の数字を拾わないよう、ソースではなく表示テキストから探す
+            tel_pattern = r'(\d{2,4}[-\s]?\d{2,4}[-\s]?\d{4})'
+            tel_matches = re.findall(tel_pattern, driver.find_element(By.TAG_NAME, 'body').text)
+            if tel_matches:
+                tel = tel_matches[0]
+                tel = re.sub(r'\s+', '', tel)
+        if tel:
             print(f"  電話番号: {tel}")
         
         # juusho
-        full_address = ''
-        address_pattern = r'((?:北海道|青森県|岩手県|宮城県|秋田県|山形県|福島県|茨城県|栃木県|群馬県|埼玉県|千葉県|東京都|神奈川県|新潟県|富山県|石川県|福井県|山梨県|長野県|岐阜県|静岡県|愛知県|三重県|滋賀県|京都府|大阪府|兵庫県|奈良県|和歌山県|鳥取県|島根県|岡山県|広島県|山口県|徳島県|香川県|愛媛県|高知県|福岡県|佐賀県|長崎県|熊本県|大分県|宮崎県|鹿児島県|沖縄県).+?[0-9０-９]+(?:[-−ー][0-9０-９]+)*)'
-        address_matches = re.findall(address_pattern, driver.page_source)
-        
-        if address_matches:
-            full_address = max(address_matches, key=len)
-            full_address = re.sub(r'\s+', '', full_address)
+        full_address = fields.get('住所', '')
+        if not full_address:
+            address_pattern = r'((?:北海道|青森県|岩手県|宮城県|秋田県|山形県|福島県|茨城県|栃木県|群馬県|埼玉県|千葉県|東京都|神奈川県|新潟県|富山県|石川県|福井県|山梨県|長野県|岐阜県|静岡県|愛知県|三重県|滋賀県|京都府|大阪府|兵庫県|奈良県|和歌山県|鳥取県|島根県|岡山県|広島県|山口県|徳島県|香川県|愛媛県|高知県|福岡県|佐賀県|長崎県|熊本県|大分県|宮崎県|鹿児島県|沖縄県).+?[0-9０-９]+(?:[-−ー][0-9０-９]+)*)'
+            address_matches = re.findall(address_pattern, page_text)
+            
+            if address_matches:
+                full_address = max(address_matches, key=len)
+                full_address = re.sub(r'\s+', '', full_address)
+        if full_address:
             print(f"  住所: {full_address}")
         
-        prefecture, city, street, building = split_address(full_address)
+        prefecture, city, street, building = address_engine.split_address(full_address)
         print(f"  → 都道府県: {prefecture}")
         print(f"  → 市区町村: {city}")
         print(f"  → 番地: {street}")
@@ -246,7 +130,7 @@ def scrape_restaurant_detail(driver, restaurant_url):
                 print(f"  メール: {email}")
         
         # URL
-        official_url = get_official_url(driver)
+        official_url = fields.get('URL') or get_official_url(driver)
         if official_url:
             print(f"  公式URL: {official_url}")
         
@@ -269,99 +153,93 @@ def scrape_restaurant_detail(driver, restaurant_url):
         print(f"  ✗ エラー: {e}")
         return None
 
-def scrape_restaurant_list(search_urls, max_records=50):
-    """複数の検索URLから店舗URLを取得してスクレイピング"""
-    driver = setup_driver()
+# 要素を1つずつ get_attribute せず、hrefの文字列だけを1回でまとめて受け取る（StaleElementReferenceException も起きない）
+LISTING_LINKS_JS = "return Array.from(document.querySelectorAll('a[href]'), a => a.href);"
+
+def collect_restaurant_urls(driver, search_url):
+    """検索URLを開いて店舗URLのリストを返す"""
+    politeness.wait(search_url)
+    driver.get(search_url)
+    
+    print(f"ページ読み込み中...: {search_url}")
+    selenium_waits.wait_until(driver, 'search', selenium_waits.page_ready((By.CSS_SELECTOR, 'a[href*="r.gnavi.co.jp/"]')))
+    
+    # sukuro-ru（ページが伸びなくなるまで）
+    selenium_waits.scroll_to_end(driver)
+    
+    # tennpolink（店舗ページのリンクだけを https://r.gnavi.co.jp/<店舗ID>/ にそろえる。重複除去は呼び出し側で）
+    return [url for url in map(url_frontier.canonical_store_url, driver.execute_script(LISTING_LINKS_JS)) if url]
+
+def scrape_task(driver, task):
+    """ドライバープールの1件分の作業（検索ページなら店舗URLのリスト、店舗ページならレコードを返す）"""
+    kind, url = task
+    if kind == 'search':
+        return collect_restaurant_urls(driver, url)
+    return scrape_restaurant_detail(driver, url)
+
+def scrape_restaurant_list(search_urls, max_records=50, workers=driver_pool.POOL_SIZE, on_record=None,
+                           dedup_path=':memory:'):
+    """複数の検索URLから店舗URLを取得してスクレイピング（headless Chrome を workers 個並行に使う）
+
+    検索ページと店舗ページを同じ作業キューに入れ、見つかった店舗ページを検索ページより先に処理する
+    on_record(record): 採用したレコードをその都度受け取る（CSVへの追記用）
+    dedup_path: 重複チェックの索引（ファイルを指定すると、過去の実行で取得した店舗も重複として除く）
+    """
     restaurants_data = []
-    visited_urls = set()
+    frontier = url_frontier.URLFrontier()
+    dedup = dedup_index.DedupIndex(dedup_path)
+    start = time.perf_counter()
     
-    try:
+    with frontier, dedup, driver_pool.DriverPool(functools.partial(setup_driver, headless=True, data_only=True), scrape_task, size=workers) as pool:
         for search_url in search_urls:
-            if len(restaurants_data) >= max_records:
-                break
-                
-            print(f"\n{'='*60}")
-            print(f"検索URL: {search_url}")
-            print(f"現在の取得数: {len(restaurants_data)}/{max_records}")
-            print('='*60)
-            
-            driver.get(search_url)
-            
-            print("ページ読み込み中... 10秒待機")
-            time.sleep(10)
+            pool.submit(('search', search_url), priority=1)
+        
+        # scr
+        for (kind, url), result in pool.results():
+            if isinstance(result, Exception):
+                print(f"  ✗ エラー: {url}: {result}")
+                continue
             
-            # sukuro-ru
-            print("スクロール中...")
-            for i in range(3):
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
+            if kind == 'search':
+                restaurant_urls = frontier.add_many(result)
+                print(f"\n{'='*60}")
+                print(f"検索URL: {url}")
+                print(f"発見: {len(restaurant_urls)} 件の新規リンク (現在の取得数: {len(restaurants_data)}/{max_records})")
+                print('='*60)
+                for restaurant_url in restaurant_urls:
+                    pool.submit(('detail', restaurant_url))
+                continue
             
-            # tennpolink
-            all_links = driver.find_elements(By.TAG_NAME, 'a')
-            restaurant_urls = []
+            print(f"\n[{len(restaurants_data)+1}/{max_records}] {url}")
+            restaurant_data = result
             
-            for link in all_links:
-                try:
-                    href = link.get_attribute('href')
-                    
-                    if href and href.startswith('https://r.gnavi.co.jp/') and href.count('/') <= 4:
-                        
-                        if href not in ['https://r.gnavi.co.jp/', 'https://r.gnavi.co.jp/tokyo/']:
-                            if href not in visited_urls:
-                                
-                                clean_url = href.split('?')[0]
-                                if clean_url.endswith('/'):
-                                    restaurant_urls.append(clean_url)
-                                    visited_urls.add(clean_url)
-                except StaleElementReferenceException:
+            if restaurant_data and restaurant_data['店舗名']:
+                # check
+                if not restaurant_data['市区町村'] or not restaurant_data['番地']:
+                    print(f"  ⊘ スキップ（住所情報不足）")
                     continue
-            
-            print(f"発見: {len(restaurant_urls)} 件の新規リンク")
-            
-            if not restaurant_urls:
-                print("新規リンクなし")
-                continue
-            
-            # scr
-            for restaurant_url in restaurant_urls:
-                if len(restaurants_data) >= max_records:
-                    break
                 
-                print(f"\n[{len(restaurants_data)+1}/{max_records}] {restaurant_url}")
-                
-                restaurant_data = scrape_restaurant_detail(driver, restaurant_url)
-                
-                if restaurant_data and restaurant_data['店舗名']:
-                    # check
-                    if not restaurant_data['市区町村'] or not restaurant_data['番地']:
-                        print(f"  ⊘ スキップ（住所情報不足）")
-                        continue
-                    
-                
-                    duplicate = False
-                    for existing in restaurants_data:
-                        if existing['店舗名'] == restaurant_data['店舗名']:
-                            duplicate = True
-                            print(f"  ⊘ スキップ（店舗名重複）")
-                            break
-                    
-                    if not duplicate:
-                        restaurants_data.append(restaurant_data)
-                        print(f"  ✓ 取得成功！")
+            
+                match = dedup.find(restaurant_data)
+                if match:
+                    reason = '重複' if match.kind == 'exact' else f"類似 {match.similarity:.0%}"
+                    print(f"  ⊘ スキップ（{reason}）: {match.name}")
                 else:
-                    print(f"  ✗ 取得失敗")
-                
-                # retun
-                driver.get(search_url)
-                time.sleep(3)
-                
-                # sukuro-ru
-                for i in range(2):
-                    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(1)
+                    dedup.add(restaurant_data)
+                    restaurants_data.append(restaurant_data)
+                    if on_record:
+                        on_record(restaurant_data)
+                    print(f"  ✓ 取得成功！")
+                    if len(restaurants_data) >= max_records:
+                        break
+            else:
+                print(f"  ✗ 取得失敗")
     
-    finally:
-        driver.quit()
+    if restaurants_data:
+        elapsed = time.perf_counter() - start
+        print(f"\n所要時間: {elapsed:.1f} 秒（1件あたり {elapsed / len(restaurants_data):.1f} 秒）")
+    print(frontier.summary())
+    selenium_waits.stats.report()
     
     return restaurants_data
 
@@ -389,30 +267,18 @@ def main():
     print(f"目標: 50件")
     print("\n開始...\n")
     
-    restaurants_data = scrape_restaurant_list(search_urls, max_records=50)
+    # 採用した店舗はその都度CSVに追記する
+    with csv_sink.CSVSink('1-2.csv') as sink:
+        restaurants_data = scrape_restaurant_list(search_urls, max_records=50, on_record=sink.write)
     
     print("\n" + "=" * 60)
     print(f"完了！取得: {len(restaurants_data)} 件")
     print("=" * 60)
     
-    if restaurants_data:
-        df = pd.DataFrame(restaurants_data)
-        
-        columns_order = ['店舗名', '電話番号', 'メールアドレス', '都道府県', '市区町村', '番地', '建物名', 'URL', 'SSL']
-        df = df[columns_order]
-        
-        output_file = '1-2.csv'
-        df.to_csv(output_file, index=False, encoding='utf-8-sig')
-        
-        print(f"\n✓ 保存: {output_file}")
+    if sink.rows:
+        print(f"\n{sink.summary()}")
         print("\nサンプル:")
-        print(df.head(3).to_string())
-        
-        print(f"\n統計:")
-        print(f"  店舗名あり: {df['店舗名'].notna().sum()} 件")
-        print(f"  電話番号あり: {df['電話番号'].notna().sum()} 件")
-        print(f"  URLあり: {(df['URL'] != '').sum()} 件")
-        print(f"  メールあり: {(df['メールアドレス'] != '').sum()} 件")
+        print(pd.DataFrame(sink.sample).to_string())
     else:
         print("\n✗ データなし")
 
@@ -1,13 +1,17 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 import re
-import time
-import ssl
-import socket
-from urllib.parse import urljoin
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import create_engine
+
+import address_engine
+import db_writer
+import ex2_2_queries
+import ex2_2_schema
+import gnavi_json
+import http_cache
+import http_client
+import politeness
+import html_parser
+import tls_probe
+import url_frontier
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
@@ -21,227 +25,54 @@ DB_CONFIG = {
     'database': 'scraping_db',
     'charset': 'utf8mb4'
 }
+DB_POOL_SIZE = 2  # 書き込みスレッドとテーブル作成・確認用
+DB_MAX_OVERFLOW = 2  # 一時的にこれだけ多く接続してよい
+DB_POOL_RECYCLE = 3600  # MySQL の wait_timeout より前に接続を作り直す（秒）
 
 def create_db_connection():
     connection_string = f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}?charset={DB_CONFIG['charset']}"
-    return create_engine(connection_string, echo=False)
-
-def create_table(engine):
-    sql = "CREATE TABLE IF NOT EXISTS ex2_2 (id INT AUTO_INCREMENT PRIMARY KEY, 店舗名 VARCHAR(255), 電話番号 VARCHAR(50), メールアドレス VARCHAR(255), 都道府県 VARCHAR(50), 市区町村 VARCHAR(100), 番地 VARCHAR(255), 建物名 VARCHAR(255), URL VARCHAR(512), SSL BOOLEAN, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;"
-    with engine.connect() as conn:
-        conn.execute(text(sql))
-        conn.commit()
-    print("テーブル作成完了")
-
-def check_ssl(url):
-    if not url:
-        return False
-    try:
-        if url.startswith('https://'):
-            hostname = url.split('//')[1].split('/')[0].split(':')[0]
-            context = ssl.create_default_context()
-            with socket.create_connection((hostname, 443), timeout=5) as sock:
-                with context.wrap_socket(sock, server_hostname=hostname) as ssock:
-                    return True
-    except:
-        pass
-    return False
-
-def split_address(addr):
-    if not addr:
-        return '', '', '', ''
-    addr = re.sub(r'\s+', '', addr)
-    pref_pattern = r'^(北海道|青森県|岩手県|宮城県|秋田県|山形県|福島県|茨城県|栃木県|群馬県|埼玉県|千葉県|東京都|神奈川県|新潟県|富山県|石川県|福井県|山梨県|長野県|岐阜県|静岡県|愛知県|三重県|滋賀県|京都府|大阪府|兵庫県|奈良県|和歌山県|鳥取県|島根県|岡山県|広島県|山口県|徳島県|香川県|愛媛県|高知県|福岡県|佐賀県|長崎県|熊本県|大分県|宮崎県|鹿児島県|沖縄県)'
-    pref_match = re.match(pref_pattern, addr)
-    pref = pref_match.group(1) if pref_match else ''
-    remaining = addr[len(pref):] if pref else addr
-    city_pattern = r'^(.+?[市区町村]|.+?郡.+?[町村])'
-    city_match = re.match(city_pattern, remaining)
-    city = city_match.group(1) if city_match else ''
-    remaining = remaining[len(city):] if city else remaining
-    building_pattern = r'([ぁ-んァ-ヶー一-龠a-zA-Z]+(?:ビル|タワー|ハイツ|マンション)[^0-9]*[0-9]*[階F号]?.*?)$'
-    building_match = re.search(building_pattern, remaining)
-    if building_match:
-        building = building_match.group(1)
-        street = remaining[:building_match.start()]
-    else:
-        building = ''
-        street = remaining
-    return pref, city, street, building
-
-def scrape_detail(url, session):
-    time.sleep(3)
+    # LOAD DATA LOCAL INFILE で一括保存できるように local_infile を有効にして接続する
+    # pool_pre_ping: プールから借りるときに接続が生きているか確かめる（クロール中に切れても作り直す）
+    return create_engine(connection_string, echo=False, connect_args={'local_infile': True},
+                         pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_pre_ping=True,
+                         pool_recycle=DB_POOL_RECYCLE)
+
+def create_table(engine, partition=False):
+    # ex2_2 をバージョンつきのマイグレーションで最新のスキーマ（店舗ID・地域/URL/SSL の索引）にする
+    connection = engine.raw_connection()
     try:
-        response = session.get(url, headers=HEADERS, timeout=15)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
-        page_text = soup.get_text()
-        name = ''
-        h1 = soup.find('h1')
-        if h1:
-            name = h1.get_text(strip=True)
-        tel = ''
-        tel_matches = re.findall(r'(\d{2,4}[-\s]?\d{2,4}[-\s]?\d{4})', page_text)
-        if tel_matches:
-            tel = re.sub(r'\s+', '', tel_matches[0])
-        addr = ''
-        addr_pattern = r'((?:北海道|青森県|岩手県|宮城県|秋田県|山形県|福島県|茨城県|栃木県|群馬県|埼玉県|千葉県|東京都|神奈川県|新潟県|富山県|石川県|福井県|山梨県|長野県|岐阜県|静岡県|愛知県|三重県|滋賀県|京都府|大阪府|兵庫県|奈良県|和歌山県|鳥取県|島根県|岡山県|広島県|山口県|徳島県|香川県|愛媛県|高知県|福岡県|佐賀県|長崎県|熊本県|大分県|宮崎県|鹿児島県|沖縄県).+?[0-9０-９]+(?:[-−ー][0-9０-９]+)*)'
-        addr_matches = re.findall(addr_pattern, page_text)
-        if addr_matches:
-            addr = max(addr_matches, key=len)
-            addr = re.sub(r'\s+', '', addr)
-        pref, city, street, building = split_address(addr)
-        email = ''
-        mailto = soup.find('a', href=re.compile(r'mailto:'))
-        if mailto:
-            email = mailto.get('href').replace('mailto:', '').strip()
-        official_url = ''
-        for link in soup.find_all('a', href=True):
-            if any(kw in link.get_text(strip=True) for kw in ['ホームページ', '公式', 'HP']):
-                href = link.get('href', '')
-                if href.startswith('http') and 'gnavi.co.jp' not in href:
-                    official_url = href
-                    break
-        ssl_check = check_ssl(official_url)
-        return {'店舗名': name, '電話番号': tel, 'メールアドレス': email, '都道府県': pref, '市区町村': city, '番地': street, '建物名': building, 'URL': official_url, 'SSL': ssl_check}
-    except:
-        return None
-
-def scrape_list(base_url, max_records=50):
-    session = requests.Session()
-    data = []
-    visited = set()
-    page = 1
-    while len(data) < max_records and page <= 10:
-        print(f"ページ {page} - 取得済み: {len(data)}/{max_records}")
-        time.sleep(3)
-        list_url = base_url if page == 1 else f"{base_url}?p={page}"
-        try:
-            response = session.get(list_url, headers=HEADERS, timeout=15)
-            response.encoding = 'utf-8'
-            soup = BeautifulSoup(response.text, 'html.parser')
-            links = [l for l in soup.find_all('a', href=True) if '/restaurant/' in l.get('href', '')]
-            for link in links:
-                if len(data) >= max_records:
-                    break
-                url = link.get('href')
-                if not url.startswith('http'):
-                    url = urljoin('https://r.gnavi.co.jp', url)
-                if url in visited:
-                    continue
-                visited.add(url)
-                print(f"[{len(data)+1}] {url[:50]}...")
-                result = scrape_detail(url, session)
-                if result and result['店舗名'] and result['市区町村'] and result['番地']:
-                    data.append(result)
-                    print("  OK")
-            page += 1
-        except Exception as e:
-            print(f"エラー: {e}")
-            break
-    return data
-
-def save_to_mysql(df, engine):
-    df.to_sql(name='ex2_2', con=engine, if_exists='append', index=False, method='multi', chunksize=10)
-    print(f"MySQL保存完了: {len(df)}件")
-
-def main():
-    print("課題2-2 開始")
-    engine = create_db_connection()
-    print("DB接続OK")
-    create_table(engine)
-    url = "https://r.gnavi.co.jp/area/jp/rs/"
-    data = scrape_list(url, max_records=50)
-    print(f"取得完了: {len(data)}件")
-    if data:
-        df = pd.DataFrame(data)
-        df = df[['店舗名', '電話番号', 'メールアドレス', '都道府県', '市区町村', '番地', '建物名', 'URL', 'SSL']]
-        save_to_mysql(df, engine)
-        print("確認SQL:")
-        print("SELECT COUNT(URL) FROM ex2_2;")
-        print("SHOW COLUMNS FROM ex2_2;")
-        print("SELECT * FROM ex2_2 LIMIT 5;")
-
-if __name__ == '__main__':
-    main()
-ENDOFFILEcat > 2-2.py << 'ENDOFFILE'
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import re
-import time
-import ssl
-import socket
-from urllib.parse import urljoin
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import SQLAlchemyError
-
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
-}
-
-DB_CONFIG = {
-    'host': 'mysql-db',
-    'port': 3306,
-    'user': 'scraper',
-    'password': 'scraper_password',
-    'database': 'scraping_db',
-    'charset': 'utf8mb4'
-}
-
-def create_db_connection():
-    connection_string = f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}?charset={DB_CONFIG['charset']}"
-    return create_engine(connection_string, echo=False)
-
-def create_table(engine):
-    sql = "CREATE TABLE IF NOT EXISTS ex2_2 (id INT AUTO_INCREMENT PRIMARY KEY, 店舗名 VARCHAR(255), 電話番号 VARCHAR(50), メールアドレス VARCHAR(255), 都道府県 VARCHAR(50), 市区町村 VARCHAR(100), 番地 VARCHAR(255), 建物名 VARCHAR(255), URL VARCHAR(512), SSL BOOLEAN, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;"
-    with engine.connect() as conn:
-        conn.execute(text(sql))
-        conn.commit()
+        ex2_2_schema.migrate(connection, partition=partition)
+    finally:
+        connection.close()
     print("テーブル作成完了")
 
-def check_ssl(url):
-    if not url:
-        return False
+def show_summary(engine):
+    # 保存結果の確認（どれも索引で引ける検索）
+    connection = engine.raw_connection()
     try:
-        if url.startswith('https://'):
-            hostname = url.split('//')[1].split('/')[0].split(':')[0]
-            context = ssl.create_default_context()
-            with socket.create_connection((hostname, 443), timeout=5) as sock:
-                with context.wrap_socket(sock, server_hostname=hostname) as ssock:
-                    return True
-    except:
-        pass
-    return False
-
-def split_address(addr):
-    if not addr:
-        return '', '', '', ''
-    addr = re.sub(r'\s+', '', addr)
-    pref_pattern = r'^(北海道|青森県|岩手県|宮城県|秋田県|山形県|福島県|茨城県|栃木県|群馬県|埼玉県|千葉県|東京都|神奈川県|新潟県|富山県|石川県|福井県|山梨県|長野県|岐阜県|静岡県|愛知県|三重県|滋賀県|京都府|大阪府|兵庫県|奈良県|和歌山県|鳥取県|島根県|岡山県|広島県|山口県|徳島県|香川県|愛媛県|高知県|福岡県|佐賀県|長崎県|熊本県|大分県|宮崎県|鹿児島県|沖縄県)'
-    pref_match = re.match(pref_pattern, addr)
-    pref = pref_match.group(1) if pref_match else ''
-    remaining = addr[len(pref):] if pref else addr
-    city_pattern = r'^(.+?[市区町村]|.+?郡.+?[町村])'
-    city_match = re.match(city_pattern, remaining)
-    city = city_match.group(1) if city_match else ''
-    remaining = remaining[len(city):] if city else remaining
-    building_pattern = r'([ぁ-んァ-ヶー一-龠a-zA-Z]+(?:ビル|タワー|ハイツ|マンション)[^0-9]*[0-9]*[階F号]?.*?)$'
-    building_match = re.search(building_pattern, remaining)
-    if building_match:
-        building = building_match.group(1)
-        street = remaining[:building_match.start()]
-    else:
-        building = ''
-        street = remaining
-    return pref, city, street, building
+        ssl = ex2_2_queries.ssl_counts(connection)
+        print(f"URLあり: {ex2_2_queries.url_count(connection)}件 / SSL対応: {ssl.get(True, 0)}件 / 非対応: {ssl.get(False, 0)}件")
+        for pref, city, count in ex2_2_queries.area_counts(connection)[:10]:
+            print(f"  {pref}{city}: {count}件")
+        for row in ex2_2_queries.latest(connection, 5):
+            print(f"  {row}")
+        ex2_2_queries.check_plans(connection)
+    finally:
+        connection.close()
 
 def scrape_detail(url, session):
-    time.sleep(3)
+    if not http_cache.is_fresh(session, url):
+        politeness.wait(url)
     try:
-        response = session.get(url, headers=HEADERS, timeout=15)
+        response = session.get(url, timeout=15)
+        politeness.observe(url, response)
         response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
+        fields = gnavi_json.extract_store(response.content)
+        if fields and fields['店舗名'] and fields['住所']:
+            record = gnavi_json.to_record(fields, address_engine.split_address)
+            tls_probe.default_probe().submit(record['URL'])
+            return record
+        soup = html_parser.make_soup(response.text)
         page_text = soup.get_text()
         name = ''
         h1 = soup.find('h1')
@@ -257,7 +88,7 @@ def scrape_detail(url, session):
         if addr_matches:
             addr = max(addr_matches, key=len)
             addr = re.sub(r'\s+', '', addr)
-        pref, city, street, building = split_address(addr)
+        pref, city, street, building = address_engine.split_address(addr)
         email = ''
         mailto = soup.find('a', href=re.compile(r'mailto:'))
         if mailto:
@@ -269,48 +100,48 @@ def scrape_detail(url, session):
                 if href.startswith('http') and 'gnavi.co.jp' not in href:
                     official_url = href
                     break
-        ssl_check = check_ssl(official_url)
-        return {'店舗名': name, '電話番号': tel, 'メールアドレス': email, '都道府県': pref, '市区町村': city, '番地': street, '建物名': building, 'URL': official_url, 'SSL': ssl_check}
+        # SSLチェックはここでは開始だけして、結果は scrape_list の最後にまとめて受け取る
+        tls_probe.default_probe().submit(official_url)
+        return {'店舗名': name, '電話番号': tel, 'メールアドレス': email, '都道府県': pref, '市区町村': city, '番地': street, '建物名': building, 'URL': official_url, 'SSL': False}
     except:
         return None
 
-def scrape_list(base_url, max_records=50):
-    session = requests.Session()
+def scrape_list(base_url, max_records=50, writer=None):
+    session = http_client.create_session(HEADERS, cache_path=http_cache.CACHE_PATH)
     data = []
-    visited = set()
+    frontier = url_frontier.URLFrontier()
     page = 1
     while len(data) < max_records and page <= 10:
         print(f"ページ {page} - 取得済み: {len(data)}/{max_records}")
-        time.sleep(3)
         list_url = base_url if page == 1 else f"{base_url}?p={page}"
+        if not http_cache.is_fresh(session, list_url):
+            politeness.wait(list_url)
         try:
-            response = session.get(list_url, headers=HEADERS, timeout=15)
+            response = session.get(list_url, timeout=15)
+            politeness.observe(list_url, response)
             response.encoding = 'utf-8'
-            soup = BeautifulSoup(response.text, 'html.parser')
-            links = [l for l in soup.find_all('a', href=True) if '/restaurant/' in l.get('href', '')]
-            for link in links:
+            links = gnavi_json.listing_links(response.content)
+            if not links:
+                soup = html_parser.make_soup(response.text)
+                links = [l.get('href') for l in soup.find_all('a', href=True) if '/restaurant/' in l.get('href', '')]
+            # https://r.gnavi.co.jp/<店舗ID>/ にそろえ、初めて見た店舗だけ
+            for url in frontier.add_many(links):
                 if len(data) >= max_records:
                     break
-                url = link.get('href')
-                if not url.startswith('http'):
-                    url = urljoin('https://r.gnavi.co.jp', url)
-                if url in visited:
-                    continue
-                visited.add(url)
                 print(f"[{len(data)+1}] {url[:50]}...")
                 result = scrape_detail(url, session)
                 if result and result['店舗名'] and result['市区町村'] and result['番地']:
+                    result['store_id'] = url_frontier.store_id(url)
                     data.append(result)
+                    if writer is not None:
+                        writer.put(result)
                     print("  OK")
             page += 1
         except Exception as e:
             print(f"エラー: {e}")
             break
-    return data
-
-def save_to_mysql(df, engine):
-    df.to_sql(name='ex2_2', con=engine, if_exists='append', index=False, method='multi', chunksize=10)
-    print(f"MySQL保存完了: {len(df)}件")
+    frontier.close()
+    return tls_probe.default_probe().fill_ssl(data)
 
 def main():
     print("課題2-2 開始")
@@ -318,16 +149,13 @@ def main():
     print("DB接続OK")
     create_table(engine)
     url = "https://r.gnavi.co.jp/area/jp/rs/"
-    data = scrape_list(url, max_records=50)
+    # 取得した店舗はクロール中に書き込みスレッドが少しずつ保存する（SSL 列は書く直前に埋める）
+    with db_writer.DBWriter(engine, 'ex2_2', prepare=tls_probe.default_probe().fill_ssl) as writer:
+        data = scrape_list(url, max_records=50, writer=writer)
     print(f"取得完了: {len(data)}件")
+    print(writer.summary())
     if data:
-        df = pd.DataFrame(data)
-        df = df[['店舗名', '電話番号', 'メールアドレス', '都道府県', '市区町村', '番地', '建物名', 'URL', 'SSL']]
-        save_to_mysql(df, engine)
-        print("確認SQL:")
-        print("SELECT COUNT(URL) FROM ex2_2;")
-        print("SHOW COLUMNS FROM ex2_2;")
-        print("SELECT * FROM ex2_2 LIMIT 5;")
+        show_summary(engine)
 
 if __name__ == '__main__':
     main()
@@ -1,18 +1,23 @@
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import re
-import time
+
+import html_parser
+import http_client
+import politeness
 
 # ぐるなび 店舗一覧ページ（全国）
 list_url = "https://r.gnavi.co.jp/area/jp/rs/?p={}"
 
+session = http_client.create_session({"User-Agent": "Mozilla/5.0"})
+
 shop_links = []
 
 # 50店舗集める
 for page in range(1, 20):
-    res = requests.get(list_url.format(page), headers={"User-Agent": "Mozilla/5.0"})
-    soup = BeautifulSoup(res.text, "html.parser")
+    politeness.wait(list_url.format(page))
+    res = session.get(list_url.format(page), timeout=15)
+    politeness.observe(list_url.format(page), res)
+    soup = html_parser.make_soup(res.text)
 
     # HTMLを保存して確認
     with open(f"page_{page}.html", "w", encoding="utf-8") as f:
@@ -32,8 +37,6 @@ for page in range(1, 20):
     if len(shop_links) >= 50:
         break  # ページループも終了
 
-    time.sleep(1)  # 次ページ取得まで1秒待機
-
 print(f"取得した店舗リンク数: {len(shop_links)}")
 
 records = []  # 店舗情報を格納するリスト
@@ -42,8 +45,10 @@ records = []  # 店舗情報を格納するリスト
 addr_pattern = re.compile(r"(東京都|北海道|(?:大阪|京都|兵庫)府|.{2,3}県)(.+?市|.+?区|.+?町|.+?村)(.*)")
 
 for link in shop_links:
-    res = requests.get(link, headers={"User-Agent": "Mozilla/5.0"})
-    soup = BeautifulSoup(res.text, "html.parser")
+    politeness.wait(link)
+    res = session.get(link, timeout=15)
+    politeness.observe(link, res)
+    soup = html_parser.make_soup(res.text)
 
     # 店名
     name_tag = soup.select_one("h2 strong, h1")
@@ -81,7 +86,6 @@ for link in shop_links:
     ssl = ""
 
     records.append([name, tel, email, prefecture, city, address_num, building, homepage, ssl])
-    time.sleep(1)
 
 # DataFrame作成
 df = pd.DataFrame(records, columns=[
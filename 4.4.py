@@ -1,9 +1,10 @@
 # 1-1.py
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import re
-import time
+
+import html_parser
+import http_client
+import politeness
 
 # ユーザーエージェント設定
 HEADERS = {
@@ -16,6 +17,8 @@ BASE_URL = "https://r.gnavi.co.jp/area/jp/tokyo/rs/?page={}"
 # 取得件数
 TARGET_COUNT = 50
 
+session = http_client.create_session(HEADERS)
+
 # 結果格納リスト
 data_list = []
 
@@ -23,9 +26,10 @@ data_list = []
 page = 1
 while len(data_list) < TARGET_COUNT:
     url = BASE_URL.format(page)
-    response = requests.get(url, headers=HEADERS)
-    time.sleep(3)  # サーバーに負荷をかけないために待機
-    soup = BeautifulSoup(response.text, "html.parser")
+    politeness.wait(url)  # サーバーに負荷をかけないために待機（前回のリクエスト開始から数える）
+    response = session.get(url, timeout=15)
+    politeness.observe(url, response)
+    soup = html_parser.make_soup(response.text)
     
     # 店舗リスト取得（ぐるなびの店舗リストクラスは変更されることがあります）
     shops = soup.select("div.rstlst-cassette__item")  # 例として
@@ -8,13 +8,17 @@ sampleフォーマットのCSVを作成するスクリプト
       デフォルトでは URL 列は空欄になるようにしています（後述）。
 """
 
-import time
 import re
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
-from urllib.parse import urljoin, urlparse
-from requests.exceptions import SSLError, RequestException
+from urllib.parse import urljoin
+from requests.exceptions import RequestException
+
+import address_engine
+import gnavi_json
+import html_parser
+import http_client
+import politeness
+import tls_probe
 # === スクレイピングを始める検索結果ページURL ===
 START_SEARCH_URL = "https://r.gnavi.co.jp/area/tokyo/izakaya/rs/"
 
@@ -32,79 +36,13 @@ USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
 HEADERS = {"User-Agent": USER_AGENT}
 MAX_RECORDS = 50
 OUTPUT_CSV = "1-1.csv"
-IDLE_SECONDS = 3  # 要求されているアイドリングタイム
+IDLE_SECONDS = 3  # 要求されているアイドリングタイム（リクエストの開始から数える）
 # requests 版では URL を空にしてよい（課題注記） -> True にすると空欄にする
 FORCE_EMPTY_URL_FOR_REQUESTS = True
 # ---------------------------
 
-# 都道府県パターン（正規表現用）
-PREFS = [
-    "北海道","青森県","岩手県","宮城県","秋田県","山形県","福島県","茨城県","栃木県","群馬県",
-    "埼玉県","千葉県","東京都","神奈川県","新潟県","富山県","石川県","福井県","山梨県","長野県",
-    "岐阜県","静岡県","愛知県","三重県","滋賀県","京都府","大阪府","兵庫県","奈良県","和歌山県",
-    "鳥取県","島根県","岡山県","広島県","山口県","徳島県","香川県","愛媛県","高知県","福岡県",
-    "佐賀県","長崎県","熊本県","大分県","宮崎県","鹿児島県","沖縄県"
-]
-PREF_PATTERN = "(" + "|".join(PREFS) + ")"
-
-def idle():
-    time.sleep(IDLE_SECONDS)
-
-def check_ssl(url):
-    """与えられたURLのSSL（https）検査。httpsならTrue, httpならFalse。例外時はFalseを返す。"""
-    if not url:
-        return False
-    parsed = urlparse(url)
-    scheme = parsed.scheme.lower()
-    if scheme != "https":
-        return False
-    try:
-        # サーバーに負荷かけないようにHEADをまず試す
-        resp = requests.head(url, headers=HEADERS, timeout=10, allow_redirects=True)
-        # ここまで到達すれば SSL（https）での接続に成功したと判断
-        return True
-    except SSLError:
-        return False
-    except RequestException:
-        # 接続不可等は False
-        return False
-
-def split_address(address):
-    """
-    住所文字列を都道府県・市区町村・番地（建物名は別で取れなければ空）に分割する簡易実装。
-    ロジック:
-      1) 都道府県を正規表現で抽出
-      2) 都道府県以降を残し、最初の数字(番地の開始)で区切って市区町村と番地を分離
-    完璧ではないが課題要件を満たす程度の分割を行う。
-    """
-    if not address:
-        return "", "", "", ""
-    address = address.strip()
-    m = re.match(rf"^{PREF_PATTERN}", address)
-    if not m:
-        # 都道府県が見つからない場合は全体を市区町村扱い
-        return "", address, "", ""
-    pref = m.group(0)
-    rest = address[len(pref):].strip()
-    # 番地は数字（全角/半角）で始まることが多いので最初の数字位置で分割
-    num_match = re.search(r"[0-90-９-９]", rest)
-    if num_match:
-        idx = num_match.start()
-        city = rest[:idx].strip()
-        banchi_and_more = rest[idx:].strip()
-    else:
-        # 数字が無ければ city に全部入れる
-        city = rest
-        banchi_and_more = ""
-    # 建物名は番地の後にスペースやカンマで区切られることがある -> 簡易に banchi と building を分割
-    building = ""
-    banchi = banchi_and_more
-    # 例えば「1-2-3 ビル名」などがある場合、最初の空白以降を建物名とする
-    if banchi_and_more:
-        parts = re.split(r"\s+", banchi_and_more, maxsplit=1)
-        if len(parts) == 2:
-            banchi, building = parts[0].strip(), parts[1].strip()
-    return pref, city, banchi, building
+# 都道府県（住所かどうかの判定用）
+PREFS = address_engine.PREFECTURES
 
 def extract_store_links_from_search(soup):
     """
@@ -125,7 +63,11 @@ def parse_store_page(html, base_url):
     店舗ページのHTMLから欲しい情報を抜き出す。
     抽出対象: 店舗名, 電話番号, メールアドレス（見つかれば）, 住所 テキスト, お店のホームページ（requests版は課題注記により取得不可の場合あり）
     """
-    soup = BeautifulSoup(html, "html.parser")
+    # 埋め込みJSON（__NEXT_DATA__ / JSON-LD）があればDOMを作らずに抽出
+    fields = gnavi_json.extract_store(html)
+    if fields and fields["店舗名"] and fields["住所"]:
+        return gnavi_json.to_record(fields, address_engine.split_address)
+    soup = html_parser.make_soup(html)
     # 店舗名
     name_tag = soup.find(lambda tag: tag.name in ["h1","h2"] and ("店舗" in (tag.get("class") or []) or tag.text.strip()))
     # 汎用的にtitleやh1を参照
@@ -204,7 +146,7 @@ def parse_store_page(html, base_url):
         if anchor:
             official_url = anchor['href'].strip()
     # 住所を分割
-    pref, city, banchi, building = split_address(address)
+    pref, city, banchi, building = address_engine.split_address(address)
     # 戻り値
     return {
         "店舗名": name,
@@ -215,24 +157,25 @@ def parse_store_page(html, base_url):
         "番地": banchi,
         "建物名": building,
         "URL": official_url,
-        "SSL": check_ssl(official_url) if official_url else False
+        "SSL": False  # SSLチェックは crawl_requests でまとめて行う
     }
 
 def crawl_requests(start_url, max_records=50):
     results = []
     visited_store_urls = set()
     next_page_url = start_url
-    session = requests.Session()
-    session.headers.update(HEADERS)
+    session = http_client.create_session(HEADERS)
+    scheduler = politeness.PolitenessScheduler(session, interval=IDLE_SECONDS)
 
     while next_page_url and len(results) < max_records:
-        idle()
+        scheduler.wait(next_page_url)
         try:
             resp = session.get(next_page_url, timeout=15)
+            scheduler.observe(next_page_url, resp)
         except RequestException as e:
             print("ページ取得失敗:", next_page_url, e)
             break
-        soup = BeautifulSoup(resp.text, "html.parser")
+        soup = html_parser.make_soup(resp.text)
         store_links = extract_store_links_from_search(soup)
         # store_links の順に巡回
         for store_link in store_links:
@@ -241,9 +184,10 @@ def crawl_requests(start_url, max_records=50):
             if store_link in visited_store_urls:
                 continue
             visited_store_urls.add(store_link)
-            idle()
+            scheduler.wait(store_link)
             try:
                 sresp = session.get(store_link, timeout=15)
+                scheduler.observe(store_link, sresp)
             except RequestException as e:
                 print("店舗ページ取得失敗:", store_link, e)
                 continue
@@ -251,7 +195,8 @@ def crawl_requests(start_url, max_records=50):
             # URLはrequests版では空でもOK（課題ノート）。デフォルトでは空欄にしている。
             if FORCE_EMPTY_URL_FOR_REQUESTS:
                 parsed["URL"] = ""
-                parsed["SSL"] = False
+            # SSLチェックは開始だけして、結果は最後にまとめて受け取る（URLが空なら確認しない）
+            tls_probe.default_probe().submit(parsed["URL"])
             results.append(parsed)
             print(f"取得: {parsed['店舗名'][:40]} / {len(results)}/{max_records}")
         # 次ページ探し（"次へ" や ">" ボタン）
@@ -272,7 +217,7 @@ def crawl_requests(start_url, max_records=50):
             # 見つからなければ終了
             next_page_url = None
 
-    return results
+    return tls_probe.default_probe().fill_ssl(results)
 
 def main():
     print("スクレイピング開始（requests版）")
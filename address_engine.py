@@ -0,0 +1,199 @@
+import re
+from functools import lru_cache
+
+
+PREFECTURES = (
+    '北海道', '青森県', '岩手県', '宮城県', '秋田県', '山形県', '福島県',
+    '茨城県', '栃木県', '群馬県', '埼玉県', '千葉県', '東京都', '神奈川県',
+    '新潟県', '富山県', '石川県', '福井県', '山梨県', '長野県', '岐阜県',
+    '静岡県', '愛知県', '三重県', '滋賀県', '京都府', '大阪府', '兵庫県',
+    '奈良県', '和歌山県', '鳥取県', '島根県', '岡山県', '広島県', '山口県',
+    '徳島県', '香川県', '愛媛県', '高知県', '福岡県', '佐賀県', '長崎県',
+    '熊本県', '大分県', '宮崎県', '鹿児島県', '沖縄県',
+)
+
+# 政令指定都市と行政区（市区町村は「名古屋市中区」のように区まで含める）
+DESIGNATED_CITIES = {
+    ('北海道', '札幌市'): ('中央区', '北区', '東区', '白石区', '豊平区', '南区', '西区', '厚別区', '手稲区', '清田区'),
+    ('宮城県', '仙台市'): ('青葉区', '宮城野区', '若林区', '太白区', '泉区'),
+    ('埼玉県', 'さいたま市'): ('西区', '北区', '大宮区', '見沼区', '中央区', '桜区', '浦和区', '南区', '緑区', '岩槻区'),
+    ('千葉県', '千葉市'): ('中央区', '花見川区', '稲毛区', '若葉区', '緑区', '美浜区'),
+    ('神奈川県', '横浜市'): ('鶴見区', '神奈川区', '西区', '中区', '南区', '保土ケ谷区', '磯子区', '金沢区', '港北区',
+                          '戸塚区', '港南区', '旭区', '緑区', '瀬谷区', '栄区', '泉区', '青葉区', '都筑区'),
+    ('神奈川県', '川崎市'): ('川崎区', '幸区', '中原区', '高津区', '多摩区', '宮前区', '麻生区'),
+    ('神奈川県', '相模原市'): ('緑区', '中央区', '南区'),
+    ('新潟県', '新潟市'): ('北区', '東区', '中央区', '江南区', '秋葉区', '南区', '西区', '西蒲区'),
+    ('静岡県', '静岡市'): ('葵区', '駿河区', '清水区'),
+    ('静岡県', '浜松市'): ('中央区', '浜名区', '天竜区'),
+    ('愛知県', '名古屋市'): ('千種区', '東区', '北区', '西区', '中村区', '中区', '昭和区', '瑞穂区', '熱田区', '中川区',
+                         '港区', '南区', '守山区', '緑区', '名東区', '天白区'),
+    ('京都府', '京都市'): ('北区', '上京区', '左京区', '中京区', '東山区', '下京区', '南区', '右京区', '伏見区', '山科区', '西京区'),
+    ('大阪府', '大阪市'): ('都島区', '福島区', '此花区', '西区', '港区', '大正区', '天王寺区', '浪速区', '西淀川区', '東淀川区',
+                        '東成区', '生野区', '旭区', '城東区', '阿倍野区', '住吉区', '東住吉区', '西成区', '淀川区',
+                        '鶴見区', '住之江区', '平野区', '北区', '中央区'),
+    ('大阪府', '堺市'): ('堺区', '中区', '東区', '西区', '南区', '北区', '美原区'),
+    ('兵庫県', '神戸市'): ('東灘区', '灘区', '兵庫区', '長田区', '須磨区', '垂水区', '北区', '中央区', '西区'),
+    ('岡山県', '岡山市'): ('北区', '中区', '東区', '南区'),
+    ('広島県', '広島市'): ('中区', '東区', '南区', '西区', '安佐南区', '安佐北区', '安芸区', '佐伯区'),
+    ('福岡県', '北九州市'): ('門司区', '若松区', '戸畑区', '小倉北区', '小倉南区', '八幡東区', '八幡西区'),
+    ('福岡県', '福岡市'): ('東区', '博多区', '中央区', '南区', '西区', '城南区', '早良区'),
+    ('熊本県', '熊本市'): ('中央区', '東区', '西区', '南区', '北区'),
+}
+
+TOKYO_WARDS = (
+    '千代田区', '中央区', '港区', '新宿区', '文京区', '台東区', '墨田区', '江東区', '品川区', '目黒区', '大田区', '世田谷区',
+    '渋谷区', '中野区', '杉並区', '豊島区', '北区', '荒川区', '板橋区', '練馬区', '足立区', '葛飾区', '江戸川区',
+)
+
+# 名前の途中に「市区町村」を含むため、正規表現の最短一致では切り間違える市町村
+AMBIGUOUS_MUNICIPALITIES = {
+    '千葉県': ('市川市', '市原市'),
+    '三重県': ('四日市市',),
+    '広島県': ('廿日市市',),
+    '東京都': ('町田市', '東村山市', '武蔵村山市', '羽村市'),
+    '長野県': ('大町市',),
+    '石川県': ('野々市市',),
+    '新潟県': ('十日町市', '村上市'),
+    '山形県': ('村山市',),
+    '長崎県': ('大村市',),
+    '福島県': ('田村市',),
+    '奈良県': ('大和郡山市',),
+    '群馬県': ('佐波郡玉村町',),
+    '宮城県': ('柴田郡村田町',),
+}
+
+# 辞書にない市区町村の一般的なパターン（郡の中の町村を先に見る）
+_LOCALITY_REGEX = r'[^市区]+?郡.+?[町村]|.+?[市区町村]'
+_LOCALITY_PATTERN = re.compile('^(' + _LOCALITY_REGEX + ')')
+# 市区町村名として見る先頭の文字数（これより長い市区町村はない）
+_LOCALITY_HEAD = 20
+# 市区町村名には数字が入らないので、最初の数字までをキャッシュのキーにする
+_DIGIT = re.compile(r'[0-9０-９]')
+
+BUILDING_KEYWORDS = ('ビル', 'タワー', 'ハイツ', 'マンション', 'アパート', 'ビルディング', 'プラザ', 'センター', 'BLDG', 'Bldg',
+                     'GATE', 'ビレッジ', 'コート', 'レジデンス', 'パーク', 'スクエア', 'テラス', 'ハウス')
+_BUILDING_KEYWORD_REGEX = '|'.join(BUILDING_KEYWORDS)
+_BUILDING_REGEX = r'[ぁ-んァ-ヶー一-龠a-zA-Z]+(?:' + _BUILDING_KEYWORD_REGEX + r')[^0-9]*[0-9]*[階F号]?.*?'
+_BUILDING_PATTERN = re.compile('(' + _BUILDING_REGEX + ')$')
+# 建物名の正規表現は重いので、キーワードがある住所だけに使う
+_BUILDING_KEYWORD_PATTERN = re.compile(_BUILDING_KEYWORD_REGEX)
+_WHITESPACE = re.compile(r'\s+')
+
+
+class _Trie:
+    """1文字ずつたどる辞書木（最長一致用）"""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, word, value):
+        node = self.root
+        for char in word:
+            node = node.setdefault(char, {})
+        node.setdefault(None, set()).add(value)
+
+    def longest_match(self, text, value=None):
+        """textの先頭から一致する最長の語の長さを返す（valueを指定したらその値を持つ語だけ）"""
+        node = self.root
+        best = 0
+        for i, char in enumerate(text):
+            node = node.get(char)
+            if node is None:
+                break
+            values = node.get(None)
+            if values and (value is None or value in values):
+                best = i + 1
+        return best
+
+
+def _build_gazetteer():
+    prefectures = _Trie()
+    for prefecture in PREFECTURES:
+        prefectures.add(prefecture, prefecture)
+
+    localities = _Trie()
+    for (prefecture, city), wards in DESIGNATED_CITIES.items():
+        localities.add(city, prefecture)
+        for ward in wards:
+            localities.add(city + ward, prefecture)
+    for ward in TOKYO_WARDS:
+        localities.add(ward, '東京都')
+    for prefecture, names in AMBIGUOUS_MUNICIPALITIES.items():
+        for name in names:
+            localities.add(name, prefecture)
+    return prefectures, localities
+
+
+_PREFECTURE_TRIE, _LOCALITY_TRIE = _build_gazetteer()
+
+
+@lru_cache(maxsize=4096)
+def match_locality(prefecture, head):
+    """住所の都道府県より後ろの先頭部分から市区町村を取り出す（同じ市区町村の住所が続くのでキャッシュ）"""
+    length = _LOCALITY_TRIE.longest_match(head, prefecture or None)
+    if length:
+        return head[:length]
+    match = _LOCALITY_PATTERN.match(head)
+    return match.group(1) if match else ''
+
+
+def split_address(full_address):
+    """住所を都道府県、市区町村、番地、建物名に分割
+
+    都道府県と市区町村は辞書の最長一致（政令指定都市は区まで）、辞書にない市区町村は正規表現で取り出す
+    """
+    prefecture = ''
+    city = ''
+    street = ''
+    building = ''
+
+    if not full_address:
+        return prefecture, city, street, building
+
+    full_address = _WHITESPACE.sub('', full_address)
+
+    # 都道府県
+    length = _PREFECTURE_TRIE.longest_match(full_address)
+    prefecture = full_address[:length]
+    remaining = full_address[length:]
+
+    # 市区町村
+    digit = _DIGIT.search(remaining, 0, _LOCALITY_HEAD)
+    head = remaining[:digit.start()] if digit else remaining[:_LOCALITY_HEAD]
+    city = match_locality(prefecture, head)
+    remaining = remaining[len(city):]
+
+    # 建物名
+    building_match = _BUILDING_KEYWORD_PATTERN.search(remaining) and _BUILDING_PATTERN.search(remaining)
+    if building_match:
+        building = building_match.group(1)
+        street = remaining[:building_match.start()]
+    else:
+        street = remaining
+
+    return prefecture, city, street, building
+
+
+# 一括処理（pandas）用
+ADDRESS_COLUMNS = ['都道府県', '市区町村', '番地', '建物名']
+
+
+def split_addresses(addresses):
+    """住所の列をまとめて 都道府県/市区町村/番地/建物名 の DataFrame にする（split_address の一括版）
+
+    addresses: 住所の Series、または 都道府県/市区町村/番地/建物名 の列を持つ DataFrame（つなげて分割し直す）
+    同じ住所は factorize でまとめて1回だけ分割し、結果を take で全行に展開する
+    """
+    import pandas as pd
+
+    if isinstance(addresses, pd.DataFrame):
+        # 列ごとの文字列連結（行ごとの Python ループにしない）
+        columns = [addresses[column].fillna('').astype(str) for column in ADDRESS_COLUMNS]
+        addresses = columns[0].str.cat(columns[1:])
+    codes, uniques = pd.factorize(addresses.fillna('').astype(str), sort=False)
+    parts = pd.DataFrame([split_address(address) for address in uniques], columns=ADDRESS_COLUMNS, dtype=object)
+    if parts.empty:
+        parts = pd.DataFrame(columns=ADDRESS_COLUMNS, dtype=object)
+    result = parts.take(codes)
+    result.index = addresses.index
+    return result
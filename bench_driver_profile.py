@@ -0,0 +1,108 @@
+import argparse
+import os
+import time
+
+import chrome_profile
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+
+# ページが読み込んだリソースの転送バイト数（キャッシュから読んだものは0）
+_TRANSFER_JS = """
+return performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'))
+    .reduce((total, e) => total + (e.transferSize || 0), 0);
+"""
+
+
+def make_driver(data_only):
+    """計測用の headless Chrome（data_only=True なら chrome_profile を使う）"""
+    return chrome_profile.create_driver(headless=True, data_only=data_only)
+
+def _children(pid):
+    """pid の子孫プロセス（psutil がなければ Linux の /proc から探す）"""
+    if HAS_PSUTIL:
+        return [child.pid for child in psutil.Process(pid).children(recursive=True)]
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # "pid (名前) 状態 ppid ..." 名前に空白や括弧が入ることがあるので最後の ')' から数える
+                    parents[int(entry)] = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+    found = []
+    stack = [pid]
+    while stack:
+        parent = stack.pop()
+        for child, ppid in parents.items():
+            if ppid == parent:
+                found.append(child)
+                stack.append(child)
+    return found
+
+
+def _rss(pid):
+    if HAS_PSUTIL:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return 0
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def browser_rss(driver):
+    """chromedriver と Chrome（レンダラー等の子プロセスを含む）の RSS 合計（バイト、計れなければ None）"""
+    pid = driver.service.process.pid
+    if not HAS_PSUTIL and not os.path.isdir('/proc'):
+        return None
+    return sum(_rss(p) for p in [pid] + _children(pid))
+
+
+def measure(urls, repeat, data_only):
+    """各URLを repeat 回読み込み、1回あたりの読み込み時間・転送量と最後の RSS を返す"""
+    driver = make_driver(data_only)
+    try:
+        seconds = 0.0
+        transferred = 0
+        for _ in range(repeat):
+            for url in urls:
+                start = time.perf_counter()
+                driver.get(url)
+                seconds += time.perf_counter() - start
+                transferred += driver.execute_script(_TRANSFER_JS)
+        loads = repeat * len(urls)
+        return seconds / loads, transferred / loads, browser_rss(driver)
+    finally:
+        driver.quit()
+
+
+def main():
+    """通常の Chrome と data-only プロファイルで、ページの読み込み時間と RSS を比べる"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('urls', nargs='*', default=['https://r.gnavi.co.jp/area/jp/rs/'])
+    parser.add_argument('-n', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"URL: {len(args.urls)} 件, {args.repeat} 回")
+    print(f"{'プロファイル':<12}{'読み込み(ms)':>14}{'転送(KB)':>12}{'RSS(MB)':>10}")
+
+    for name, data_only in (('full', False), ('data-only', True)):
+        load, transferred, rss = measure(args.urls, args.repeat, data_only)
+        rss_text = f"{rss / 1024 / 1024:.0f}" if rss is not None else '-'
+        print(f"{name:<12}{load * 1000:>14.0f}{transferred / 1024:>12.0f}{rss_text:>10}")
+
+
+if __name__ == '__main__':
+    main()
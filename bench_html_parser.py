@@ -0,0 +1,52 @@
+import argparse
+import re
+import time
+
+import html_parser
+import page_scan
+
+
+def parse_page(markup, backend):
+    """抽出処理でよく使う操作をひととおり実行"""
+    soup = html_parser.make_soup(markup, backend)
+    soup.get_text()
+    soup.find_all('h1')
+    soup.find_all('a', href=True)
+    soup.find_all('a', href=re.compile(r'mailto:'))
+    soup.select_one('[class*="shopname"]')
+
+
+def main():
+    """page_source.html で各バックエンドの1ページあたりのパース時間を計測"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('html_file', nargs='?', default='page_source.html')
+    parser.add_argument('-n', '--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with open(args.html_file, 'rb') as f:
+        markup = f.read()
+
+    print(f"ファイル: {args.html_file} ({len(markup) / 1024:.0f} KB), {args.repeat} 回")
+    print(f"{'バックエンド':<14}{'パース(ms)':>12}{'抽出込み(ms)':>14}{'1回走査(ms)':>14}")
+
+    for backend in html_parser.available_backends():
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            html_parser.make_soup(markup, backend)
+        parse_ms = (time.perf_counter() - start) / args.repeat * 1000
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            parse_page(markup, backend)
+        total_ms = (time.perf_counter() - start) / args.repeat * 1000
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            page_scan.scan(markup, ['[class*="shopname"]'], backend)
+        scan_ms = (time.perf_counter() - start) / args.repeat * 1000
+
+        print(f"{backend:<14}{parse_ms:>12.1f}{total_ms:>14.1f}{scan_ms:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
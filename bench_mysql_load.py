@@ -0,0 +1,111 @@
+import argparse
+import random
+import time
+
+import pymysql
+
+import csv_sink
+import mysql_loader
+
+
+BENCH_TABLE = 'ex2_2_bench'
+# 2-2.py の ex2_2 と同じ列
+CREATE_TABLE_SQL = (
+    "CREATE TABLE `{table}` (id INT AUTO_INCREMENT PRIMARY KEY, 店舗名 VARCHAR(255), 電話番号 VARCHAR(50),"
+    " メールアドレス VARCHAR(255), 都道府県 VARCHAR(50), 市区町村 VARCHAR(100), 番地 VARCHAR(255), 建物名 VARCHAR(255),"
+    " URL VARCHAR(512), `SSL` BOOLEAN, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+)
+
+_PREFECTURES = ('東京都', '大阪府', '神奈川県', '愛知県', '福岡県', '北海道')
+_CITIES = ('新宿区', '大阪市北区', '横浜市中区', '名古屋市中区', '福岡市博多区', '札幌市中央区')
+
+
+def generate(count, seed=0):
+    """ぐるなびのレコードに似たダミーの行を count 件作る（タプル、csv_sink.COLUMNS の順）"""
+    rng = random.Random(seed)
+    for i in range(count):
+        area = rng.randrange(len(_PREFECTURES))
+        yield (
+            f"個室居酒屋 テスト{i} {_CITIES[area]}店",
+            f"03-{rng.randrange(10000):04d}-{rng.randrange(10000):04d}",
+            f"info{i}@example.com" if i % 3 == 0 else '',
+            _PREFECTURES[area],
+            _CITIES[area],
+            f"{rng.randrange(1, 10)}-{rng.randrange(1, 30)}-{rng.randrange(1, 20)}",
+            f"テストビル{rng.randrange(1, 10)}F" if i % 2 else '',
+            f"https://example{i}.com/" if i % 4 else '',
+            i % 4 != 0,
+        )
+
+
+def to_sql_baseline(args, count):
+    """これまでの save_to_mysql と同じ to_sql(method='multi', chunksize=10)（比較用）"""
+    import pandas as pd
+    from sqlalchemy import create_engine
+
+    engine = create_engine(
+        f"mysql+pymysql://{args.user}:{args.password}@{args.host}:{args.port}/{args.database}?charset=utf8mb4")
+    df = pd.DataFrame(generate(count), columns=csv_sink.COLUMNS)
+    start = time.perf_counter()
+    df.to_sql(name=BENCH_TABLE, con=engine, if_exists='append', index=False, method='multi', chunksize=10)
+    seconds = time.perf_counter() - start
+    engine.dispose()
+    return {'rows': count, 'seconds': seconds, 'method': 'to_sql'}
+
+
+def main():
+    """ダミーの行を MySQL/MariaDB に入れ、方法ごとの件数/秒を比べる（ベンチ用のテーブルは毎回作り直す）
+
+    LOAD DATA を試すにはサーバー側で local_infile を ON にしておく（SET GLOBAL local_infile = 1）
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3306)
+    parser.add_argument('--user', default='scraper')
+    parser.add_argument('--password', default='scraper_password')
+    parser.add_argument('--database', default='scraping_db')
+    parser.add_argument('-n', '--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=mysql_loader.BATCH_SIZE)
+    parser.add_argument('--methods', nargs='+', default=['infile', 'executemany'],
+                        choices=['infile', 'executemany', 'to_sql'])
+    parser.add_argument('--baseline-rows', type=int, default=10_000, help='to_sql は遅いのでこの件数で計る')
+    args = parser.parse_args()
+
+    connection = pymysql.connect(host=args.host, port=args.port, user=args.user, password=args.password,
+                                 database=args.database, charset='utf8mb4', local_infile=True)
+    results = []
+    try:
+        for method in args.methods:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS `{BENCH_TABLE}`")
+                cursor.execute(CREATE_TABLE_SQL.format(table=BENCH_TABLE))
+
+            if method == 'infile' and not mysql_loader.can_load_infile(connection):
+                print("infile: サーバーの local_infile が OFF のためスキップ")
+                continue
+            print(f"\n{method}: {args.rows if method != 'to_sql' else args.baseline_rows:,} 件")
+            if method == 'to_sql':
+                result = to_sql_baseline(args, args.baseline_rows)
+            else:
+                result = mysql_loader.bulk_load(connection, generate(args.rows), BENCH_TABLE,
+                                                method=method, batch_size=args.batch_size)
+
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM `{BENCH_TABLE}`")
+                stored = cursor.fetchone()[0]
+            if stored != result['rows']:
+                print(f"⚠ テーブルの件数が合いません: {stored:,} 件")
+            results.append(result)
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS `{BENCH_TABLE}`")
+        connection.close()
+
+    print(f"\n{'方法':<14}{'件数':>12}{'秒':>10}{'件/秒':>12}")
+    for result in results:
+        rate = result['rows'] / result['seconds'] if result['seconds'] else 0
+        print(f"{result['method']:<14}{result['rows']:>12,}{result['seconds']:>10.1f}{rate:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import queue
+import threading
+import time
+
+import chrome_profile
+import official_site
+
+
+# これが空のレコードだけブラウザで取り直す
+# （メールアドレスはぐるなびの店舗ページにないことが多く、必須にするとほぼ全件を取り直すので
+# WITH_EMAIL を渡したときだけ）
+REQUIRED_FIELDS = ('URL', '市区町村', '番地')
+WITH_EMAIL = REQUIRED_FIELDS + ('メールアドレス',)
+LOG_EVERY = 20  # この件数を判定するごとに取り直しの割合を表示する
+ADDRESS_FIELDS = ('都道府県', '市区町村', '番地', '建物名')
+BROWSER_POOL_SIZE = 2  # 同時に使う headless Chrome の数
+RECYCLE_AFTER = 30  # この件数を開いたドライバーは作り直す
+
+
+def make_driver():
+    """取り直し用の headless Chrome（data-only プロファイル）"""
+    return chrome_profile.create_driver(headless=True, data_only=True, stealth=True)
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class BrowserFallback:
+    """requests で取れなかった項目があるレコードだけ、ブラウザで開き直して埋める（crawl の escalate に渡す）
+
+    parse_detail(html) -> レコード: requests のときと同じ関数で、ブラウザが描画したHTMLをパースする
+    公式URLはリンクのhrefから official_site で求める。空だった項目だけを埋め、既にある値は変えない。
+    scheduler: リダイレクト確認のアクセス間隔（crawl と同じ politeness.PolitenessScheduler を渡す）
+    """
+
+    def __init__(self, parse_detail, required=REQUIRED_FIELDS, size=BROWSER_POOL_SIZE,
+                 recycle_after=RECYCLE_AFTER, setup_driver=make_driver, scheduler=None):
+        self.parse_detail = parse_detail
+        self.required = required
+        self.recycle_after = recycle_after
+        self.setup_driver = setup_driver
+        self.resolver = official_site.OfficialURLResolver(scheduler=scheduler)
+        # [ドライバー, 開いた件数] の組を貸し出す（ドライバーは最初に使うときに作る）
+        self._slots = queue.LifoQueue()
+        for _ in range(size):
+            self._slots.put([None, 0])
+        self._lock = threading.Lock()
+        self.stats = {'checked': 0, 'needed': 0, 'escalated': 0, 'improved': 0, 'failed': 0, 'seconds': 0.0}
+        self.filled = {}
+
+    def needed(self, record):
+        """ブラウザで取り直す必要があればTrue（必須項目のどれかが空）"""
+        needed = not record or any(not record.get(field) for field in self.required)
+        with self._lock:
+            self.stats['checked'] += 1
+            self.stats['needed'] += needed
+            checked, count = self.stats['checked'], self.stats['needed']
+        if checked % LOG_EVERY == 0:
+            print(f"  ↻ ブラウザでの取り直し: {checked} 件中 {count} 件 ({count / checked:.0%})")
+        return needed
+
+    def fetch(self, url, record):
+        """url をブラウザで開き、record の空の項目を埋めたレコードを返す（ブロッキング）"""
+        start = time.perf_counter()
+        slot = self._slots.get()
+        try:
+            if slot[0] is None or slot[1] >= self.recycle_after:
+                if slot[0] is not None:
+                    _quit(slot[0])
+                slot[:] = [self.setup_driver(), 0]
+            slot[1] += 1
+            rendered = self._render(slot[0], url)
+        except Exception as e:
+            print(f"  ✗ ブラウザでの取得に失敗: {e}")
+            if slot[0] is not None:
+                _quit(slot[0])
+            slot[:] = [None, 0]
+            rendered = None
+        finally:
+            self._slots.put(slot)
+
+        merged, filled = merge(record, rendered)
+        with self._lock:
+            self.stats['escalated'] += 1
+            self.stats['seconds'] += time.perf_counter() - start
+            if rendered is None:
+                self.stats['failed'] += 1
+            if filled:
+                self.stats['improved'] += 1
+                for field in filled:
+                    self.filled[field] = self.filled.get(field, 0) + 1
+        if filled:
+            print(f"  ↻ ブラウザで補完: {', '.join(filled)}")
+        return merged
+
+    def _render(self, driver, url):
+        import selenium_waits
+
+        driver.get(url)
+        selenium_waits.wait_until(driver, 'fallback', selenium_waits.page_ready())
+        rendered = self.parse_detail(driver.page_source) or {}
+        if not rendered.get('URL'):
+            rendered['URL'] = self.resolver.resolve(driver.execute_script(official_site.ANCHORS_JS))
+        return rendered
+
+    def ratio(self):
+        """取り直した割合（0〜1）"""
+        return self.stats['escalated'] / self.stats['checked'] if self.stats['checked'] else 0.0
+
+    def summary(self):
+        stats = self.stats
+        text = (f"ブラウザ: {stats['checked']} 件中 {stats['escalated']} 件を取り直し ({self.ratio():.1%})"
+                f" / 補完 {stats['improved']} 件 / 失敗 {stats['failed']} 件")
+        if stats['escalated']:
+            text += f" / 平均 {stats['seconds'] / stats['escalated']:.1f} 秒"
+        if self.filled:
+            text += ' / ' + ', '.join(f"{field} {count}" for field, count in self.filled.items())
+        return text
+
+    def close(self):
+        self.resolver.close()
+        while not self._slots.empty():
+            driver, _ = self._slots.get()
+            if driver is not None:
+                _quit(driver)
+
+
+def merge(record, rendered):
+    """record の空の項目を rendered の値で埋めたレコードと、埋めた項目名のリストを返す
+
+    住所の4項目は、record の市区町村か番地が空で rendered に両方あるときにまとめて入れ替える
+    """
+    if not rendered:
+        return record, []
+    if not record:
+        return rendered, [field for field, value in rendered.items() if value]
+
+    merged = dict(record)
+    filled = []
+    if (not record.get('市区町村') or not record.get('番地')) and rendered.get('市区町村') and rendered.get('番地'):
+        for field in ADDRESS_FIELDS:
+            merged[field] = rendered.get(field, '')
+        filled.append('住所')
+    for field, value in rendered.items():
+        if field in ADDRESS_FIELDS or field == 'SSL':
+            continue
+        if value and not record.get(field):
+            merged[field] = value
+            filled.append(field)
+    return merged, filled
@@ -0,0 +1,94 @@
+# Selenium で文字とリンクだけを取るための「data-only」プロファイル
+# （画像・フォント・動画・広告/解析スクリプトを読み込まない）
+
+# ChromeOptions の prefs（画像とプッシュ通知を無効に）
+DATA_ONLY_PREFS = {
+    'profile.managed_default_content_settings.images': 2,
+    'profile.default_content_setting_values.notifications': 2,
+}
+
+# Network.setBlockedURLs のパターン（* は任意の文字列）
+# ぐるなびのページが読み込むもの（page_source.html の preconnect/dns-prefetch を参照）
+BLOCKED_URL_PATTERNS = [
+    # 画像
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+    '*://rimage.gnst.jp/*',
+    # フォント（yakuhanjp.min.css はフォントを読み込むだけのCSS）
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*/yakuhanjp.min.css',
+    # 動画・音声
+    '*.mp4', '*.webm', '*.m3u8', '*.mp3',
+    # 広告・解析
+    '*doubleclick.net/*', '*googlesyndication.com/*', '*googletagmanager.com/*', '*google-analytics.com/*',
+    '*://site.gnavi.co.jp/analysis/*', '*://s.yjtag.jp/*', '*://b99.yahoo.co.jp/*', '*://s.yimg.jp/*',
+    '*microad.jp/*', '*impact-ad.jp/*', '*://connect.facebook.net/*', '*://bat.bing.com/*',
+    '*clarity.ms/*', '*optable.co/*', '*id5-sync.com/*',
+]
+
+
+def apply_options(options):
+    """ドライバーを起動する前に ChromeOptions へ data-only の設定を入れる"""
+    options.add_experimental_option('prefs', DATA_ONLY_PREFS)
+    options.add_argument('--blink-settings=imagesEnabled=false')
+    options.add_argument('--mute-audio')
+
+
+def install(driver):
+    """起動したドライバーで、画像・フォント・広告などへのリクエストを送らないようにする（CDP）
+
+    設定はタブごとなので、公式サイトのリンクで開いた新しいウィンドウには効かない
+    """
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+
+
+# navigator.webdriver を隠す（自動化検出の回避。新しいドキュメントごとに実行）
+_HIDE_WEBDRIVER_JS = '''
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    })
+'''
+
+
+def create_driver(headless=True, data_only=True, user_agent=None, stealth=False, driver_path=None):
+    """Chrome を起動する（各スクリプトの setup_driver / make_driver の共通部分）
+
+    headless: ウィンドウを出さない（False なら最大化したウィンドウ）
+    data_only: 画像・フォント・広告を読み込まない（apply_options と install）
+    stealth: 自動化検出を回避する設定（AutomationControlled の無効化と navigator.webdriver の隠蔽）
+    driver_path: ChromeDriver のパス（起動できなければ PATH 上のものを使う）
+    """
+    # selenium は Chrome を使うときだけ必要
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    options = webdriver.ChromeOptions()
+    if user_agent:
+        options.add_argument(f'user-agent={user_agent}')
+    if stealth:
+        options.add_argument('--disable-blink-features=AutomationControlled')
+        options.add_experimental_option('excludeSwitches', ['enable-automation'])
+        options.add_experimental_option('useAutomationExtension', False)
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    if headless:
+        options.add_argument('--headless=new')
+        options.add_argument('--window-size=1920,1080')
+    else:
+        options.add_argument('--start-maximized')
+    if data_only:
+        apply_options(options)
+
+    driver = None
+    if driver_path:
+        try:
+            driver = webdriver.Chrome(service=Service(driver_path), options=options)
+        except Exception:
+            driver = None
+    if driver is None:
+        driver = webdriver.Chrome(options=options)
+
+    if stealth:
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': _HIDE_WEBDRIVER_JS})
+    if data_only:
+        install(driver)
+    return driver
@@ -0,0 +1,199 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import crawl_journal
+import http_cache
+import http_client
+import politeness
+import url_frontier
+
+
+MAX_CONCURRENCY = 8  # 同時に実行する取得・SSLチェックの上限
+
+
+def page_url(base_search_url, page):
+    """一覧ページのURLを組み立て"""
+    if page == 1:
+        return base_search_url
+    if '?' in base_search_url:
+        return f"{base_search_url}&p={page}"
+    return f"{base_search_url}?p={page}"
+
+
+async def fetch(session, url, scheduler, semaphore):
+    """アクセス間隔を守ってページを取得し、生のバイト列を返す（requestsはスレッドで実行）"""
+    # キャッシュから返せるページはサーバーにアクセスしないので待機不要
+    if not http_cache.is_fresh(session, url):
+        await scheduler.wait_async(url)
+    async with semaphore:
+        response = await asyncio.to_thread(session.get, url, timeout=15)
+    scheduler.observe(url, response)
+    return response.content
+
+
+def run_parser(parse, content):
+    """パース用プロセスで実行: バイト列をデコードしてparseに渡す"""
+    return parse(content.decode('utf-8', errors='replace'))
+
+
+async def crawl(base_search_url, parse_listing, parse_detail, accept, ssl_probe=None,
+                escalate=None, headers=None, max_records=50, max_pages=10,
+                concurrency=MAX_CONCURRENCY, interval=politeness.HOST_INTERVAL,
+                cache_path=http_cache.CACHE_PATH, journal_path=None, resume=False,
+                parse_workers=None, on_record=None, scheduler=None):
+    """一覧ページから店舗ページを並行取得し、受理したレコードのリストを返す
+
+    parse_listing(html) -> 店舗リンク(href)のリスト
+    parse_detail(html) -> レコード(dict) または None
+    accept(record, restaurants_data) -> 受理するならTrue
+    interval: 同一ホストへのアクセス間隔の下限（robots.txt の Crawl-delay が長ければそちらに従う）
+    headers: 各スクリプトの HEADERS（http_client.DEFAULT_HEADERS に上書き）
+    ssl_probe: tls_probe.TLSProbe（公式URLのSSLチェック。パース後すぐに開始し、受理の直前に結果を受け取る）
+    escalate: browser_fallback.BrowserFallback など。escalate.needed(record) が真のレコードは
+              escalate.fetch(url, record) で取り直す（スレッドで実行。アクセス間隔は通常の取得と共通）
+    cache_path: ディスクキャッシュのパス（Noneでキャッシュしない）
+    journal_path: 進行状況を記録するジャーナルのパス（resume=Trueなら続きから再開）
+    parse_workers: パース用プロセス数（Noneなら CPU コア数）
+    on_record(record): 受理したレコードを一覧の順番どおりに受け取るコールバック（CSV/DB 出力用）
+               再開したときは、ジャーナルにある採用済みのレコードも最初に順番どおり渡す
+    scheduler: politeness.PolitenessScheduler（None なら interval で作る）。escalate にも同じものを渡すと、
+               ブラウザ側のリダイレクト確認とホストごとのアクセス間隔・429/503 の待ちを共有する
+
+    parse_listing/parse_detail は別プロセスで実行するので、モジュールのトップレベル関数を渡すこと
+    """
+    timing = http_client.TimingLog()
+    session = http_client.create_session(headers, pool_size=concurrency, cache_path=cache_path, on_timing=timing)
+    if scheduler is None:
+        scheduler = politeness.PolitenessScheduler(session, interval)
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    parse_pool = ProcessPoolExecutor(max_workers=parse_workers)
+    restaurants_data = []
+    frontier = url_frontier.URLFrontier()  # 見つけた店舗（店舗IDで重複除去）
+    pending = []
+    start_page = 1
+
+    journal = None
+    if journal_path:
+        journal = crawl_journal.CrawlJournal(journal_path, base_search_url, resume)
+        last_page, pending, discovered, restaurants_data = journal.load()
+        frontier.add_many(discovered)
+        start_page = last_page + 1
+        if last_page or pending or restaurants_data:
+            print(f"再開: 取得済み {len(restaurants_data)} 件 / 未処理 {len(pending)} 件 / ページ {start_page} から")
+        if on_record:
+            for restaurant_data in restaurants_data:
+                on_record(restaurant_data)
+
+    async def fetch_stage(seq, restaurant_url, queue):
+        # 取得したバイト列（またはエラー）をパース待ちのキューに入れる
+        try:
+            content = await fetch(session, restaurant_url, scheduler, semaphore)
+        except Exception as e:
+            content = e
+        await queue.put((seq, restaurant_url, content))
+
+    async def parse_stage(queue, results):
+        # キューから取り出してプロセスプールでパースし、必要ならブラウザで取り直してSSLチェックまで行う
+        while True:
+            seq, restaurant_url, content = await queue.get()
+            try:
+                if isinstance(content, Exception):
+                    raise content
+                restaurant_data = await loop.run_in_executor(parse_pool, run_parser, parse_detail, content)
+                if escalate and escalate.needed(restaurant_data):
+                    await scheduler.wait_async(restaurant_url)
+                    restaurant_data = await asyncio.to_thread(escalate.fetch, restaurant_url, restaurant_data)
+                ssl_future = None
+                if restaurant_data and ssl_probe and restaurant_data.get('URL'):
+                    ssl_future = ssl_probe.submit(restaurant_data['URL'])
+                results[seq].set_result((restaurant_data, ssl_future))
+            except Exception as e:
+                results[seq].set_result((e, None))
+            queue.task_done()
+
+    async def scrape_pending(pending):
+        # 残り件数分ずつ取得→パースのパイプラインに流し、受理は一覧の順番どおりに行う
+        while pending and len(restaurants_data) < max_records:
+            batch = pending[:max_records - len(restaurants_data)]
+            pending = pending[len(batch):]
+
+            queue = asyncio.Queue(maxsize=concurrency)
+            results = [loop.create_future() for _ in batch]
+            fetchers = [asyncio.create_task(fetch_stage(seq, url, queue)) for seq, url in enumerate(batch)]
+            parsers = [asyncio.create_task(parse_stage(queue, results)) for _ in range(concurrency)]
+
+            try:
+                for restaurant_url, result in zip(batch, results):
+                    restaurant_data, ssl_future = await result
+                    if len(restaurants_data) >= max_records:
+                        break
+                    print(f"\n[{len(restaurants_data)+1}/{max_records}] {restaurant_url}")
+
+                    # 取得エラーはジャーナルに記録しない（再開時にもう一度取得する）
+                    if isinstance(restaurant_data, Exception):
+                        print(f"  ✗ エラー: {restaurant_data}")
+                        continue
+
+                    # SSLチェックはパース直後に始めているので、ここでは結果を受け取るだけ
+                    if ssl_future is not None:
+                        restaurant_data['SSL'] = await asyncio.wrap_future(ssl_future)
+
+                    accepted = accept(restaurant_data, restaurants_data)
+                    # ジャーナルを先に書く（on_record の前に落ちても、再開時にジャーナルから渡し直せる）
+                    if journal:
+                        journal.visited(restaurant_url, restaurant_data if accepted else None)
+                    if accepted:
+                        restaurants_data.append(restaurant_data)
+                        if on_record:
+                            on_record(restaurant_data)
+            finally:
+                for task in fetchers + parsers:
+                    task.cancel()
+                await asyncio.gather(*fetchers, *parsers, return_exceptions=True)
+
+    try:
+        # 前回の実行で見つけたまま未処理の店舗
+        await scrape_pending(pending)
+
+        for page in range(start_page, max_pages + 1):
+            if len(restaurants_data) >= max_records:
+                break
+
+            print(f"\n{'='*60}")
+            print(f"ページ {page} (取得済み: {len(restaurants_data)}/{max_records})")
+            print('='*60)
+
+            list_url = page_url(base_search_url, page)
+            print(f"アクセス: {list_url}")
+
+            try:
+                content = await fetch(session, list_url, scheduler, semaphore)
+                restaurant_links = await loop.run_in_executor(parse_pool, run_parser, parse_listing, content)
+            except Exception as e:
+                print(f"✗ エラー: {e}")
+                break
+
+            print(f"発見: {len(restaurant_links)} 件のリンク")
+
+            if not restaurant_links:
+                print("リンクが見つかりません")
+                break
+
+            # 店舗ページ以外のリンクを除き、https://r.gnavi.co.jp/<店舗ID>/ にそろえて初めて見た店舗だけ残す
+            pending = frontier.add_many(restaurant_links)
+
+            if journal:
+                journal.page_done(page, list_url, pending)
+
+            await scrape_pending(pending)
+    finally:
+        parse_pool.shutdown(cancel_futures=True)
+        session.close()
+        if journal:
+            journal.close()
+        frontier.close()
+        print(timing.summary())
+        print(frontier.summary())
+
+    return restaurants_data
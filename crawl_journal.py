@@ -0,0 +1,74 @@
+import json
+import sqlite3
+import time
+
+
+class CrawlJournal:
+    """クロールの進行状況を追記していくジャーナル（SQLite WALモード）
+
+    pages:    取得が終わった一覧ページ
+    frontier: 一覧ページで見つけた店舗URL
+    visited:  処理が終わった店舗URL（採用・不採用どちらも）
+    records:  採用したレコード
+    """
+
+    def __init__(self, path, base_search_url, resume=False):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(
+            'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);'
+            'CREATE TABLE IF NOT EXISTS pages (page INTEGER PRIMARY KEY, url TEXT, done_at REAL);'
+            'CREATE TABLE IF NOT EXISTS frontier (seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT UNIQUE, page INTEGER);'
+            'CREATE TABLE IF NOT EXISTS visited (url TEXT PRIMARY KEY, accepted INTEGER, done_at REAL);'
+            'CREATE TABLE IF NOT EXISTS records (seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT, data TEXT);'
+        )
+
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'base_search_url'").fetchone()
+        if resume and row and row[0] != base_search_url:
+            print(f"⚠ ジャーナルの検索URLが異なるため最初から実行します: {row[0]}")
+            resume = False
+        if resume and row:
+            print(f"↻ ジャーナルから再開: {path}")
+        else:
+            self._reset(base_search_url)
+
+    def _reset(self, base_search_url):
+        with self.conn:
+            for table in ('meta', 'pages', 'frontier', 'visited', 'records'):
+                self.conn.execute(f'DELETE FROM {table}')
+            self.conn.execute("INSERT INTO meta VALUES ('base_search_url', ?)", (base_search_url,))
+
+    def load(self):
+        """再開用に (最後に終わったページ, 未処理URL, 発見済みURL, 採用済みレコード) を返す"""
+        last_page = self.conn.execute('SELECT COALESCE(MAX(page), 0) FROM pages').fetchone()[0]
+        discovered = [row[0] for row in self.conn.execute('SELECT url FROM frontier ORDER BY seq')]
+        visited = {row[0] for row in self.conn.execute('SELECT url FROM visited')}
+        pending = [url for url in discovered if url not in visited]
+        records = [json.loads(row[0]) for row in self.conn.execute('SELECT data FROM records ORDER BY seq')]
+        return last_page, pending, set(discovered), records
+
+    def page_done(self, page, url, restaurant_urls):
+        """一覧ページの処理完了と、そこで見つけた店舗URLを記録"""
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO frontier (url, page) VALUES (?, ?)',
+                [(restaurant_url, page) for restaurant_url in restaurant_urls],
+            )
+            self.conn.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?)', (page, url, time.time()))
+
+    def visited(self, url, restaurant_data=None):
+        """店舗URLの処理完了を記録（採用したならレコードも記録）"""
+        with self.conn:
+            if restaurant_data is not None:
+                self.conn.execute(
+                    'INSERT INTO records (url, data) VALUES (?, ?)',
+                    (url, json.dumps(restaurant_data, ensure_ascii=False)),
+                )
+            self.conn.execute(
+                'INSERT OR IGNORE INTO visited VALUES (?, ?, ?)',
+                (url, restaurant_data is not None, time.time()),
+            )
+
+    def close(self):
+        self.conn.close()
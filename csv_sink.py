@@ -0,0 +1,104 @@
+import csv
+import os
+
+
+COLUMNS = ['店舗名', '電話番号', 'メールアドレス', '都道府県', '市区町村', '番地', '建物名', 'URL', 'SSL']
+FSYNC_EVERY = 20  # この行数ごとにディスクへ書き出す（毎行 flush はする）
+SAMPLE_SIZE = 3  # 最後に表示する先頭の行数
+
+
+class CSVSink:
+    """受理したレコードを1行ずつCSVに追記していく（BOM付きUTF-8、Excel対応）
+
+    最初の write() でファイルを開いて BOM とヘッダーを書き、以後 write() のたびに1行追記して flush する。
+    1件も書かなければファイルは開かない（前回のCSVを空で上書きしない）。
+    途中で落ちても、それまでの行は読めるCSVとして残る。
+    max_rows / max_bytes を指定すると、超えたところで 1-1_002.csv, 1-1_003.csv ... に切り替える
+    （どのファイルにも BOM とヘッダーを書く）。
+    レコードはメモリに残さず、項目ごとの件数と先頭 sample_size 件だけを覚えておく。
+    """
+
+    def __init__(self, path, columns=COLUMNS, fsync_every=FSYNC_EVERY, max_rows=None, max_bytes=None,
+                 sample_size=SAMPLE_SIZE):
+        self.path = path
+        self.columns = list(columns)
+        self.fsync_every = fsync_every
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.sample_size = sample_size
+        self.rows = 0
+        self.files = []
+        self.filled = dict.fromkeys(self.columns, 0)
+        self.sample = []
+        self._file = None
+        self._writer = None
+        self._file_rows = 0
+        self._unsynced = 0
+
+    def _open(self):
+        if len(self.files) == 0:
+            path = self.path
+        else:
+            stem, ext = os.path.splitext(self.path)
+            path = f"{stem}_{len(self.files) + 1:03d}{ext}"
+        # utf-8-sig は先頭に BOM を書く
+        self._file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction='ignore')
+        self._writer.writeheader()
+        self._file.flush()
+        self._file_rows = 0
+        self.files.append(path)
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def _full(self):
+        if self.max_rows and self._file_rows >= self.max_rows:
+            return True
+        return bool(self.max_bytes) and self._file.tell() >= self.max_bytes
+
+    def write(self, record):
+        """1件追記する（crawl の on_record にそのまま渡せる）"""
+        if self._file is None:
+            self._open()
+        elif self._full():
+            self._sync()
+            self._file.close()
+            self._open()
+
+        row = {column: '' if record.get(column) is None else record.get(column) for column in self.columns}
+        self._writer.writerow(row)
+        self._file.flush()
+        self.rows += 1
+        self._file_rows += 1
+        for column in self.columns:
+            # SSL=False は「なし」として数える
+            if row[column] != '' and row[column] is not False:
+                self.filled[column] += 1
+        if len(self.sample) < self.sample_size:
+            self.sample.append(row)
+
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self._sync()
+
+    def close(self):
+        if self._file is None:
+            return
+        self._sync()
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def summary(self):
+        """保存先と項目ごとの件数"""
+        lines = [f"✓ 保存: {', '.join(self.files)}（{self.rows} 件）"]
+        lines += [f"  {column}あり: {self.filled[column]} 件" for column in self.columns]
+        return '\n'.join(lines)
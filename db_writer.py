@@ -0,0 +1,154 @@
+import queue
+import threading
+import time
+
+import mysql_loader
+
+
+QUEUE_SIZE = 500  # 書き込み待ちの上限（いっぱいになったら put() がクローラーを待たせる）
+BATCH_SIZE = 100  # この件数たまったらコミット
+FLUSH_INTERVAL = 5.0  # 件数が少なくても、最初の1件からこの秒数たったらコミット
+RETRIES = 3  # 1バッチの書き込みに失敗したときの再試行回数（upsert なので同じバッチを書き直してよい）
+RETRY_WAIT = 2.0  # 再試行までの待ち（秒）。回数ごとに2倍にする
+
+_STOP = object()
+
+
+class DBWriter:
+    """取得したレコードを別スレッドで MySQL に書く（クロールしながら少しずつコミットする）
+
+    put() はキューに入れてすぐ返り、書き込みスレッドが batch_size 件たまるか flush_interval 秒
+    たつごとに mysql_loader.upsert() で1回コミットする。途中で落ちても失うのはコミット前の分だけ。
+    DB が遅れてキューがいっぱいになったら、空くまで put() が待つ（クローラーの速度を DB に合わせる）。
+    接続はバッチごとに engine のプールから借りて返す（pool_pre_ping で切れた接続は作り直される）。
+
+    prepare(batch): 書く直前にバッチに対して呼ぶ関数（tls_probe の fill_ssl で SSL 列を埋めるなど）
+    再試行しても書けなかったら書き込みスレッドは止まり、次の put() / close() がその例外を送出する。
+    """
+
+    def __init__(self, engine, table, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 queue_size=QUEUE_SIZE, prepare=None, retries=RETRIES, retry_wait=RETRY_WAIT):
+        self.engine = engine
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.prepare = prepare
+        self.retries = retries
+        self.retry_wait = retry_wait
+        self.stats = {'queued': 0, 'written': 0, 'batches': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0,
+                      'retries': 0, 'blocked': 0, 'blocked_seconds': 0.0}
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+
+    def _check(self):
+        if self._error is not None:
+            raise RuntimeError(f"DB書き込みスレッドが停止しました: {self._error}") from self._error
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        self.stats['blocked'] += 1
+        start = time.perf_counter()
+        try:
+            while True:
+                # 書き込みスレッドが止まっていたら待ち続けないように、ときどき確かめる
+                self._check()
+                try:
+                    self._queue.put(item, timeout=1)
+                    return
+                except queue.Full:
+                    pass
+        finally:
+            self.stats['blocked_seconds'] += time.perf_counter() - start
+
+    def put(self, record):
+        """record を書き込み待ちに入れる（キューがいっぱいなら空くまで待つ）"""
+        self._check()
+        self._put(record)
+        self.stats['queued'] += 1
+
+    def _run(self):
+        batch = []
+        deadline = None
+        try:
+            while True:
+                timeout = None if not batch else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None  # flush_interval たった
+                if item is _STOP:
+                    if batch:
+                        self._write(batch)
+                    return
+                if item is not None:
+                    if not batch:
+                        deadline = time.monotonic() + self.flush_interval
+                    batch.append(item)
+                    if len(batch) < self.batch_size:
+                        continue
+                self._write(batch)
+                batch = []
+        except Exception as e:
+            self._error = e
+            print(f"DB書き込みエラー（{len(batch)} 件は未保存）: {e}")
+
+    def _write(self, batch):
+        if self.prepare is not None:
+            self.prepare(batch)
+        for attempt in range(self.retries + 1):
+            try:
+                connection = self.engine.raw_connection()
+                try:
+                    result = mysql_loader.upsert(connection, batch, self.table, verbose=False)
+                finally:
+                    connection.close()
+                break
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                self.stats['retries'] += 1
+                wait = self.retry_wait * 2 ** attempt
+                print(f"DB書き込みエラー、{wait:.0f} 秒後に再試行: {e}")
+                time.sleep(wait)
+        self.stats['written'] += len(batch)
+        self.stats['batches'] += 1
+        for name in ('inserted', 'updated', 'unchanged'):
+            self.stats[name] += result[name]
+
+    def close(self):
+        """残りを書いてスレッドを止める（書き込みに失敗していればその例外を送出）"""
+        if not self._closed:
+            self._closed = True
+            if self._thread.is_alive():
+                try:
+                    self._put(_STOP)
+                except RuntimeError:
+                    pass
+            self._thread.join()
+        self._check()
+
+    def summary(self):
+        stats = self.stats
+        return (f"DB: {stats['written']}/{stats['queued']} 件を保存（追加 {stats['inserted']} / 更新 {stats['updated']}"
+                f" / 変更なし {stats['unchanged']}）/ コミット {stats['batches']} 回 / 再試行 {stats['retries']} 回"
+                f" / 待ち {stats['blocked']} 回 {stats['blocked_seconds']:.1f} 秒")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        # クロール側の例外を優先し、書き込みの失敗は表示だけする（残りは書いてから抜ける）
+        try:
+            self.close()
+        except RuntimeError as e:
+            print(f"⚠ {e}")
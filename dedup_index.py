@@ -0,0 +1,152 @@
+import hashlib
+import re
+import sqlite3
+import unicodedata
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+
+SIMILARITY = 0.8  # MinHash で推定した Jaccard 係数がこれ以上なら同じ店とみなす
+NUM_PERM = 64  # MinHash の署名の長さ
+BANDS = 8  # LSH のバンド数（1バンド NUM_PERM // BANDS 個。候補になる類似度の目安は (1/BANDS)^(1/行数) ≒ 0.77）
+SHINGLE = 3  # 文字 n-gram の n
+
+# 店を特定する項目（完全一致のキー）
+KEY_FIELDS = ('店舗名', '電話番号', '都道府県', '市区町村', '番地')
+# 類似は店舗名で比べ、同じ都道府県・市区町村の店に限る（同じビルの別の店を類似にしないため住所は比べない）
+AREA_FIELDS = ('都道府県', '市区町村')
+
+# ハッシュは実行ごとに変わらないもの（crc32 と固定シードの係数）を使うので、ファイルに保存した索引を次の実行でも使える
+_PRIME = 4294967311  # 2^32 より大きい素数
+_rng = np.random.RandomState(20250701)
+_A = _rng.randint(1, 2 ** 31, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 2 ** 31, size=NUM_PERM).astype(np.uint64)
+_ROWS = NUM_PERM // BANDS
+
+_NON_DIGIT = re.compile(r'\D')
+
+Match = namedtuple('Match', 'kind name similarity')
+
+
+def normalize(text):
+    """比較用に正規化（全角→半角・大文字→小文字、空白・改行・記号を除く）"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', str(text)).casefold()
+    return ''.join(ch for ch in text if unicodedata.category(ch)[0] not in 'PZSC')
+
+
+def normalize_phone(phone):
+    """数字だけにする"""
+    if phone is None:
+        return ''
+    return _NON_DIGIT.sub('', unicodedata.normalize('NFKC', str(phone)))
+
+
+def store_key(record):
+    """店舗名・電話番号・住所（建物名を除く）を正規化したキー（16進32文字）"""
+    parts = [normalize_phone(record.get(field)) if field == '電話番号' else normalize(record.get(field))
+             for field in KEY_FIELDS]
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def area(record):
+    return '|'.join(normalize(record.get(field)) for field in AREA_FIELDS)
+
+
+def minhash(record):
+    """店舗名の文字 n-gram の MinHash 署名"""
+    text = normalize(record.get('店舗名'))
+    shingles = {text[i:i + SHINGLE] for i in range(max(1, len(text) - SHINGLE + 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def _buckets(signature):
+    # バンドごとに署名の一部をまとめたハッシュ（SQLite の INTEGER に入る符号付き64ビット）
+    return [
+        int.from_bytes(hashlib.blake2b(signature[i * _ROWS:(i + 1) * _ROWS].tobytes(), digest_size=8).digest(),
+                       'little', signed=True)
+        for i in range(BANDS)
+    ]
+
+
+class DedupIndex:
+    """取得した店舗の重複チェック用の索引（SQLite。path を指定すれば実行をまたいで使える）
+
+    stores: 完全一致のキー（store_key）ごとの店舗名・地域（都道府県|市区町村）・MinHash 署名
+    bands:  LSH のバンドのハッシュ → キー（似た店舗の候補を探す）
+
+    find() は、同じキーがあれば完全一致、なければ LSH の候補のうち地域が同じで署名の一致率が
+    threshold 以上のものを「類似」として返す。どちらも件数によらず索引を引くだけで済む。
+    """
+
+    def __init__(self, path=':memory:', threshold=SIMILARITY, reset=False):
+        self.threshold = threshold
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(
+            'CREATE TABLE IF NOT EXISTS stores (key TEXT PRIMARY KEY, name TEXT, area TEXT, signature BLOB);'
+            'CREATE TABLE IF NOT EXISTS bands (band INTEGER, bucket INTEGER, key TEXT,'
+            ' PRIMARY KEY (band, bucket, key)) WITHOUT ROWID;'
+        )
+        if reset:
+            with self.conn:
+                self.conn.execute('DELETE FROM stores')
+                self.conn.execute('DELETE FROM bands')
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM stores').fetchone()[0]
+
+    def find(self, record):
+        """record と同じ店が登録済みなら Match(kind='exact' か 'similar', 店舗名, 類似度) を返す（なければ None）"""
+        row = self.conn.execute('SELECT name FROM stores WHERE key = ?', (store_key(record),)).fetchone()
+        if row:
+            return Match('exact', row[0], 1.0)
+
+        signature = minhash(record)
+        record_area = area(record)
+        candidates = set()
+        for band, bucket in enumerate(_buckets(signature)):
+            candidates.update(row[0] for row in self.conn.execute(
+                'SELECT key FROM bands WHERE band = ? AND bucket = ?', (band, bucket)))
+
+        best = None
+        for key in candidates:
+            name, store_area, blob = self.conn.execute(
+                'SELECT name, area, signature FROM stores WHERE key = ?', (key,)).fetchone()
+            if store_area != record_area:
+                continue
+            similarity = float(np.mean(np.frombuffer(blob, dtype=np.uint64) == signature))
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = Match('similar', name, similarity)
+        return best
+
+    def add(self, record):
+        """record を登録する（同じキーが登録済みなら何もしない）"""
+        self.add_many([record])
+
+    def add_many(self, records):
+        """まとめて登録する（過去の CSV などから索引を作るとき用）"""
+        stores = []
+        bands = []
+        for record in records:
+            key = store_key(record)
+            signature = minhash(record)
+            stores.append((key, record.get('店舗名'), area(record), signature.tobytes()))
+            bands.extend((band, bucket, key) for band, bucket in enumerate(_buckets(signature)))
+        with self.conn:
+            self.conn.executemany('INSERT OR IGNORE INTO stores VALUES (?, ?, ?, ?)', stores)
+            self.conn.executemany('INSERT OR IGNORE INTO bands VALUES (?, ?, ?)', bands)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
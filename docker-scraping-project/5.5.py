@@ -1,114 +1,33 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
-from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import pandas as pd
 import re
 import time
-import ssl
-import socket
+import os
+import sys
+import functools
 
-def check_ssl(url):
-    """URLのSSL証明書の有無をチェック"""
-    if not url or url == '':
-        return False
-    
-    try:
-        if url.startswith('https://'):
-            hostname = url.split('//')[1].split('/')[0].split(':')[0]
-            context = ssl.create_default_context()
-            with socket.create_connection((hostname, 443), timeout=5) as sock:
-                with context.wrap_socket(sock, server_hostname=hostname) as ssock:
-                    return True
-        return False
-    except Exception as e:
-        return False
+# 共通モジュール（リポジトリ直下）を読み込めるようにする
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import address_engine
+import chrome_profile
+import crawl_engine
+import csv_sink
+import driver_pool
+import gnavi_json
+import official_site
+import politeness
+import selenium_waits
+import tls_probe
+import url_frontier
 
-def split_address(full_address):
-    """住所を都道府県、市区町村、番地、建物名に分割"""
-    prefecture = ''
-    city = ''
-    street = ''
-    building = ''
-    
-    if not full_address:
-        return prefecture, city, street, building
-    
-    # 空白文字を削除
-    full_address = re.sub(r'\s+', '', full_address)
-    
-    # 都道府県の抽出
-    pref_pattern = r'^(北海道|青森県|岩手県|宮城県|秋田県|山形県|福島県|茨城県|栃木県|群馬県|埼玉県|千葉県|東京都|神奈川県|新潟県|富山県|石川県|福井県|山梨県|長野県|岐阜県|静岡県|愛知県|三重県|滋賀県|京都府|大阪府|兵庫県|奈良県|和歌山県|鳥取県|島根県|岡山県|広島県|山口県|徳島県|香川県|愛媛県|高知県|福岡県|佐賀県|長崎県|熊本県|大分県|宮崎県|鹿児島県|沖縄県)'
-    pref_match = re.match(pref_pattern, full_address)
-    
-    if pref_match:
-        prefecture = pref_match.group(1)
-        remaining = full_address[len(prefecture):]
-    else:
-        remaining = full_address
-    
-    # 市区町村の抽出
-    city_pattern = r'^(.+?[市区町村]|.+?郡.+?[町村])'
-    city_match = re.match(city_pattern, remaining)
-    
-    if city_match:
-        city = city_match.group(1)
-        remaining = remaining[len(city):]
-    
-    # 建物名の抽出
-    building_pattern = r'([ぁ-んァ-ヶー一-龠a-zA-Z]+(?:ビル|タワー|ハイツ|マンション|アパート|ビルディング|プラザ|センター|BLDG|Bldg)[^0-9]*[0-9]*[階F号]?.*?)$'
-    building_match = re.search(building_pattern, remaining)
-    
-    if building_match:
-        building = building_match.group(1)
-        street = remaining[:building_match.start()]
-    else:
-        street = remaining
-    
-    return prefecture, city, street, building
-
-def setup_driver():
-    """Seleniumドライバーのセットアップ"""
-    options = webdriver.ChromeOptions()
-    
-    # ユーザーエージェントの設定
-    options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-    
-    # 自動化検出を回避
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    
-    # その他のオプション
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--start-maximized')
-    
-    # ヘッドレスモード（必要に応じてコメント解除）
-    # options.add_argument('--headless')
-    
-    # ChromeDriverのパスを指定（同じディレクトリにある場合）
-    # Windowsの場合: './chromedriver.exe'
-    # Mac/Linuxの場合: './chromedriver'
-    try:
-        service = Service('./chromedriver')
-        driver = webdriver.Chrome(service=service, options=options)
-    except:
-        # パスが不要な場合（PATHに設定されている場合）
-        driver = webdriver.Chrome(options=options)
-    
-    # webdriverプロパティを削除（自動化検出回避）
-    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-        'source': '''
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            })
-        '''
-    })
-    
-    return driver
+def setup_driver(headless=False, data_only=False):
+    """Seleniumドライバーのセットアップ（headless=True ならウィンドウを出さない、data_only=True なら画像・フォント・広告を読み込まない）"""
+    return chrome_profile.create_driver(headless=headless, data_only=data_only, stealth=True,
+                                        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                                        driver_path='./chromedriver')
 
 def extract_email(driver):
     """ページからメールアドレスを抽出"""
@@ -121,124 +40,88 @@ def extract_email(driver):
         return ''
 
 def get_official_url(driver):
-    """オフィシャルページのURLを取得"""
+    """オフィシャルページのURLを取得（リンクをクリックせず、hrefから求める）"""
     try:
-        # 複数のパターンでリンクを探す
-        link_keywords = [
-            "//a[contains(text(), 'ホームページ')]",
-            "//a[contains(text(), 'オフィシャル')]",
-            "//a[contains(text(), 'HP')]",
-            "//a[contains(text(), 'ウェブサイト')]",
-            "//a[contains(@class, 'official')]",
-            "//a[contains(@href, 'url.asp')]"
-        ]
-        
-        for xpath in link_keywords:
-            try:
-                link_elem = driver.find_element(By.XPATH, xpath)
-                
-                # 現在のウィンドウハンドルを保存
-                original_window = driver.current_window_handle
-                original_url = driver.current_url
-                
-                # JavaScriptでクリック（より確実）
-                driver.execute_script("arguments[0].click();", link_elem)
-                time.sleep(3)
-                
-                # 新しいウィンドウが開いたかチェック
-                if len(driver.window_handles) > 1:
-                    # 新しいウィンドウに切り替え
-                    for window in driver.window_handles:
-                        if window != original_window:
-                            driver.switch_to.window(window)
-                            official_url = driver.current_url
-                            driver.close()
-                            driver.switch_to.window(original_window)
-                            return official_url
-                else:
-                    # 同じウィンドウで遷移した場合
-                    if driver.current_url != original_url:
-                        official_url = driver.current_url
-                        driver.back()
-                        time.sleep(2)
-                        return official_url
-            except:
-                continue
-        
-        return ''
-    except Exception as e:
+        return official_site.get_official_url(driver)
+    except Exception:
         return ''
 
 def scrape_restaurant_detail(driver, restaurant_url):
     """個別店舗ページから詳細情報を取得"""
-    time.sleep(3)  # アイドリングタイム
+    politeness.wait(restaurant_url)  # アイドリングタイム（ドライバーが複数でもホスト単位で間隔を守る）
     
     try:
         driver.get(restaurant_url)
         wait = WebDriverWait(driver, 10)
         
-        # ページの読み込みを待機
-        time.sleep(2)
+        # ページの読み込みを待機（DOMと通信が落ち着くまで）
+        selenium_waits.wait_until(driver, 'detail', selenium_waits.page_ready())
+        
+        # 埋め込みJSON（__NEXT_DATA__ / JSON-LD）があれば店舗名・電話番号・住所はそこから取得
+        fields = gnavi_json.extract_store(driver.page_source) or {}
         
         # 店舗名
-        name = ''
-        name_selectors = [
-            (By.CSS_SELECTOR, 'h1.str_name'),
-            (By.TAG_NAME, 'h1'),
-            (By.XPATH, "//h1[contains(@class, 'shop')]")
-        ]
-        for by, selector in name_selectors:
-            try:
-                name_elem = wait.until(EC.presence_of_element_located((by, selector)))
-                name = name_elem.text.strip()
-                if name:
-                    break
-            except:
-                continue
+        name = fields.get('店舗名', '')
+        if not name:
+            name_selectors = [
+                (By.CSS_SELECTOR, 'h1.str_name'),
+                (By.TAG_NAME, 'h1'),
+                (By.XPATH, "//h1[contains(@class, 'shop')]")
+            ]
+            for by, selector in name_selectors:
+                try:
+                    name_elem = wait.until(EC.presence_of_element_located((by, selector)))
+                    name = name_elem.text.strip()
+                    if name:
+                        break
+                except:
+                    continue
         
         # 電話番号
-        tel = ''
-        tel_selectors = [
-            (By.CSS_SELECTOR, 'span.tel_num'),
-            (By.XPATH, "//span[contains(@class, 'tel')]"),
-            (By.XPATH, "//a[starts-with(@href, 'tel:')]")
-        ]
-        for by, selector in tel_selectors:
-            try:
-                tel_elem = driver.find_element(by, selector)
-                tel = tel_elem.text.strip()
-                tel = re.sub(r'[^0-9\-]', '', tel)
-                if tel:
-                    break
-            except:
-                continue
+        tel = fields.get('電話番号', '')
+        if not tel:
+            tel_selectors = [
+                (By.CSS_SELECTOR, 'span.tel_num'),
+                (By.XPATH, "//span[contains(@class, 'tel')]"),
+                (By.XPATH, "//a[starts-with(@href, 'tel:')]")
+            ]
+            for by, selector in tel_selectors:
+                try:
+                    tel_elem = driver.find_element(by, selector)
+                    tel = tel_elem.text.strip()
+                    tel = re.sub(r'[^0-9\-]', '', tel)
+                    if tel:
+                        break
+                except:
+                    continue
         
         # メールアドレス
         email = extract_email(driver)
         
         # 住所
-        full_address = ''
-        address_selectors = [
-            (By.CSS_SELECTOR, 'span[itemprop="address"]'),
-            (By.XPATH, "//span[@itemprop='address']"),
-            (By.XPATH, "//*[contains(@class, 'address')]")
-        ]
-        for by, selector in address_selectors:
-            try:
-                address_elem = driver.find_element(by, selector)
-                full_address = address_elem.text.strip()
-                if full_address:
-                    break
-            except:
-                continue
+        full_address = fields.get('住所', '')
+        if not full_address:
+            address_selectors = [
+                (By.CSS_SELECTOR, 'span[itemprop="address"]'),
+                (By.XPATH, "//span[@itemprop='address']"),
+                (By.XPATH, "//*[contains(@class, 'address')]")
+            ]
+            for by, selector in address_selectors:
+                try:
+                    address_elem = driver.find_element(by, selector)
+                    full_address = address_elem.text.strip()
+                    if full_address:
+                        break
+                except:
+                    continue
         
-        prefecture, city, street, building = split_address(full_address)
+        prefecture, city, street, building = address_engine.split_address(full_address)
         
         # URL（オフィシャルページ）
-        official_url = get_official_url(driver)
+        official_url = fields.get('URL') or get_official_url(driver)
         
-        # SSL
-        has_ssl = check_ssl(official_url)
+        # SSLチェックは開始だけして（ドライバーのスレッドを待たせない）、採用の直前に結果を受け取る
+        tls_probe.default_probe().submit(official_url)
         
         return {
             '店舗名': name,
@@ -249,119 +132,98 @@ def scrape_restaurant_detail(driver, restaurant_url):
             '番地': street,
             '建物名': building,
             'URL': official_url,
-            'SSL': has_ssl
+            'SSL': False
         }
     
     except Exception as e:
         print(f"Error scraping {restaurant_url}: {e}")
         return None
 
-def scrape_restaurant_list(search_url, max_records=50):
-    """レストラン一覧ページから店舗URLを取得してスクレイピング"""
-    driver = setup_driver()
+# 一覧ページの店舗リンク（上から順に試し、最初に見つかったものを使う）
+LINK_SELECTORS = [
+    'a.style_titleLink__oiHVJ',
+    'a[href*="/restaurant/"]',
+    '.restaurant-item a',
+    'a[class*="shop"]'
+]
+
+# 要素を1つずつ get_attribute せず、hrefの文字列だけを1回でまとめて受け取る（StaleElementReferenceException も起きない）
+LISTING_LINKS_JS = "return Array.from(document.querySelectorAll(arguments[0]), a => a.href);"
+
+def collect_listing_urls(driver):
+    """表示中の一覧ページから店舗URLを取得"""
+    for selector in LINK_SELECTORS:
+        try:
+            urls = driver.execute_script(LISTING_LINKS_JS, selector)
+        except Exception:
+            continue
+        if urls:
+            return urls
+    return []
+
+def scrape_listing_page(driver, list_url):
+    """一覧ページを開いて店舗URLのリストを返す"""
+    politeness.wait(list_url)
+    driver.get(list_url)
+    selenium_waits.wait_until(driver, 'listing', selenium_waits.page_ready((By.CSS_SELECTOR, ', '.join(LINK_SELECTORS))))
+    return [url for url in map(url_frontier.canonical_store_url, collect_listing_urls(driver)) if url]
+
+def scrape_restaurant_list(search_url, max_records=50, max_pages=10, workers=driver_pool.POOL_SIZE, on_record=None):
+    """レストラン一覧ページから店舗URLを取得してスクレイピング（headless Chrome を workers 個並行に使う）
+
+    一覧ページ（?p=N）と店舗ページを同じ作業キューに入れ、店舗ページを優先して処理する。
+    一覧ページは1回ずつしか開かず、店舗URLを使い切りそうになってから次のページを開く。
+    on_record(record): 採用したレコードをその都度受け取る（CSVへの追記用）
+    """
     restaurants_data = []
+    frontier = url_frontier.URLFrontier()
+    start = time.perf_counter()
     
-    try:
-        driver.get(search_url)
-        time.sleep(3)
-        
-        wait = WebDriverWait(driver, 10)
+    def handle(driver, task):
+        # 一覧ページなら店舗URLのリスト、店舗ページならレコードを返す
+        kind, value = task
+        if kind == 'listing':
+            return scrape_listing_page(driver, crawl_engine.page_url(search_url, value))
+        return scrape_restaurant_detail(driver, value)
+    
+    with frontier, driver_pool.DriverPool(functools.partial(setup_driver, headless=True, data_only=True), handle, size=workers) as pool:
+        pool.submit(('listing', 1), priority=1)
         
-        while len(restaurants_data) < max_records:
-            print(f"\n--- Current page, collected: {len(restaurants_data)}/{max_records} ---")
-            
-            # ページの読み込みを待機
-            time.sleep(2)
-            
-            # 店舗リンクの取得
-            restaurant_elements = []
-            link_selectors = [
-                'a.style_titleLink__oiHVJ',
-                'a[href*="/restaurant/"]',
-                '.restaurant-item a',
-                'a[class*="shop"]'
-            ]
-            
-            for selector in link_selectors:
-                try:
-                    restaurant_elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                    if restaurant_elements:
-                        break
-                except:
-                    continue
-            
-            if not restaurant_elements:
-                print("No restaurant links found.")
-                break
+        for (kind, value), result in pool.results():
+            if isinstance(result, Exception):
+                print(f"✗ Error: {value}: {result}")
+                continue
             
-            # 現在のページの全店舗URLを事前に取得（StaleElementReferenceError対策）
-            restaurant_urls = []
-            for elem in restaurant_elements[:max_records - len(restaurants_data)]:
-                try:
-                    url = elem.get_attribute('href')
-                    if url and 'gnavi.co.jp' in url:
-                        restaurant_urls.append(url)
-                except StaleElementReferenceException:
+            if kind == 'listing':
+                restaurant_urls = frontier.add_many(result)
+                print(f"\n--- Listing page {value}: found {len(restaurant_urls)} restaurant URLs ---")
+                if not restaurant_urls:
+                    print("No restaurant links found.")
                     continue
+                if value < max_pages:
+                    pool.submit(('listing', value + 1), priority=1)
+                for restaurant_url in restaurant_urls:
+                    pool.submit(('detail', restaurant_url))
+                continue
             
-            print(f"Found {len(restaurant_urls)} restaurant URLs on this page")
+            print(f"\n[{len(restaurants_data)+1}/{max_records}] Scraped: {value}")
             
-            # 各店舗をスクレイピング
-            for idx, restaurant_url in enumerate(restaurant_urls):
+            if result and result['店舗名']:
+                tls_probe.default_probe().fill_ssl([result])
+                restaurants_data.append(result)
+                if on_record:
+                    on_record(result)
+                print(f"✓ Success: {result['店舗名']}")
                 if len(restaurants_data) >= max_records:
                     break
-                
-                print(f"\n[{len(restaurants_data)+1}/{max_records}] Scraping: {restaurant_url}")
-                
-                restaurant_data = scrape_restaurant_detail(driver, restaurant_url)
-                
-                if restaurant_data and restaurant_data['店舗名']:
-                    restaurants_data.append(restaurant_data)
-                    print(f"✓ Success: {restaurant_data['店舗名']}")
-                else:
-                    print(f"✗ Failed or empty data")
-                
-                # 一覧ページに戻る
-                driver.get(search_url if '?p=' not in search_url else search_url.split('?')[0])
-                time.sleep(2)
-            
-            # すでに十分なデータを取得した場合は終了
-            if len(restaurants_data) >= max_records:
-                break
-            
-            # 次のページへ（>ボタンをクリック）
-            try:
-                time.sleep(3)
-                
-                # 複数のパターンで次ページボタンを探す
-                next_button = None
-                next_selectors = [
-                    "//a[text()='>']",
-                    "//a[contains(@class, 'next')]",
-                    "//a[contains(text(), '次へ')]",
-                    "//button[contains(@class, 'next')]"
-                ]
-                
-                for selector in next_selectors:
-                    try:
-                        next_button = driver.find_element(By.XPATH, selector)
-                        break
-                    except:
-                        continue
-                
-                if next_button:
-                    driver.execute_script("arguments[0].click();", next_button)
-                    time.sleep(3)
-                else:
-                    print("No next page button found")
-                    break
-                    
-            except Exception as e:
-                print(f"Cannot find next page button: {e}")
-                break
+            else:
+                print(f"✗ Failed or empty data")
     
-    finally:
-        driver.quit()
+    if restaurants_data:
+        elapsed = time.perf_counter() - start
+        print(f"\nElapsed: {elapsed:.1f}s ({elapsed / len(restaurants_data):.1f}s per record)")
+    print(frontier.summary())
+    selenium_waits.stats.report()
     
     return restaurants_data
 
@@ -380,8 +242,9 @@ def main():
     print("\nStarting scraping process...")
     print("ChromeDriver will be launched...")
     
-    # スクレイピング実行
-    restaurants_data = scrape_restaurant_list(search_url, max_records=50)
+    # スクレイピング実行（取得したレコードはその都度CSVに追記する）
+    with csv_sink.CSVSink('1-2.csv') as sink:
+        restaurants_data = scrape_restaurant_list(search_url, max_records=50, on_record=sink.write)
     
     # 結果の表示
     print("\n" + "=" * 60)
@@ -389,21 +252,10 @@ def main():
     print(f"Total records collected: {len(restaurants_data)}")
     print("=" * 60)
     
-    if restaurants_data:
-        # DataFrameに変換
-        df = pd.DataFrame(restaurants_data)
-        
-        # カラムの順序を指定
-        columns_order = ['店舗名', '電話番号', 'メールアドレス', '都道府県', '市区町村', '番地', '建物名', 'URL', 'SSL']
-        df = df[columns_order]
-        
-        # CSV出力（Excel対応のためBOM付きUTF-8）
-        output_file = '1-2.csv'
-        df.to_csv(output_file, index=False, encoding='utf-8-sig')
-        
-        print(f"\n✓ Data saved to: {output_file}")
+    if sink.rows:
+        print(f"\n{sink.summary()}")
         print("\nSample data (first 3 records):")
-        print(df.head(3).to_string())
+        print(pd.DataFrame(sink.sample).to_string())
     else:
         print("\n✗ No data collected. Please check the URL and selectors.")
 
@@ -0,0 +1,105 @@
+import os
+import queue
+import threading
+
+
+POOL_SIZE = min(4, os.cpu_count() or 1)  # 同時に動かす Chrome の数（1つでCPU1コア分くらい使う）
+RECYCLE_AFTER = 30  # この件数の作業をしたドライバーは作り直す（Chrome のメモリが増え続けるのを抑える）
+
+
+class DriverPool:
+    """複数の Selenium ドライバーをスレッドで動かし、共有キューの作業を処理する
+
+    setup_driver(): ドライバーを作る関数（各スレッドで1つずつ作り、recycle_after 件ごとに作り直す）
+    handle(driver, task) -> 結果: 1件の作業（検索ページ・店舗ページなど）を処理する関数
+
+    submit() で作業を入れ、results() で (作業, 結果) を終わった順に受け取る。
+    handle で例外が出たら結果はその例外になり、そのドライバーは作り直す。
+    results() を途中で抜けたら、close() で残りの作業を捨ててドライバーを閉じる。
+    """
+
+    def __init__(self, setup_driver, handle, size=POOL_SIZE, recycle_after=RECYCLE_AFTER):
+        self.setup_driver = setup_driver
+        self.handle = handle
+        self.recycle_after = recycle_after
+        self._tasks = queue.PriorityQueue()
+        self._results = queue.Queue()
+        self._seq = 0
+        self._outstanding = 0
+        self._stop = threading.Event()
+        self._workers = [
+            threading.Thread(target=self._work, name=f'driver-{i}', daemon=True) for i in range(size)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, task, priority=0):
+        """作業を入れる（priority が小さいものから処理。同じなら入れた順）"""
+        self._seq += 1
+        self._outstanding += 1
+        self._tasks.put((priority, self._seq, task))
+
+    def results(self):
+        """(作業, 結果) を終わった順に返す（ループの中で submit した作業も含めて、全部終わるまで）
+
+        ワーカーがすべて止まったら、残りの作業があっても終わる（結果を待ち続けない）。
+        """
+        while self._outstanding:
+            try:
+                task, result = self._results.get(timeout=1)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in self._workers):
+                    return
+                continue
+            self._outstanding -= 1
+            yield task, result
+
+    def _work(self):
+        driver = None
+        done = 0
+        try:
+            while True:
+                _, _, task = self._tasks.get()
+                if task is None or self._stop.is_set():
+                    return
+                try:
+                    # ドライバーの起動・作り直しに失敗したときも、その作業の結果を例外にする
+                    if driver is None or done >= self.recycle_after:
+                        if driver is not None:
+                            _quit(driver)
+                            driver = None
+                        driver = self.setup_driver()
+                        done = 0
+                    result = self.handle(driver, task)
+                    done += 1
+                except Exception as e:
+                    result = e
+                    if driver is not None:
+                        _quit(driver)
+                        driver = None
+                self._results.put((task, result))
+        finally:
+            if driver is not None:
+                _quit(driver)
+
+    def close(self):
+        """残りの作業を捨て、処理中の作業が終わるのを待ってドライバーを閉じる"""
+        self._stop.set()
+        for i, _ in enumerate(self._workers):
+            # 優先度 -1 で、残っている作業より先に受け取らせる
+            self._tasks.put((-1, i, None))
+        for worker in self._workers:
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
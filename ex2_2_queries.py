@@ -0,0 +1,112 @@
+from ex2_2_schema import INDEX_AREA, INDEX_SSL, INDEX_URL, TABLE
+
+
+# よく使う検索。(SQL, 使うはずの索引, EXPLAIN で確かめるときのパラメータ)
+# どれも ex2_2_schema の索引だけで絞り込め、件数を数えるものは索引だけで答えが出る（表を読まない）
+QUERIES = {
+    'area_count': (
+        f"SELECT COUNT(*) FROM `{TABLE}` WHERE `都道府県` = %s AND `市区町村` = %s",
+        INDEX_AREA, ('東京都', '新宿区'),
+    ),
+    'stores_in_area': (
+        f"SELECT `store_id`, `店舗名`, `電話番号`, `番地`, `建物名`, `URL`, `SSL` FROM `{TABLE}`"
+        " WHERE `都道府県` = %s AND `市区町村` = %s LIMIT %s",
+        INDEX_AREA, ('東京都', '新宿区', 20),
+    ),
+    'area_counts': (
+        f"SELECT `都道府県`, `市区町村`, COUNT(*) FROM `{TABLE}` GROUP BY `都道府県`, `市区町村`",
+        INDEX_AREA, (),
+    ),
+    'find_by_url': (
+        f"SELECT `store_id`, `店舗名`, `都道府県`, `市区町村`, `SSL` FROM `{TABLE}` WHERE `URL` = %s",
+        INDEX_URL, ('https://example.com/',),
+    ),
+    'url_count': (
+        f"SELECT COUNT(`URL`) FROM `{TABLE}`",
+        INDEX_URL, (),
+    ),
+    'ssl_counts': (
+        f"SELECT `SSL`, COUNT(*) FROM `{TABLE}` GROUP BY `SSL`",
+        INDEX_SSL, (),
+    ),
+    'without_ssl': (
+        f"SELECT `store_id`, `店舗名`, `URL` FROM `{TABLE}` WHERE `SSL` = 0 AND `都道府県` = %s LIMIT %s",
+        INDEX_SSL, ('東京都', 20),
+    ),
+    'latest': (
+        f"SELECT `store_id`, `店舗名`, `都道府県`, `市区町村`, `URL`, `SSL` FROM `{TABLE}` ORDER BY `id` DESC LIMIT %s",
+        'PRIMARY', (5,),
+    ),
+}
+
+
+def _run(connection, name, params):
+    with connection.cursor() as cursor:
+        cursor.execute(QUERIES[name][0], params)
+        return cursor.fetchall()
+
+
+def area_count(connection, prefecture, city):
+    """都道府県・市区町村の店舗数"""
+    return _run(connection, 'area_count', (prefecture, city))[0][0]
+
+
+def stores_in_area(connection, prefecture, city, limit=20):
+    """都道府県・市区町村の店舗（store_id, 店舗名, 電話番号, 番地, 建物名, URL, SSL）"""
+    return _run(connection, 'stores_in_area', (prefecture, city, limit))
+
+
+def area_counts(connection):
+    """(都道府県, 市区町村, 店舗数) の一覧"""
+    return _run(connection, 'area_counts', ())
+
+
+def find_by_url(connection, url):
+    """公式サイトのURLが url の店舗（store_id, 店舗名, 都道府県, 市区町村, SSL）"""
+    return _run(connection, 'find_by_url', (url,))
+
+
+def url_count(connection):
+    """URL（公式サイト）がある店舗数"""
+    return _run(connection, 'url_count', ())[0][0]
+
+
+def ssl_counts(connection):
+    """{SSL: 店舗数}"""
+    return {bool(ssl): count for ssl, count in _run(connection, 'ssl_counts', ())}
+
+
+def without_ssl(connection, prefecture, limit=20):
+    """都道府県のうち公式サイトが SSL 非対応の店舗（store_id, 店舗名, URL）"""
+    return _run(connection, 'without_ssl', (prefecture, limit))
+
+
+def latest(connection, limit=5):
+    """最後に追加した店舗（store_id, 店舗名, 都道府県, 市区町村, URL, SSL）"""
+    return _run(connection, 'latest', (limit,))
+
+
+def explain(connection, name, params=None):
+    """QUERIES[name] の EXPLAIN の行（列名 → 値の dict のリスト）"""
+    sql, _, sample = QUERIES[name]
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN ' + sql, sample if params is None else params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def check_plans(connection):
+    """どの検索も想定の索引を使うか EXPLAIN で確かめ、使っていない検索の名前と実際の key を返す
+
+    行が少ないうちはオプティマイザが全件読みを選ぶことがある（type=ALL, key=None）ので、
+    ある程度データを入れてから確かめる。
+    """
+    problems = {}
+    for name, (_, index, _) in QUERIES.items():
+        plan = explain(connection, name)[0]
+        if plan.get('key') != index:
+            problems[name] = plan.get('key')
+            print(f"⚠ {name}: 索引 {index} ではなく {plan.get('key')}（type={plan.get('type')}）")
+    if not problems:
+        print(f"実行計画OK: {len(QUERIES)} 件の検索がすべて索引を使用")
+    return problems
@@ -0,0 +1,158 @@
+import time
+
+
+TABLE = 'ex2_2'
+VERSION_TABLE = 'ex2_2_schema_version'
+PARTITIONS = 8  # partition=True のとき都道府県で分けるパーティション数（KEY パーティション）
+
+# 索引の名前（ex2_2_queries の EXPLAIN の確認でも使う）
+INDEX_AREA = 'idx_ex2_2_area'  # (都道府県, 市区町村)
+INDEX_URL = 'idx_ex2_2_url'  # (URL)
+INDEX_SSL = 'idx_ex2_2_ssl'  # (SSL, 都道府県)
+
+# バージョンごとの手順（上から順に1回だけ流す）。手順は (SQL, 済みかどうかの条件) で、
+# MySQL の ALTER TABLE は1文ごとに暗黙にコミットされるため、途中で失敗したバージョンを流し直したときに
+# 条件が満たされている（列・索引がもうある）手順は飛ばす。条件が None の手順は何度流してもよいもの。
+# SSL は MySQL の予約語なので列名はすべて `` で囲む
+MIGRATIONS = [
+    (1, '初期のテーブル（id と9項目）', [
+        # URL(VARCHAR(512), utf8mb4 で最大2048バイト) の索引を作れるよう ROW_FORMAT=DYNAMIC（索引の上限 3072 バイト）
+        (f"CREATE TABLE IF NOT EXISTS `{TABLE}` (`id` INT AUTO_INCREMENT PRIMARY KEY, `店舗名` VARCHAR(255),"
+         " `電話番号` VARCHAR(50), `メールアドレス` VARCHAR(255), `都道府県` VARCHAR(50), `市区町村` VARCHAR(100),"
+         " `番地` VARCHAR(255), `建物名` VARCHAR(255), `URL` VARCHAR(512), `SSL` BOOLEAN,"
+         " `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+         " ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 ROW_FORMAT=DYNAMIC", None),
+    ]),
+    (2, '店舗IDと content_hash（1店1行で同期する）', [
+        (f"ALTER TABLE `{TABLE}` ADD COLUMN `store_id` VARCHAR(32) NULL AFTER `id`", ('column', 'store_id')),
+        (f"ALTER TABLE `{TABLE}` ADD COLUMN `content_hash` CHAR(32) NOT NULL DEFAULT '' AFTER `SSL`",
+         ('column', 'content_hash')),
+        (f"ALTER TABLE `{TABLE}` ADD COLUMN `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+         " ON UPDATE CURRENT_TIMESTAMP", ('column', 'updated_at')),
+        # 店舗IDのない以前の行は id から仮のIDを付ける（content_hash が空なので次の同期では別の店として扱う）
+        (f"UPDATE `{TABLE}` SET `store_id` = CONCAT('legacy-', `id`) WHERE `store_id` IS NULL", None),
+        (f"ALTER TABLE `{TABLE}` MODIFY `store_id` VARCHAR(32) NOT NULL", None),
+        (f"ALTER TABLE `{TABLE}` ADD UNIQUE KEY `uk_ex2_2_store_id` (`store_id`)", ('index', 'uk_ex2_2_store_id')),
+    ]),
+    (3, '地域・URL・SSL の索引', [
+        # 以前の版で ROW_FORMAT を指定せずに作ったテーブル（COMPACT だと URL の索引が上限 767 バイトを超える）
+        (f"ALTER TABLE `{TABLE}` ROW_FORMAT=DYNAMIC", ('row_format', 'Dynamic')),
+        (f"ALTER TABLE `{TABLE}` ADD INDEX `{INDEX_AREA}` (`都道府県`, `市区町村`)", ('index', INDEX_AREA)),
+        (f"ALTER TABLE `{TABLE}` ADD INDEX `{INDEX_URL}` (`URL`)", ('index', INDEX_URL)),
+        (f"ALTER TABLE `{TABLE}` ADD INDEX `{INDEX_SSL}` (`SSL`, `都道府県`)", ('index', INDEX_SSL)),
+    ]),
+    # partition=True のときだけ。パーティションの列はすべての UNIQUE キーに含める必要があるため、
+    # 主キーは (id, 都道府県)、店舗IDの一意性は (store_id, 都道府県) になる（店の都道府県が変わると別の行になる）
+    (4, '都道府県でパーティション分割', [
+        (f"UPDATE `{TABLE}` SET `都道府県` = '' WHERE `都道府県` IS NULL", None),
+        (f"ALTER TABLE `{TABLE}` MODIFY `都道府県` VARCHAR(50) NOT NULL DEFAULT ''", None),
+        (f"ALTER TABLE `{TABLE}` DROP PRIMARY KEY, ADD PRIMARY KEY (`id`, `都道府県`)",
+         ('index', 'PRIMARY', '都道府県')),
+        (f"ALTER TABLE `{TABLE}` DROP INDEX `uk_ex2_2_store_id`,"
+         " ADD UNIQUE KEY `uk_ex2_2_store_id` (`store_id`, `都道府県`)", ('index', 'uk_ex2_2_store_id', '都道府県')),
+        (f"ALTER TABLE `{TABLE}` PARTITION BY KEY (`都道府県`) PARTITIONS {PARTITIONS}", ('partitioned',)),
+    ]),
+]
+LATEST = 3  # partition=False で上げるバージョン
+PARTITIONED = 4
+
+
+def _table_exists(cursor, table):
+    cursor.execute("SELECT COUNT(*) FROM information_schema.TABLES"
+                   " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,))
+    return cursor.fetchone()[0] > 0
+
+
+def _has_column(cursor, column):
+    cursor.execute("SELECT COUNT(*) FROM information_schema.COLUMNS"
+                   " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s", (TABLE, column))
+    return cursor.fetchone()[0] > 0
+
+
+def _has_index(cursor, index, column=None):
+    # column を指定したら、その列を含む索引があるときだけ True
+    sql = ("SELECT COUNT(*) FROM information_schema.STATISTICS"
+           " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s")
+    params = (TABLE, index)
+    if column is not None:
+        sql += " AND COLUMN_NAME = %s"
+        params += (column,)
+    cursor.execute(sql, params)
+    return cursor.fetchone()[0] > 0
+
+
+def _done(cursor, guard):
+    """手順の条件が満たされている（流さなくてよい）ならTrue"""
+    if guard is None:
+        return False
+    kind, *args = guard
+    if kind == 'column':
+        return _has_column(cursor, *args)
+    if kind == 'index':
+        return _has_index(cursor, *args)
+    if kind == 'row_format':
+        cursor.execute("SELECT ROW_FORMAT FROM information_schema.TABLES"
+                       " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (TABLE,))
+        row = cursor.fetchone()
+        return bool(row) and str(row[0]).lower() == args[0].lower()
+    if kind == 'partitioned':
+        cursor.execute("SELECT COUNT(*) FROM information_schema.PARTITIONS"
+                       " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL",
+                       (TABLE,))
+        return cursor.fetchone()[0] > 0
+    raise ValueError(f"不明な条件: {guard}")
+
+
+def _detect_version(cursor):
+    # バージョン表がない（このモジュール以前に作った）ex2_2 の状態を列・索引から推定する
+    # （途中まで流れたバージョンは低いほうに推定し、流し直すときに済んだ手順を飛ばす）
+    if not _table_exists(cursor, TABLE):
+        return 0
+    if not _has_index(cursor, 'uk_ex2_2_store_id'):
+        return 1
+    if not all(_has_index(cursor, index) for index in (INDEX_AREA, INDEX_URL, INDEX_SSL)):
+        return 2
+    return 3
+
+
+def current_version(connection):
+    """ex2_2 のスキーマのバージョン（テーブルがなければ 0）"""
+    with connection.cursor() as cursor:
+        if _table_exists(cursor, VERSION_TABLE):
+            cursor.execute(f"SELECT MAX(`version`) FROM `{VERSION_TABLE}`")
+            version = cursor.fetchone()[0]
+            if version is not None:
+                return version
+        return _detect_version(cursor)
+
+
+def migrate(connection, partition=False):
+    """ex2_2 を最新のスキーマまで上げ、流したバージョンのリストを返す
+
+    connection: pymysql の接続（SQLAlchemy なら engine.raw_connection()）
+    partition: True なら都道府県でのパーティション分割（バージョン 4）まで上げる
+    MySQL の ALTER TABLE は暗黙にコミットされるので、終わったバージョンはすぐ記録し、途中で失敗した
+    バージョンは次の実行で流し直す（列・索引の追加など、済んでいる手順は information_schema を見て飛ばす）。
+    """
+    target = PARTITIONED if partition else LATEST
+    version = current_version(connection)
+    applied = []
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS `{VERSION_TABLE}` (`version` INT PRIMARY KEY,"
+                       " `description` VARCHAR(255), `applied_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+                       " ENGINE=InnoDB DEFAULT CHARSET=utf8mb4")
+        for number, description, statements in MIGRATIONS:
+            if number <= version or number > target:
+                continue
+            start = time.perf_counter()
+            for sql, guard in statements:
+                if not _done(cursor, guard):
+                    cursor.execute(sql)
+            cursor.execute(f"INSERT INTO `{VERSION_TABLE}` (`version`, `description`) VALUES (%s, %s)",
+                           (number, description))
+            connection.commit()
+            applied.append(number)
+            print(f"スキーマ v{number}: {description}（{time.perf_counter() - start:.1f} 秒）")
+    if not applied:
+        print(f"スキーマ v{version}: 最新です")
+    return applied
@@ -0,0 +1,29 @@
+import argparse
+import time
+
+import pandas as pd
+
+import address_engine
+
+
+def main():
+    """既存のCSVの 都道府県/市区町村/番地/建物名 を address_engine で分割し直す（再クロール不要）"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('csv_files', nargs='*', default=['1-1.csv', '1-2.csv'])
+    args = parser.parse_args()
+
+    for csv_file in args.csv_files:
+        df = pd.read_csv(csv_file, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+
+        start = time.perf_counter()
+        before = df[address_engine.ADDRESS_COLUMNS].copy()
+        df[address_engine.ADDRESS_COLUMNS] = address_engine.split_addresses(before)
+        elapsed = time.perf_counter() - start
+
+        changed = (before != df[address_engine.ADDRESS_COLUMNS]).any(axis=1).sum()
+        df.to_csv(csv_file, index=False, encoding='utf-8-sig')
+        print(f"{csv_file}: {len(df)} 件中 {changed} 件を修正しました ({elapsed:.2f} 秒)")
+
+
+if __name__ == '__main__':
+    main()
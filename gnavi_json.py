@@ -0,0 +1,182 @@
+import json
+import re
+from collections import deque
+from urllib.parse import parse_qs, urlparse
+
+
+# DOMを作らずにHTMLのバイト列から埋め込みJSONを切り出すための目印
+_NEXT_DATA_START = b'<script id="__NEXT_DATA__"'
+_LD_JSON_TYPE = b'application/ld+json'
+_SCRIPT_END = b'</script>'
+
+# 店舗を表す schema.org の型
+_STORE_TYPES = {'Restaurant', 'FoodEstablishment', 'LocalBusiness', 'BarOrPub', 'CafeOrCoffeeShop', 'Store'}
+
+_MAILTO_PATTERN = re.compile(rb'href="mailto:([^"?]+)')
+_REDIRECT_PATTERN = re.compile(rb'<a\s[^>]*href="([^"]*url\.asp\?[^"]*)"[^>]*>(.*?)</a>', re.DOTALL)
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+# 公式サイトへのリンクの文言（DOM で探すときと同じ。広告などのリダイレクトを公式URLにしない）
+_OFFICIAL_KEYWORDS = ('ホームページ', '公式', 'HP')
+
+
+def _to_bytes(html):
+    return html.encode('utf-8') if isinstance(html, str) else html
+
+
+def _script_body(raw, start):
+    """start以降にある<script ...>タグの中身を返す"""
+    open_end = raw.find(b'>', start)
+    close = raw.find(_SCRIPT_END, open_end)
+    if open_end == -1 or close == -1:
+        return None, -1
+    return raw[open_end + 1:close], close
+
+
+def json_blocks(html):
+    """__NEXT_DATA__ と application/ld+json のJSONを (next_data, [ld_json, ...]) で返す"""
+    raw = _to_bytes(html)
+
+    next_data = None
+    start = raw.find(_NEXT_DATA_START)
+    if start != -1:
+        body, _ = _script_body(raw, start)
+        try:
+            next_data = json.loads(body) if body else None
+        except ValueError:
+            next_data = None
+
+    ld_json = []
+    start = raw.find(_LD_JSON_TYPE)
+    while start != -1:
+        body, end = _script_body(raw, start)
+        if body is None:
+            break
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        # @graph や配列でまとめて書かれている場合も1件ずつに展開
+        if isinstance(data, dict) and isinstance(data.get('@graph'), list):
+            ld_json.extend(data['@graph'])
+        elif isinstance(data, list):
+            ld_json.extend(data)
+        elif data is not None:
+            ld_json.append(data)
+        start = raw.find(_LD_JSON_TYPE, end)
+
+    return next_data, ld_json
+
+
+def _types(item):
+    types = item.get('@type', [])
+    return set(types) if isinstance(types, list) else {types}
+
+
+def _join_address(address):
+    if isinstance(address, str):
+        return address
+    if isinstance(address, dict):
+        parts = [address.get(key) or '' for key in ('addressRegion', 'addressLocality', 'streetAddress')]
+        return ''.join(parts)
+    return ''
+
+
+def _official_url(url):
+    if isinstance(url, list):
+        url = url[0] if url else ''
+    if isinstance(url, str) and url.startswith('http') and 'gnavi.co.jp' not in url:
+        return url
+    return ''
+
+
+def _find_store_in_next_data(data):
+    """__NEXT_DATA__ の中から店舗情報らしいdict（電話番号と住所を持つもの）を探す
+
+    幅優先・出現順にたどり、最初に見つかったもの（ページの店舗。近くの店・おすすめの店より浅く前にある）を返す
+    """
+    queue = deque([data])
+    while queue:
+        node = queue.popleft()
+        if isinstance(node, dict):
+            tel = node.get('tel') or node.get('telephone') or node.get('phone')
+            address = node.get('address') or node.get('addr')
+            name = node.get('name') or node.get('name1') or node.get('shopName')
+            if isinstance(tel, str) and address and isinstance(name, str):
+                return {
+                    '店舗名': name,
+                    '電話番号': tel,
+                    '住所': _join_address(address),
+                    'URL': _official_url(node.get('homepage') or node.get('url')),
+                }
+            queue.extend(node.values())
+        elif isinstance(node, list):
+            queue.extend(node)
+    return None
+
+
+def extract_store(html):
+    """店舗ページの埋め込みJSONから 店舗名/電話番号/住所/URL/メールアドレス を取り出す（なければNone）"""
+    raw = _to_bytes(html)
+    next_data, ld_json = json_blocks(raw)
+
+    fields = None
+    for item in ld_json:
+        if isinstance(item, dict) and _types(item) & _STORE_TYPES:
+            fields = {
+                '店舗名': item.get('name') or '',
+                '電話番号': item.get('telephone') or '',
+                '住所': _join_address(item.get('address')),
+                'URL': _official_url(item.get('url')) or _official_url(item.get('sameAs')),
+            }
+            break
+    if fields is None and next_data is not None:
+        fields = _find_store_in_next_data(next_data)
+    if fields is None:
+        return None
+
+    fields['電話番号'] = re.sub(r'\s+', '', fields['電話番号'])
+    fields['住所'] = re.sub(r'\s+', '', fields['住所'])
+
+    # メールアドレスと公式URLはJSONにないことが多いので、バイト列から直接探す
+    fields['メールアドレス'] = ''
+    mailto = _MAILTO_PATTERN.search(raw)
+    if mailto:
+        fields['メールアドレス'] = mailto.group(1).decode('utf-8', errors='replace').strip()
+    if not fields['URL']:
+        for match in _REDIRECT_PATTERN.finditer(raw):
+            text = _TAG_PATTERN.sub('', match.group(2).decode('utf-8', errors='replace'))
+            if not any(keyword in text for keyword in _OFFICIAL_KEYWORDS):
+                continue
+            href = match.group(1).decode('utf-8', errors='replace').replace('&amp;', '&')
+            params = parse_qs(urlparse(href).query)
+            if 'url' in params:
+                fields['URL'] = params['url'][0]
+                break
+
+    return fields
+
+
+def to_record(fields, split_address):
+    """extract_store() の結果をCSVと同じ9カラムのレコードにする（SSLは呼び出し側でチェック）"""
+    prefecture, city, street, building = split_address(fields['住所'])
+    return {
+        '店舗名': fields['店舗名'],
+        '電話番号': fields['電話番号'],
+        'メールアドレス': fields['メールアドレス'],
+        '都道府県': prefecture,
+        '市区町村': city,
+        '番地': street,
+        '建物名': building,
+        'URL': fields['URL'],
+        'SSL': False
+    }
+
+
+def listing_links(html):
+    """一覧ページの ItemList(JSON-LD) から店舗ページのURLを返す（なければ空リスト）"""
+    _, ld_json = json_blocks(html)
+    for item in ld_json:
+        if isinstance(item, dict) and 'ItemList' in _types(item):
+            return [element['url'] for element in item.get('itemListElement', [])
+                    if isinstance(element, dict) and element.get('url')]
+    return []
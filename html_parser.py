@@ -0,0 +1,307 @@
+import os
+import re
+
+from bs4 import BeautifulSoup
+from bs4.element import CData, NavigableString, Tag
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    HAS_SELECTOLAX = False
+
+
+# 環境変数 HTML_PARSER で切り替え（html.parser / lxml / selectolax）
+DEFAULT_BACKEND = os.environ.get('HTML_PARSER') or ('lxml' if HAS_LXML else 'html.parser')
+
+# get_text() の対象外にするタグ（BeautifulSoupと同じくscript/styleの中身は含めない）
+_INVISIBLE_TAGS = ('script', 'style', 'template')
+_INVISIBLE_SELECTOR = ', '.join(_INVISIBLE_TAGS)
+# BeautifulSoupで値がリストになる属性
+_MULTI_VALUED_ATTRIBUTES = {'class', 'rel', 'rev', 'headers', 'accept-charset'}
+# walk() で返すテキストの型（コメントやscript内の文字列は除く）
+_VISIBLE_STRING_TYPES = (NavigableString, CData)
+_END = ('end',)
+
+
+def available_backends():
+    """この環境で使えるバックエンドの一覧"""
+    backends = ['html.parser']
+    if HAS_LXML:
+        backends.append('lxml')
+    if HAS_SELECTOLAX:
+        backends.append('selectolax')
+    return backends
+
+
+def make_soup(markup, backend=None):
+    """HTMLをパースしてBeautifulSoup互換のオブジェクトを返す"""
+    backend = backend or DEFAULT_BACKEND
+    if backend == 'selectolax':
+        if not HAS_SELECTOLAX:
+            raise ValueError("selectolax がインストールされていません (pip install selectolax)")
+        if isinstance(markup, bytes):
+            markup = markup.decode('utf-8', errors='replace')
+        tree = LexborHTMLParser(markup)
+        return SelectolaxNode(tree.root, tree)
+    if backend == 'lxml' and not HAS_LXML:
+        raise ValueError("lxml がインストールされていません (pip install lxml)")
+    return BeautifulSoup(markup, backend)
+
+
+def walk(soup):
+    """文書順に ('start', タグ名, 属性) / ('text', 文字列) / ('end',) を返す（1回の走査用）
+
+    text は get_text() と同じく表示されるテキストだけ（script/style/コメントは含めない）
+    """
+    if isinstance(soup, SelectolaxNode):
+        yield from _walk_selectolax(soup._node)
+        return
+
+    stack = [iter(soup.contents)]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            if stack:
+                yield _END
+            continue
+        if isinstance(child, Tag):
+            yield ('start', child.name, child.attrs)
+            stack.append(iter(child.contents))
+        elif type(child) in _VISIBLE_STRING_TYPES:
+            yield ('text', str(child))
+
+
+def _walk_selectolax(root):
+    stack = [root.iter(include_text=True)]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            if stack:
+                yield _END
+            continue
+        tag = child.tag
+        if tag == '-text':
+            if child.parent.tag not in _INVISIBLE_TAGS:
+                yield ('text', child.text_content or '')
+        elif not tag.startswith('-') and not tag.startswith('_'):
+            attrs = {}
+            for key, value in child.attributes.items():
+                value = value or ''
+                attrs[key] = value.split() if key in _MULTI_VALUED_ATTRIBUTES else value
+            yield ('start', tag, attrs)
+            stack.append(child.iter(include_text=True))
+
+
+class SelectolaxString(str):
+    """find_all(text=...) が返すテキストノード（.parent で親要素を参照できる）"""
+
+    def __new__(cls, text, parent):
+        string = super().__new__(cls, text)
+        string.parent = parent
+        return string
+
+
+class SelectolaxNode:
+    """selectolax(lexbor)のノードを select_one/find_all/get_text で扱えるようにしたラッパー"""
+
+    def __init__(self, node, tree):
+        self._node = node
+        self._tree = tree
+
+    def _wrap(self, node):
+        return SelectolaxNode(node, self._tree) if node is not None else None
+
+    def __eq__(self, other):
+        return isinstance(other, SelectolaxNode) and self._node.mem_id == other._node.mem_id
+
+    def __hash__(self):
+        return self._node.mem_id
+
+    def __repr__(self):
+        return f"<{self.name}>"
+
+    # 属性
+    @property
+    def name(self):
+        return self._node.tag
+
+    @property
+    def attrs(self):
+        return {key: self.get(key) for key in self._node.attributes}
+
+    def get(self, key, default=None):
+        value = self._node.attributes.get(key, default)
+        if value is None:
+            return '' if key in self._node.attributes else default
+        if key in _MULTI_VALUED_ATTRIBUTES:
+            return value.split()
+        return value
+
+    def __getitem__(self, key):
+        if key not in self._node.attributes:
+            raise KeyError(key)
+        return self.get(key)
+
+    def has_attr(self, key):
+        return key in self._node.attributes
+
+    # テキスト
+    def get_text(self, separator='', strip=False):
+        if self._node.css_first(_INVISIBLE_SELECTOR) is None:
+            return self._node.text(deep=True, separator=separator, strip=strip)
+        # script/style を含む場合はその中身を飛ばしてテキストを集める
+        strings = []
+        for node in self._node.traverse(include_text=True):
+            if node.tag != '-text' or node.parent.tag in _INVISIBLE_TAGS:
+                continue
+            string = node.text_content or ''
+            if strip:
+                string = string.strip()
+                if not string:
+                    continue
+            strings.append(string)
+        return separator.join(strings)
+
+    @property
+    def text(self):
+        return self.get_text()
+
+    @property
+    def string(self):
+        children = list(self._node.iter(include_text=True))
+        if len(children) != 1:
+            return None
+        child = children[0]
+        if child.tag == '-text':
+            return SelectolaxString(child.text_content or '', self)
+        return self._wrap(child).string
+
+    @property
+    def title(self):
+        return self.find('title')
+
+    # ツリーの移動
+    @property
+    def parent(self):
+        return self._wrap(self._node.parent)
+
+    def find_parent(self, name=None, **attrs):
+        parent = self.parent
+        while parent is not None:
+            if _matches(parent, name, attrs, None):
+                return parent
+            parent = parent.parent
+        return None
+
+    @property
+    def children(self):
+        for child in self._node.iter(include_text=True):
+            if child.tag == '-text':
+                yield SelectolaxString(child.text_content or '', self)
+            elif not child.tag.startswith('_') and not child.tag.startswith('-'):
+                yield self._wrap(child)
+
+    def _descendants(self, include_text=False):
+        nodes = self._node.traverse(include_text=include_text)
+        next(nodes, None)  # traverse() は自分自身から始まる
+        return nodes
+
+    # 検索
+    def select_one(self, selector):
+        return self._wrap(self._node.css_first(selector))
+
+    def select(self, selector):
+        return [self._wrap(node) for node in self._node.css(selector)]
+
+    def find_all(self, name=None, attrs=None, recursive=True, text=None, limit=None, string=None, **kwargs):
+        attrs = dict(attrs or {}, **kwargs)
+        if 'class_' in attrs:
+            attrs['class'] = attrs.pop('class_')
+        text = string if string is not None else text
+        results = []
+
+        # テキストだけを条件にした場合はBeautifulSoupと同じく文字列を返す
+        if text is not None and name is None and not attrs:
+            for node in self._descendants(include_text=True):
+                if node.tag == '-text' and _match_value(node.text_content or '', text):
+                    results.append(SelectolaxString(node.text_content, self._wrap(node.parent)))
+                    if limit and len(results) >= limit:
+                        break
+            return results
+
+        nodes = self._descendants() if recursive else self._node.iter()
+        for node in nodes:
+            if node.tag.startswith('-') or node.tag.startswith('_'):
+                continue
+            element = self._wrap(node)
+            if _matches(element, name, attrs, text):
+                results.append(element)
+                if limit and len(results) >= limit:
+                    break
+        return results
+
+    def find(self, name=None, attrs=None, recursive=True, text=None, string=None, **kwargs):
+        results = self.find_all(name, attrs, recursive, text, limit=1, string=string, **kwargs)
+        return results[0] if results else None
+
+    def find_next(self, name=None, attrs=None, text=None, **kwargs):
+        """文書順でこの要素より後ろにある最初の一致要素"""
+        attrs = dict(attrs or {}, **kwargs)
+        passed = False
+        for node in self._tree.root.traverse():
+            if not passed:
+                passed = node.mem_id == self._node.mem_id
+                continue
+            element = self._wrap(node)
+            if _matches(element, name, attrs, text):
+                return element
+        return None
+
+
+def _match_value(value, condition):
+    if condition is True:
+        return value is not None
+    if value is None:
+        return False
+    if isinstance(condition, re.Pattern):
+        return condition.search(value) is not None
+    if callable(condition):
+        return condition(value)
+    return value == condition
+
+
+def _matches(element, name, attrs, text):
+    if name is not None:
+        if callable(name) and not isinstance(name, str):
+            if not name(element):
+                return False
+        elif isinstance(name, (list, tuple, set)):
+            if element.name not in name:
+                return False
+        elif element.name != name:
+            return False
+
+    for key, condition in attrs.items():
+        value = element.get(key)
+        if isinstance(value, list) and not isinstance(condition, bool):
+            # class などはどれか1つが一致すればよい
+            if not any(_match_value(token, condition) for token in value) and \
+                    not _match_value(' '.join(value), condition):
+                return False
+        elif not _match_value(value, condition):
+            return False
+
+    if text is not None:
+        if not _match_value(element.string, text):
+            return False
+
+    return True
@@ -0,0 +1,178 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+CACHE_PATH = '.http_cache.sqlite'
+CACHE_TTL = 24 * 60 * 60  # この秒数以内ならサーバーに問い合わせずキャッシュを返す
+CACHE_MAX_BYTES = 512 * 1024 * 1024  # 超えたら古い順に削除
+
+# 本文はデコード済みで保存するので、転送用のヘッダーは保存しない
+_DROP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+def canonical_url(url):
+    """キャッシュのキー用にURLを正規化（ホスト小文字化・クエリ並べ替え・フラグメント除去）"""
+    parts = urlsplit(url)
+    netloc = parts.netloc.lower()
+    if parts.scheme == 'https' and netloc.endswith(':443'):
+        netloc = netloc[:-4]
+    elif parts.scheme == 'http' and netloc.endswith(':80'):
+        netloc = netloc[:-3]
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path or '/', query, ''))
+
+
+class ResponseCache:
+    """SQLiteに保存するレスポンスキャッシュ（ETag/Last-Modified付き）"""
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB,'
+            ' etag TEXT, last_modified TEXT, fetched_at REAL, accessed_at REAL, size INTEGER)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+        self._conn.commit()
+
+    def get(self, url):
+        """キャッシュ済みのエントリを返す（なければNone）"""
+        key = canonical_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT status, headers, body, etag, last_modified, fetched_at FROM responses WHERE key = ?',
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (time.time(), key))
+            self._conn.commit()
+        status, headers, body, etag, last_modified, fetched_at = row
+        return {
+            'status': status,
+            'headers': json.loads(headers),
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': fetched_at,
+        }
+
+    def is_fresh(self, url):
+        """TTL以内のエントリがあればTrue"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT fetched_at FROM responses WHERE key = ?', (canonical_url(url),)
+            ).fetchone()
+        return row is not None and time.time() - row[0] < self.ttl
+
+    def store(self, url, response):
+        """200のレスポンスを保存し、容量を超えたら古い順に削除"""
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROP_HEADERS}
+        body = response.content
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (canonical_url(url), response.status_code, json.dumps(headers), body,
+                 response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                 now, now, len(body)),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, url, response):
+        """304を受け取ったときに取得時刻（と新しい検証用ヘッダー）を更新"""
+        key = canonical_url(url)
+        with self._lock:
+            self._conn.execute(
+                'UPDATE responses SET fetched_at = ?,'
+                ' etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE key = ?',
+                (time.time(), response.headers.get('ETag'), response.headers.get('Last-Modified'), key),
+            )
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute('SELECT key, size FROM responses ORDER BY accessed_at').fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total -= size
+
+
+def build_response(entry, request):
+    """キャッシュのエントリからrequestsのResponseを組み立て"""
+    response = Response()
+    response.status_code = entry['status']
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    response._content = entry['body']
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.reason = 'OK'
+    response.elapsed = timedelta(0)
+    response.from_cache = True
+    return response
+
+
+class CachingAdapter(HTTPAdapter):
+    """GETをキャッシュし、期限切れなら条件付きGETで再検証するアダプター"""
+
+    def __init__(self, cache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET':
+            return super().send(request, **kwargs)
+
+        entry = self.cache.get(request.url)
+        if entry and time.time() - entry['fetched_at'] < self.cache.ttl:
+            return build_response(entry, request)
+
+        if entry:
+            if entry['etag']:
+                request.headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                request.headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self.cache.refresh(request.url, response)
+            response.close()
+            return build_response(entry, request)
+        if response.status_code == 200:
+            self.cache.store(request.url, response)
+        return response
+
+
+def install_cache(session, path=CACHE_PATH, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES, **adapter_kwargs):
+    """sessionにキャッシュ付きアダプターをマウントしてキャッシュを返す（adapter_kwargs は HTTPAdapter の引数）"""
+    cache = ResponseCache(path, ttl=ttl, max_bytes=max_bytes)
+    adapter = CachingAdapter(cache, **adapter_kwargs)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return cache
+
+
+def is_fresh(session, url):
+    """sessionのキャッシュにTTL以内のページがあればTrue（アクセス間隔の待機を省略できる）"""
+    adapter = session.get_adapter(url)
+    return isinstance(adapter, CachingAdapter) and adapter.cache.is_fresh(url)
@@ -0,0 +1,111 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+
+import http_cache
+
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Accept-Encoding は urllib3 が展開できるものだけ送る（brotli/zstandard が入っていれば br/zstd も付く）
+DEFAULT_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
+    'Accept-Encoding': ACCEPT_ENCODING,
+}
+
+POOL_SIZE = 8  # ホストごとに保持する keep-alive 接続数（crawl_engine の同時取得数に合わせる）
+POOL_HOSTS = 10  # 接続プールを保持するホスト数
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 1.0  # 1, 2, 4 秒...と待つ
+RETRY_JITTER = 0.5  # 待ち時間に足すランダムな秒数（同時に失敗したリクエストがまた同時に再送しないように）
+# 429/503 はここで再送せず、そのまま返して politeness.PolitenessScheduler.observe に間隔を広げさせる
+# （urllib3 が再送するとスケジューラの間隔を無視して同じホストにすぐ送り直してしまう）
+RETRY_STATUSES = (500, 502, 504)
+
+
+def make_retry(total=RETRY_TOTAL):
+    """5xx（503 以外）と接続エラーを再試行する Retry（アクセス制限の 429/503 は再試行しない）"""
+    return Retry(
+        total=total,
+        backoff_factor=RETRY_BACKOFF,
+        backoff_jitter=RETRY_JITTER,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=False,  # True だと Retry-After 付きの 429/503 は status_forcelist になくても再送される
+        raise_on_status=False,  # 再試行しきったら最後のレスポンスをそのまま返す（これまでどおり）
+    )
+
+
+class TimingLog:
+    """レスポンスごとの所要時間を集計する（create_session の on_timing に渡す）"""
+
+    def __init__(self):
+        self.count = 0
+        self.cached = 0
+        self.retried = 0
+        self.seconds = 0.0
+        self.slowest = (0.0, '')
+
+    def __call__(self, url, status, seconds, from_cache, retries):
+        self.count += 1
+        if from_cache:
+            self.cached += 1
+            return
+        self.retried += retries
+        self.seconds += seconds
+        if seconds > self.slowest[0]:
+            self.slowest = (seconds, url)
+
+    def summary(self):
+        fetched = self.count - self.cached
+        average = self.seconds / fetched if fetched else 0.0
+        text = f"通信: {self.count} 件（キャッシュ {self.cached} 件 / 再試行 {self.retried} 回） 平均 {average:.2f} 秒"
+        if self.slowest[1]:
+            text += f" / 最長 {self.slowest[0]:.2f} 秒 {self.slowest[1]}"
+        return text
+
+
+def _timing_hook(on_timing):
+    def hook(response, **kwargs):
+        retries = getattr(response.raw, 'retries', None)
+        on_timing(
+            response.url,
+            response.status_code,
+            response.elapsed.total_seconds(),
+            getattr(response, 'from_cache', False),
+            len(retries.history) if retries else 0,
+        )
+        return response
+    return hook
+
+
+def create_session(headers=None, pool_size=POOL_SIZE, retries=RETRY_TOTAL, cache_path=None, on_timing=None):
+    """全スクリプト共通の requests.Session を作る
+
+    headers: DEFAULT_HEADERS に上書きするヘッダー（各スクリプトの HEADERS）
+    pool_size: ホストごとの keep-alive 接続数（同時に投げるリクエスト数以上にする）
+    cache_path: http_cache のディスクキャッシュのパス（Noneでキャッシュしない）
+    on_timing(url, status, seconds, from_cache, retries): レスポンスごとに呼ばれる（TimingLog など）
+    """
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    if headers:
+        session.headers.update(headers)
+
+    adapter_kwargs = {
+        'pool_connections': POOL_HOSTS,
+        'pool_maxsize': pool_size,
+        'max_retries': make_retry(retries),
+    }
+    if cache_path:
+        http_cache.install_cache(session, cache_path, **adapter_kwargs)
+    else:
+        adapter = HTTPAdapter(**adapter_kwargs)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+    if on_timing:
+        session.hooks['response'].append(_timing_hook(on_timing))
+    return session
@@ -1,12 +1,12 @@
 import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import re
 import time
-import ssl
-import socket
 from urllib.parse import urljoin
 
+import html_parser
+import tls_probe
+
 # ユーザーエージェントの設定
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -14,22 +14,6 @@ HEADERS = {
     'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
 }
 
-def check_ssl(url):
-    """URLのSSL証明書の有無をチェック"""
-    if not url or url == '':
-        return False
-    
-    try:
-        if url.startswith('https://'):
-            hostname = url.split('//')[1].split('/')[0].split(':')[0]
-            context = ssl.create_default_context()
-            with socket.create_connection((hostname, 443), timeout=5) as sock:
-                with context.wrap_socket(sock, server_hostname=hostname) as ssock:
-                    return True
-        return False
-    except Exception:
-        return False
-
 def split_address(full_address):
     """住所を都道府県、市区町村、番地、建物名に分割"""
     prefecture = ''
@@ -89,7 +73,7 @@ def scrape_restaurant_detail(restaurant_url, session):
     try:
         response = session.get(restaurant_url, headers=HEADERS, timeout=15)
         response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = html_parser.make_soup(response.text)
         
         # デバッグ用：ページのテキスト全体を取得
         page_text = soup.get_text()
@@ -212,8 +196,8 @@ def scrape_restaurant_detail(restaurant_url, session):
                         print(f"  公式URL: {official_url}")
                         break
         
-        # SSL
-        has_ssl = check_ssl(official_url)
+        # SSLチェックは開始だけして、一覧の取得が終わってからまとめて結果を受け取る
+        tls_probe.default_probe().submit(official_url)
         
         return {
             '店舗名': name,
@@ -224,7 +208,7 @@ def scrape_restaurant_detail(restaurant_url, session):
             '番地': street,
             '建物名': building,
             'URL': official_url,
-            'SSL': has_ssl
+            'SSL': False
         }
     
     except Exception as e:
@@ -261,7 +245,7 @@ def scrape_restaurant_list(base_search_url, max_records=50):
         try:
             response = session.get(list_url, headers=HEADERS, timeout=15)
             response.encoding = 'utf-8'
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = html_parser.make_soup(response.text)
             
             # 全てのリンクから店舗ページを抽出
             all_links = soup.find_all('a', href=True)
@@ -331,7 +315,7 @@ def scrape_restaurant_list(base_search_url, max_records=50):
             print(f"✗ エラー: {e}")
             break
     
-    return restaurants_data
+    return tls_probe.default_probe().fill_ssl(restaurants_data)
 
 def main():
     """メイン処理"""
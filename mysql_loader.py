@@ -0,0 +1,189 @@
+import hashlib
+import itertools
+import os
+import re
+import tempfile
+import time
+
+import csv_sink
+
+
+BATCH_SIZE = 10_000  # executemany 1回に渡す行数（pymysql が max_allowed_packet 以内の複数行 INSERT に分ける）
+INFILE_CHUNK = 1_000_000  # LOAD DATA の一時ファイル1つに書く行数
+
+_LOAD_DATA_SQL = (
+    "LOAD DATA LOCAL INFILE %s INTO TABLE `{table}` CHARACTER SET utf8mb4"
+    " FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({columns})"
+)
+# LOAD DATA の既定の書式（タブ区切り・\ でエスケープ）。エスケープが要る文字を含む値だけ translate する
+_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+_SPECIAL = re.compile('[\\\\\t\n\r\0]')
+
+
+def _values(row, columns):
+    # レコード(dict)なら columns の順に並べ、タプルならそのまま。NaN（pandas の欠損）は NULL にする
+    values = [row.get(column) for column in columns] if isinstance(row, dict) else list(row)
+    return [None if isinstance(value, float) and value != value else value for value in values]
+
+
+def _field(value):
+    # None と NaN は NULL（\N）
+    if value is None or value != value:
+        return '\\N'
+    if value is True:
+        return '1'
+    if value is False:
+        return '0'
+    value = str(value)
+    return value.translate(_ESCAPES) if _SPECIAL.search(value) else value
+
+
+def _line(row, columns):
+    if isinstance(row, dict):
+        row = [row.get(column) for column in columns]
+    return '\t'.join(map(_field, row)) + '\n'
+
+
+def _driver(connection):
+    # SQLAlchemy の raw_connection() なら中の pymysql の接続を取り出す
+    return getattr(connection, 'driver_connection', connection)
+
+
+def can_load_infile(connection):
+    """クライアントとサーバーの両方で LOAD DATA LOCAL INFILE が使えるならTrue"""
+    from pymysql.constants import CLIENT
+
+    if not _driver(connection).client_flag & CLIENT.LOCAL_FILES:
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW VARIABLES LIKE 'local_infile'")
+        row = cursor.fetchone()
+    return bool(row) and str(row[1]).upper() in ('ON', '1')
+
+
+def load_infile(connection, rows, table, columns=csv_sink.COLUMNS, chunk=INFILE_CHUNK):
+    """行を一時ファイル（タブ区切り）に書き出し、LOAD DATA LOCAL INFILE で読み込む（コミットはしない）"""
+    sql = _LOAD_DATA_SQL.format(table=table, columns=', '.join(f'`{column}`' for column in columns))
+    rows = iter(rows)
+    loaded = 0
+    with connection.cursor() as cursor:
+        while True:
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='\n', suffix='.tsv', delete=False) as f:
+                written = 0
+                for row in itertools.islice(rows, chunk):
+                    f.write(_line(row, columns))
+                    written += 1
+            try:
+                if written:
+                    cursor.execute(sql, (f.name.replace(os.sep, '/'),))
+                    loaded += cursor.rowcount
+            finally:
+                os.remove(f.name)
+            if written < chunk:
+                return loaded
+
+
+def load_executemany(connection, rows, table, columns=csv_sink.COLUMNS, batch_size=BATCH_SIZE):
+    """batch_size 行ずつ executemany で INSERT する（コミットはしない）"""
+    sql = (f"INSERT INTO `{table}` ({', '.join(f'`{column}`' for column in columns)})"
+           f" VALUES ({', '.join(['%s'] * len(columns))})")
+    rows = iter(rows)
+    loaded = 0
+    with connection.cursor() as cursor:
+        while True:
+            batch = [_values(row, columns) for row in itertools.islice(rows, batch_size)]
+            if not batch:
+                return loaded
+            cursor.executemany(sql, batch)
+            loaded += len(batch)
+
+
+def bulk_load(connection, rows, table, columns=csv_sink.COLUMNS, method='auto', batch_size=BATCH_SIZE):
+    """rows（レコードの dict か、columns の順のタプル）を table にまとめて入れ、1回だけコミットする
+
+    connection: pymysql の接続（SQLAlchemy なら engine.raw_connection()）。
+                LOAD DATA を使うには local_infile=True で接続し、サーバーの local_infile も ON にする
+    method: 'infile'（LOAD DATA LOCAL INFILE）/ 'executemany' / 'auto'（使えれば infile）
+    rows はイテレータでよい（先頭から順に読むだけで、全部をメモリには載せない）
+    戻り値: {'rows': 件数, 'seconds': 秒, 'method': 使った方法}
+    """
+    if method == 'auto':
+        method = 'infile' if can_load_infile(connection) else 'executemany'
+
+    driver = _driver(connection)
+    driver.autocommit(False)
+    start = time.perf_counter()
+    try:
+        if method == 'infile':
+            loaded = load_infile(connection, rows, table, columns)
+        else:
+            loaded = load_executemany(connection, rows, table, columns, batch_size)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    seconds = time.perf_counter() - start
+    rate = loaded / seconds if seconds else 0
+    print(f"MySQL保存完了: {loaded:,} 件 / {seconds:.1f} 秒（{rate:,.0f} 件/秒, {method}）")
+    return {'rows': loaded, 'seconds': seconds, 'method': method}
+
+
+def content_hash(record, columns=csv_sink.COLUMNS):
+    """レコードの中身のハッシュ（16進32文字）。値が1つでも変われば変わる"""
+    values = ['' if value is None else str(value) for value in _values(record, columns)]
+    return hashlib.md5('\x1f'.join(values).encode('utf-8')).hexdigest()
+
+
+def upsert(connection, records, table, columns=csv_sink.COLUMNS, key='store_id', batch_size=BATCH_SIZE,
+           verbose=True):
+    """records（key と columns を持つ dict）を key で突き合わせて table に反映し、1回だけコミットする
+
+    batch_size 件ごとに保存済みの content_hash を読み、新しい店と中身が変わった店だけを
+    INSERT ... ON DUPLICATE KEY UPDATE で書く（変わっていない店には書き込まない）。
+    table には key の UNIQUE 制約と content_hash 列が必要。verbose=False なら結果を表示しない
+    戻り値: {'inserted': 件数, 'updated': 件数, 'unchanged': 件数, 'seconds': 秒}
+    """
+    names = [key, *columns, 'content_hash']
+    sql = (f"INSERT INTO `{table}` ({', '.join(f'`{name}`' for name in names)})"
+           f" VALUES ({', '.join(['%s'] * len(names))})"
+           f" ON DUPLICATE KEY UPDATE {', '.join(f'`{name}` = VALUES(`{name}`)' for name in names[1:])}")
+    stats = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+    _driver(connection).autocommit(False)
+    start = time.perf_counter()
+    records = iter(records)
+    try:
+        with connection.cursor() as cursor:
+            while True:
+                batch = list(itertools.islice(records, batch_size))
+                if not batch:
+                    break
+                # 同じ店が2回あれば後のほうを使う
+                rows = {record[key]: [record[key], *_values(record, columns), content_hash(record, columns)]
+                        for record in batch}
+                cursor.execute(
+                    f"SELECT `{key}`, content_hash FROM `{table}` WHERE `{key}` IN ({', '.join(['%s'] * len(rows))})",
+                    list(rows),
+                )
+                stored = dict(cursor.fetchall())
+                changed = []
+                for store, row in rows.items():
+                    if store not in stored:
+                        stats['inserted'] += 1
+                    elif stored[store] != row[-1]:
+                        stats['updated'] += 1
+                    else:
+                        stats['unchanged'] += 1
+                        continue
+                    changed.append(row)
+                if changed:
+                    cursor.executemany(sql, changed)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    stats['seconds'] = time.perf_counter() - start
+    if verbose:
+        print(f"MySQL同期完了: 追加 {stats['inserted']:,} 件 / 更新 {stats['updated']:,} 件"
+              f" / 変更なし {stats['unchanged']:,} 件（{stats['seconds']:.1f} 秒）")
+    return stats
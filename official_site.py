@@ -0,0 +1,136 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urljoin, urlsplit
+
+import http_client
+import politeness
+
+
+# 公式サイトへのリンクの文言（先にあるものを優先。以前の get_official_url の XPath と同じ順番）
+LINK_KEYWORDS = ('ホームページ', 'オフィシャル', '公式', 'HP', 'WEB', 'ウェブサイト')
+# リダイレクト用URLで遷移先を持つクエリパラメータ（url.asp?url=... など）
+REDIRECT_PARAMS = ('url', 'u', 'to', 'link', 'redirect')
+# ぐるなびのリダイレクト用URL（遷移先がクエリにないものだけHEADでたどる）
+REDIRECT_MARKERS = ('url.asp', '/link', 'redirect')
+MAX_HOPS = 5
+LOOKUP_TIMEOUT = 5
+MAX_LOOKUPS = 4
+
+# ページ内のリンクを (href, テキスト) でまとめて受け取る（hrefは絶対URLになる）
+ANCHORS_JS = "return Array.from(document.querySelectorAll('a[href]'), a => [a.href, a.textContent.trim()]);"
+
+
+def is_external(url):
+    """ぐるなび以外の http(s) のURLならTrue"""
+    return url.startswith('http') and 'gnavi.co.jp' not in (urlsplit(url).hostname or '')
+
+
+def decode_redirect(href):
+    """url.asp?url=... のようなリダイレクト用URLから遷移先を取り出す（なければ ''）"""
+    params = parse_qs(urlsplit(href).query)
+    for key in REDIRECT_PARAMS:
+        for value in params.get(key, ()):
+            if is_external(value):
+                return value
+    return ''
+
+
+def candidates(anchors):
+    """(href, テキスト) のリストから公式サイトへのリンクの候補を優先順に返す"""
+    ordered = []
+    for keyword in LINK_KEYWORDS:
+        ordered.extend(href for href, text in anchors if keyword in (text or ''))
+    ordered.extend(href for href, _ in anchors if 'url.asp' in href)
+    return list(dict.fromkeys(href for href in ordered if href))
+
+
+class OfficialURLResolver:
+    """店舗ページのリンクから公式サイトのURLを求める（クリックしない）
+
+    候補のhrefのうち、外部URLやクエリに遷移先があるリダイレクトはその場で決める。
+    それ以外のぐるなびのリダイレクト用URLだけを HEAD で並行にたどり、結果はURLごとにキャッシュする
+    （同じURLを同時にたどるときは実行中のものを共有）。
+    HEAD の前には毎回 scheduler（既定は politeness の共有スケジューラ）で待つので、
+    ぐるなびのホストへのアクセス間隔・Crawl-delay は店舗ページの取得と同じく守られる。
+    """
+
+    def __init__(self, session=None, timeout=LOOKUP_TIMEOUT, max_workers=MAX_LOOKUPS, scheduler=None):
+        self.session = session or http_client.create_session(pool_size=max_workers)
+        self.scheduler = scheduler or politeness.default_scheduler()
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='official-url')
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, anchors):
+        """(href, テキスト) のリストから公式URLを返す（見つからなければ ''）"""
+        redirects = []
+        for href in candidates(anchors):
+            if is_external(href):
+                return href
+            decoded = decode_redirect(href)
+            if decoded:
+                return decoded
+            if any(marker in href for marker in REDIRECT_MARKERS):
+                redirects.append(href)
+
+        futures = [self.follow(href) for href in redirects]
+        for future in futures:
+            url = future.result()
+            if url:
+                return url
+        return ''
+
+    def follow(self, url):
+        """リダイレクト用URLの遷移先を調べる Future を返す（外部URLにたどり着かなければ ''）"""
+        with self._lock:
+            future = self._cache.get(url)
+            if future is None:
+                future = self._executor.submit(self._follow, url)
+                self._cache[url] = future
+        return future
+
+    def _follow(self, url):
+        # 外部サイトへ向かう Location が出たところで止める（公式サイト自体にはアクセスしない）
+        for _ in range(MAX_HOPS):
+            try:
+                self.scheduler.wait(url)
+                response = self.session.head(url, allow_redirects=False, timeout=self.timeout)
+                if response.status_code in (405, 501):
+                    self.scheduler.wait(url)
+                    response = self.session.get(url, allow_redirects=False, timeout=self.timeout, stream=True)
+                    response.close()
+                self.scheduler.observe(url, response)
+            except Exception:
+                return ''
+            location = response.headers.get('Location')
+            if not location:
+                return ''
+            url = urljoin(url, location)
+            if is_external(url):
+                return url
+            decoded = decode_redirect(url)
+            if decoded:
+                return decoded
+        return ''
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+_default_resolver = None
+_default_lock = threading.Lock()
+
+
+def default_resolver():
+    """プロセス内で共有する OfficialURLResolver（ドライバープールの各スレッドから使う）"""
+    global _default_resolver
+    with _default_lock:
+        if _default_resolver is None:
+            _default_resolver = OfficialURLResolver()
+        return _default_resolver
+
+
+def get_official_url(driver):
+    """Selenium のページから公式URLを求める（リンクをクリックせず、hrefを1回で読んで判定）"""
+    return default_resolver().resolve(driver.execute_script(ANCHORS_JS))
@@ -0,0 +1,142 @@
+import re
+from functools import lru_cache
+
+import html_parser
+
+
+# 「お問い合わせ」などの見出しを持つ要素（その親要素のテキストにメールアドレスがあることが多い）
+CONTACT_LABEL_PATTERN = re.compile(r'[Ee]-?mail|メール|お問い合わせ')
+_CONTACT_TAGS = {'div', 'p', 'span'}
+_HEADING_TAGS = {'h1', 'h2'}
+
+# scan() で使える単純なセレクタ: tag / .class / [attr] / [attr="v"] / [attr*="v"] / [attr^="v"] / [attr$="v"]
+_SELECTOR_PATTERN = re.compile(r'^(?:([a-zA-Z][\w-]*)|\.([\w-]+)|\[([\w-]+)(?:([*^$]?=)"([^"]*)")?\])$')
+
+
+@lru_cache(maxsize=None)
+def compile_selector(selector):
+    """単純なCSSセレクタを (タグ名, 属性) -> bool の関数にする"""
+    match = _SELECTOR_PATTERN.match(selector.strip())
+    if not match:
+        raise ValueError(f"scan() で使えないセレクタです: {selector}")
+    tag, class_name, key, operator, value = match.groups()
+
+    if tag:
+        return lambda name, attrs: name == tag
+    if class_name:
+        return lambda name, attrs: class_name in attrs.get('class', ())
+
+    def predicate(name, attrs):
+        actual = attrs.get(key)
+        if actual is None:
+            return False
+        if isinstance(actual, list):
+            actual = ' '.join(actual)
+        if operator is None:
+            return True
+        if operator == '=':
+            return actual == value
+        if operator == '*=':
+            return value in actual
+        if operator == '^=':
+            return actual.startswith(value)
+        return actual.endswith(value)
+    return predicate
+
+
+class PageScan:
+    """scan() が1回の走査で集めたページの情報
+
+    text:          ページ全体の表示テキスト（soup.get_text() と同じ）
+    headings:      {'h1': [...], 'h2': [...]} 見出しのテキスト（strip済み）
+    anchors:       href を持つ <a> の (href, テキスト) のリスト
+    mailtos:       mailto: リンクの href のリスト
+    contact_texts: 「お問い合わせ」などのラベルを持つ要素の、親要素のテキスト
+    selected:      {セレクタ: 最初に一致した要素のテキスト}
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.headings = {tag: [] for tag in _HEADING_TAGS}
+        self.anchors = []
+        self.mailtos = []
+        self.contact_texts = []
+        self.selected = {}
+
+
+class _Frame:
+    """走査中の開いている要素"""
+    __slots__ = ('name', 'attrs', 'start', 'children', 'string', 'selectors', 'contact')
+
+    def __init__(self, name, attrs, start):
+        self.name = name
+        self.attrs = attrs
+        self.start = start  # この要素のテキストが始まる位置（pieces のインデックス）
+        self.children = 0
+        self.string = None  # 子が1つだけのときの .string 相当
+        self.selectors = None
+        self.contact = False
+
+
+def scan(markup, selectors=(), backend=None):
+    """HTML（またはパース済みのsoup）を1回だけ走査して PageScan を返す
+
+    selectors: テキストを取りたいセレクタ（先頭から優先。各セレクタの最初の一致だけ）
+    """
+    soup = html_parser.make_soup(markup, backend) if isinstance(markup, (str, bytes)) else markup
+    result = PageScan()
+    predicates = [(selector, compile_selector(selector)) for selector in selectors]
+    pieces = []
+
+    def text_of(frame, strip):
+        strings = pieces[frame.start:]
+        if strip:
+            return ''.join(string.strip() for string in strings)
+        return ''.join(strings)
+
+    root = _Frame(None, {}, 0)
+    stack = [root]
+    for event in html_parser.walk(soup):
+        kind = event[0]
+        if kind == 'text':
+            parent = stack[-1]
+            parent.children += 1
+            parent.string = event[1]
+            pieces.append(event[1])
+        elif kind == 'start':
+            _, name, attrs = event
+            stack[-1].children += 1
+            frame = _Frame(name, attrs, len(pieces))
+            for selector, predicate in predicates:
+                if selector not in result.selected and predicate(name, attrs):
+                    result.selected[selector] = None  # 要素の終わりでテキストを入れる
+                    frame.selectors = (frame.selectors or []) + [selector]
+            stack.append(frame)
+        else:
+            frame = stack.pop()
+            parent = stack[-1]
+            if frame.children != 1:
+                frame.string = None
+            parent.string = frame.string
+
+            name = frame.name
+            if name in _HEADING_TAGS:
+                result.headings[name].append(text_of(frame, strip=True))
+            elif name == 'a' and frame.attrs.get('href') is not None:
+                href = frame.attrs['href']
+                result.anchors.append((href, text_of(frame, strip=True)))
+                if 'mailto:' in href:
+                    result.mailtos.append(href)
+            if name in _CONTACT_TAGS and frame.string is not None and CONTACT_LABEL_PATTERN.search(frame.string):
+                parent.contact = True
+            if frame.selectors:
+                text = text_of(frame, strip=True)
+                for selector in frame.selectors:
+                    result.selected[selector] = text
+            if frame.contact:
+                result.contact_texts.append(text_of(frame, strip=False))
+
+    result.text = ''.join(pieces)
+    if root.contact:
+        result.contact_texts.append(result.text)
+    return result
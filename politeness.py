@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import http_cache
+import http_client
+
+
+HOST_INTERVAL = 3  # 同一ホストへのアクセス間隔の下限（秒）。robots.txt の Crawl-delay が長ければそちらに従う
+MAX_BACKOFF = 60  # 429/503 で広げるアクセス間隔の上限（秒）
+BACKOFF_STATUSES = (429, 503)
+ROBOTS_TIMEOUT = 10
+
+
+def parse_retry_after(value):
+    """Retry-After ヘッダー（秒数またはHTTP日付）を待つ秒数にする（読めなければNone）"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _Host:
+    """ホストごとのスケジュール"""
+    __slots__ = ('base', 'interval', 'next_start')
+
+    def __init__(self, base):
+        self.base = base  # robots.txt と設定から決めたアクセス間隔
+        self.interval = base  # 429/503 を受けて広げた現在の間隔
+        self.next_start = 0.0  # 次のリクエストを開始してよい時刻（time.monotonic）
+
+
+class PolitenessScheduler:
+    """ホストごとのアクセス間隔をリクエストの開始時刻で管理する
+
+    間隔は max(interval, robots.txt の Crawl-delay / Request-rate)。robots.txt はホストごとに1回だけ取得する
+    （session に http_cache が入っていれば次回の実行でもキャッシュから読む）。
+    429/503（urllib3 が再試行したものを含む）を受けたら間隔を倍にし、Retry-After があればその時刻まで待つ。
+    成功が続けば元の間隔まで半分ずつ戻す。
+    """
+
+    def __init__(self, session=None, interval=HOST_INTERVAL, max_backoff=MAX_BACKOFF):
+        self.session = session or http_client.create_session(cache_path=http_cache.CACHE_PATH)
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._robots_lock = threading.Lock()
+
+    def _robots_interval(self, scheme, host):
+        """robots.txt から求めたアクセス間隔（取得できなければ0）"""
+        parser = RobotFileParser()
+        try:
+            response = self.session.get(f"{scheme}://{host}/robots.txt", timeout=ROBOTS_TIMEOUT)
+        except Exception:
+            return 0
+        if response.status_code != 200:
+            return 0
+        parser.parse(response.text.splitlines())
+        parser.modified()  # crawl_delay() は取得時刻が無いと None を返す
+
+        agent = self.session.headers.get('User-Agent', '*')
+        delay = parser.crawl_delay(agent) or 0
+        rate = parser.request_rate(agent)
+        if rate and rate.requests:
+            delay = max(delay, rate.seconds / rate.requests)
+        return float(delay)
+
+    def _host(self, url):
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+        state = self._hosts.get(host)
+        if state is None:
+            # robots.txt の取得は同じホストで重ならないように1回だけ
+            with self._robots_lock:
+                state = self._hosts.get(host)
+                if state is None:
+                    delay = self._robots_interval(parts.scheme or 'https', parts.netloc) if host else 0
+                    if delay > self.interval:
+                        print(f"  robots.txt: {host} の Crawl-delay {delay:g} 秒に従います")
+                    state = _Host(max(self.interval, delay))
+                    self._hosts[host] = state
+        return state
+
+    def reserve(self, url):
+        """次にアクセスしてよい開始時刻を予約し、それまでの秒数を返す"""
+        state = self._host(url)
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, state.next_start)
+            state.next_start = start + state.interval
+        return start - now
+
+    def wait(self, url):
+        """同じホストへの前回のリクエスト開始から間隔が空くまで待つ"""
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, url):
+        """wait() の asyncio 版（robots.txt の初回取得だけスレッドで行う）"""
+        host = (urlsplit(url).hostname or '').lower()
+        if host not in self._hosts:
+            await asyncio.to_thread(self._host, url)
+        delay = self.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def observe(self, url, response):
+        """レスポンスを見て、429/503 なら間隔を広げ、成功なら元に戻していく"""
+        if getattr(response, 'from_cache', False):
+            return
+        state = self._host(url)
+        throttled = response.status_code in BACKOFF_STATUSES
+        with self._lock:
+            if throttled:
+                state.interval = min(max(state.interval * 2, 1.0), self.max_backoff)
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after:
+                    state.next_start = max(state.next_start, time.monotonic() + retry_after)
+                print(f"  ⚠ アクセス制限を受けました: {urlsplit(url).hostname} への間隔を {state.interval:g} 秒に広げます")
+            elif state.interval > state.base:
+                state.interval = max(state.base, state.interval / 2)
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler():
+    """プロセス内で共有するスケジューラ（asyncioを使わないスクリプト用）"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = PolitenessScheduler()
+        return _default_scheduler
+
+
+def wait(url):
+    """default_scheduler() でアクセス間隔を待つ（time.sleep(3) の置き換え）"""
+    default_scheduler().wait(url)
+
+
+def observe(url, response):
+    """default_scheduler() にレスポンスを知らせる"""
+    default_scheduler().observe(url, response)
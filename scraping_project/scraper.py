@@ -1,11 +1,21 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
+import asyncio
+import functools
+import os
+import sys
 import pandas as pd
 import re
-import time
-import ssl
-import socket
-from urllib.parse import urljoin
+
+# 共通モジュール（リポジトリ直下）を読み込めるようにする
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import address_engine
+import crawl_engine
+import csv_sink
+import dedup_index
+import gnavi_json
+import html_parser
+import page_scan
+import tls_probe
 
 # ユーザーエージェントの設定
 HEADERS = {
@@ -14,108 +24,46 @@ HEADERS = {
     'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
 }
 
-def check_ssl(url):
-    """URLのSSL証明書の有無をチェック"""
-    if not url or url == '':
-        return False
-    
-    try:
-        if url.startswith('https://'):
-            hostname = url.split('//')[1].split('/')[0].split(':')[0]
-            context = ssl.create_default_context()
-            with socket.create_connection((hostname, 443), timeout=5) as sock:
-                with context.wrap_socket(sock, server_hostname=hostname) as ssock:
-                    return True
-        return False
-    except Exception:
-        return False
+JOURNAL_PATH = 'scraper.journal.sqlite'  # 中断したクロールを --resume で再開するためのジャーナル
 
-def split_address(full_address):
-    """住所を都道府県、市区町村、番地、建物名に分割"""
-    prefecture = ''
-    city = ''
-    street = ''
-    building = ''
-    
-    if not full_address:
-        return prefecture, city, street, building
-    
-    # 空白文字を削除
-    full_address = re.sub(r'\s+', '', full_address)
-    
-    # 都道府県の抽出
-    pref_pattern = r'^(北海道|青森県|岩手県|宮城県|秋田県|山形県|福島県|茨城県|栃木県|群馬県|埼玉県|千葉県|東京都|神奈川県|新潟県|富山県|石川県|福井県|山梨県|長野県|岐阜県|静岡県|愛知県|三重県|滋賀県|京都府|大阪府|兵庫県|奈良県|和歌山県|鳥取県|島根県|岡山県|広島県|山口県|徳島県|香川県|愛媛県|高知県|福岡県|佐賀県|長崎県|熊本県|大分県|宮崎県|鹿児島県|沖縄県)'
-    pref_match = re.match(pref_pattern, full_address)
-    
-    if pref_match:
-        prefecture = pref_match.group(1)
-        remaining = full_address[len(prefecture):]
-    else:
-        remaining = full_address
-    
-    # 市区町村の抽出
-    city_pattern = r'^(.+?[市区町村]|.+?郡.+?[町村])'
-    city_match = re.match(city_pattern, remaining)
-    
-    if city_match:
-        city = city_match.group(1)
-        remaining = remaining[len(city):]
-    
-    # 建物名の抽出
-    building_pattern = r'([ぁ-んァ-ヶー一-龠a-zA-Z]+(?:ビル|タワー|ハイツ|マンション|アパート|ビルディング|プラザ|センター|BLDG|Bldg|GATE)[^0-9]*[0-9]*[階F号]?.*?)$'
-    building_match = re.search(building_pattern, remaining)
-    
-    if building_match:
-        building = building_match.group(1)
-        street = remaining[:building_match.start()]
-    else:
-        street = remaining
-    
-    return prefecture, city, street, building
-
-def extract_email(soup):
-    """ページからメールアドレスを抽出"""
-    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    text = soup.get_text()
-    emails = re.findall(email_pattern, text)
-    return emails[0] if emails else ''
-
-def scrape_restaurant_detail(restaurant_url, session):
-    """個別店舗ページから詳細情報を取得"""
-    time.sleep(3)  # アイドリングタイム
-    
-    print(f"  アクセス中...")
+def parse_restaurant_detail(html):
+    """店舗ページのHTMLから詳細情報を抽出（SSLは呼び出し側でチェック）"""
+    # 埋め込みJSON（__NEXT_DATA__ / JSON-LD）があればDOMを作らずに抽出
+    fields = gnavi_json.extract_store(html)
+    if fields and fields['店舗名'] and fields['住所']:
+        print(f"  店舗名: {fields['店舗名']} (JSON)")
+        print(f"  電話番号: {fields['電話番号']}")
+        print(f"  住所: {fields['住所']}")
+        return gnavi_json.to_record(fields, address_engine.split_address)
     
     try:
-        response = session.get(restaurant_url, headers=HEADERS, timeout=15)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
+        name_selectors = [
+            'h1',
+            '[class*="restaurant"]',
+            '[class*="shop"]',
+            '[class*="store"]',
+            'h2'
+        ]
+        # 見出し・リンク・本文テキストなどを1回の走査でまとめて集める
+        page = page_scan.scan(html, name_selectors)
         
         # デバッグ用：ページのテキスト全体を取得
-        page_text = soup.get_text()
+        page_text = page.text
         
         # 店舗名の取得（複数のパターンを試行）
         name = ''
         
         # パターン1: h1タグから
-        h1_tags = soup.find_all('h1')
+        h1_tags = page.headings['h1']
         if h1_tags:
-            name = h1_tags[0].get_text(strip=True)
+            name = h1_tags[0]
             print(f"  店舗名: {name}")
         
         # パターン2: より多くのセレクタを試行
         if not name:
-            name_selectors = [
-                'h1',
-                '[class*="restaurant"]',
-                '[class*="shop"]',
-                '[class*="store"]',
-                'h2'
-            ]
             for selector in name_selectors:
-                elem = soup.select_one(selector)
-                if elem:
-                    name = elem.get_text(strip=True)
+                name = page.selected.get(selector)
+                if name is not None:
                     if len(name) > 3:  # 3文字以上なら店舗名として採用
                         print(f"  店舗名 (セレクタ: {selector}): {name}")
                         break
@@ -143,7 +91,7 @@ def scrape_restaurant_detail(restaurant_url, session):
             print(f"  住所: {full_address}")
         
         # 住所を分割
-        prefecture, city, street, building = split_address(full_address)
+        prefecture, city, street, building = address_engine.split_address(full_address)
         print(f"  → 都道府県: {prefecture}")
         print(f"  → 市区町村: {city}")
         print(f"  → 番地: {street}")
@@ -153,9 +101,9 @@ def scrape_restaurant_detail(restaurant_url, session):
         email = ''
         
         # パターン1: mailtoリンクから
-        mailto_links = soup.find_all('a', href=re.compile(r'mailto:'))
+        mailto_links = page.mailtos
         if mailto_links:
-            email = mailto_links[0].get('href').replace('mailto:', '').strip()
+            email = mailto_links[0].replace('mailto:', '').strip()
             print(f"  メール: {email}")
         
         # パターン2: テキストから正規表現で検索
@@ -174,25 +122,19 @@ def scrape_restaurant_detail(restaurant_url, session):
         
         # パターン3: 「お問い合わせ」セクションから探す
         if not email:
-            contact_sections = soup.find_all(['div', 'p', 'span'], text=re.compile(r'[Ee]-?mail|メール|お問い合わせ'))
-            for section in contact_sections:
-                parent = section.find_parent()
-                if parent:
-                    parent_text = parent.get_text()
-                    email_matches = re.findall(email_pattern, parent_text)
-                    if email_matches:
-                        email = email_matches[0]
-                        print(f"  メール: {email}")
-                        break
+            for parent_text in page.contact_texts:
+                email_matches = re.findall(email_pattern, parent_text)
+                if email_matches:
+                    email = email_matches[0]
+                    print(f"  メール: {email}")
+                    break
         
         # URL（オフィシャルページ）
         official_url = ''
         # 「ホームページ」「公式サイト」などのリンクを探す
         url_keywords = ['ホームページ', '公式', 'オフィシャル', 'HP', 'WEB', 'ウェブサイト', 'Website']
         
-        for link in soup.find_all('a', href=True):
-            link_text = link.get_text(strip=True)
-            link_href = link.get('href', '')
+        for link_href, link_text in page.anchors:
             
             # キーワードを含むリンクを探す
             if any(keyword in link_text for keyword in url_keywords):
@@ -212,9 +154,6 @@ def scrape_restaurant_detail(restaurant_url, session):
                         print(f"  公式URL: {official_url}")
                         break
         
-        # SSL
-        has_ssl = check_ssl(official_url)
-        
         return {
             '店舗名': name,
             '電話番号': tel,
@@ -224,117 +163,90 @@ def scrape_restaurant_detail(restaurant_url, session):
             '番地': street,
             '建物名': building,
             'URL': official_url,
-            'SSL': has_ssl
+            'SSL': False
         }
     
     except Exception as e:
         print(f"  ✗ エラー: {e}")
         return None
 
-def scrape_restaurant_list(base_search_url, max_records=50):
-    """レストラン一覧ページから店舗URLを取得してスクレイピング"""
-    session = requests.Session()
-    restaurants_data = []
-    visited_urls = set()  # 重複チェック用
+def extract_restaurant_links(html):
+    """一覧ページのHTMLから店舗ページへのリンクを抽出"""
+    # ItemList(JSON-LD)があればDOMを作らずに取得
+    restaurant_links = gnavi_json.listing_links(html)
+    if restaurant_links:
+        return restaurant_links
     
-    page = 1
-    max_pages = 10
+    soup = html_parser.make_soup(html)
     
-    while len(restaurants_data) < max_records and page <= max_pages:
-        print(f"\n{'='*60}")
-        print(f"ページ {page} (取得済み: {len(restaurants_data)}/{max_records})")
-        print('='*60)
-        
-        time.sleep(3)  # アイドリングタイム
-        
-        # ページURLの構築
-        if page == 1:
-            list_url = base_search_url
-        else:
-            if '?' in base_search_url:
-                list_url = f"{base_search_url}&p={page}"
-            else:
-                list_url = f"{base_search_url}?p={page}"
-        
-        print(f"アクセス: {list_url}")
-        
-        try:
-            response = session.get(list_url, headers=HEADERS, timeout=15)
-            response.encoding = 'utf-8'
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 全てのリンクから店舗ページを抽出
-            all_links = soup.find_all('a', href=True)
-            restaurant_links = []
-            
-            for link in all_links:
-                href = link.get('href', '')
-                # /restaurant/ を含むリンクを店舗ページとみなす
-                if '/restaurant/' in href or 'r.gnavi.co.jp' in href:
-                    restaurant_links.append(link)
-            
-            print(f"発見: {len(restaurant_links)} 件のリンク")
-            
-            if not restaurant_links:
-                print("リンクが見つかりません")
-                break
-            
-            # 各店舗をスクレイピング
-            for idx, link in enumerate(restaurant_links):
-                if len(restaurants_data) >= max_records:
-                    break
-                
-                restaurant_url = link.get('href')
-                
-                # 相対URLを絶対URLに変換
-                if restaurant_url and not restaurant_url.startswith('http'):
-                    restaurant_url = urljoin('https://r.gnavi.co.jp', restaurant_url)
-                
-                # 有効なURLかチェック
-                if not restaurant_url or 'gnavi.co.jp' not in restaurant_url:
-                    continue
-                
-                # 重複チェック
-                if restaurant_url in visited_urls:
-                    print(f"  ⊘ スキップ（重複）: {restaurant_url}")
-                    continue
-                
-                visited_urls.add(restaurant_url)
-                
-                print(f"\n[{len(restaurants_data)+1}/{max_records}] {restaurant_url}")
-                
-                restaurant_data = scrape_restaurant_detail(restaurant_url, session)
-                
-                if restaurant_data and restaurant_data['店舗名']:
-                    # 必須項目のチェック（市区町村と番地が必須）
-                    if not restaurant_data['市区町村'] or not restaurant_data['番地']:
-                        print(f"  ⊘ スキップ（住所情報不足）: 市区町村={restaurant_data['市区町村']}, 番地={restaurant_data['番地']}")
-                        continue
-                    
-                    # 店舗名での重複チェックも追加
-                    duplicate = False
-                    for existing in restaurants_data:
-                        if existing['店舗名'] == restaurant_data['店舗名']:
-                            duplicate = True
-                            print(f"  ⊘ スキップ（店舗名重複）: {restaurant_data['店舗名']}")
-                            break
-                    
-                    if not duplicate:
-                        restaurants_data.append(restaurant_data)
-                        print(f"  ✓ 取得成功！")
-                else:
-                    print(f"  ✗ 取得失敗")
-            
-            page += 1
-            
-        except Exception as e:
-            print(f"✗ エラー: {e}")
-            break
+    # 全てのリンクから店舗ページを抽出
+    restaurant_links = []
+    for link in soup.find_all('a', href=True):
+        href = link.get('href', '')
+        # /restaurant/ を含むリンクを店舗ページとみなす
+        if '/restaurant/' in href or 'r.gnavi.co.jp' in href:
+            restaurant_links.append(href)
+    
+    return restaurant_links
+
+def accept_restaurant(restaurant_data, restaurants_data, dedup):
+    """取得結果を採用するかどうか（必須項目と、dedup_index での重複・類似をチェック）"""
+    if not restaurant_data or not restaurant_data['店舗名']:
+        print(f"  ✗ 取得失敗")
+        return False
+    
+    # 必須項目のチェック（市区町村と番地が必須）
+    if not restaurant_data['市区町村'] or not restaurant_data['番地']:
+        print(f"  ⊘ スキップ（住所情報不足）: 市区町村={restaurant_data['市区町村']}, 番地={restaurant_data['番地']}")
+        return False
+    
+    # 重複・類似チェック（索引を引くだけなので件数が増えても遅くならない）
+    match = dedup.find(restaurant_data)
+    if match:
+        reason = '重複' if match.kind == 'exact' else f"類似 {match.similarity:.0%}"
+        print(f"  ⊘ スキップ（{reason}）: {restaurant_data['店舗名']} ≒ {match.name}")
+        return False
     
-    return restaurants_data
+    print(f"  ✓ 取得成功！")
+    return True
+
+def scrape_restaurant_list(base_search_url, max_records=50, resume=False, on_record=None, dedup_path=':memory:'):
+    """レストラン一覧ページから店舗URLを取得してスクレイピング（asyncioで並行取得）
+
+    on_record(record): 採用したレコードをその都度受け取る（CSVへの追記用）
+    dedup_path: 重複チェックの索引（ファイルを指定すると、過去の実行で取得した店舗も重複として除く）
+    """
+    dedup = dedup_index.DedupIndex(dedup_path)
+
+    def record(restaurant_data):
+        # 再開時にジャーナルから戻したレコードもここを通るので、索引に入れ直される
+        dedup.add(restaurant_data)
+        if on_record:
+            on_record(restaurant_data)
+
+    try:
+        return asyncio.run(crawl_engine.crawl(
+            base_search_url,
+            parse_listing=extract_restaurant_links,
+            parse_detail=parse_restaurant_detail,
+            accept=functools.partial(accept_restaurant, dedup=dedup),
+            ssl_probe=tls_probe.default_probe(),
+            headers=HEADERS,
+            max_records=max_records,
+            journal_path=JOURNAL_PATH,
+            resume=resume,
+            on_record=record,
+        ))
+    finally:
+        dedup.close()
 
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--resume', action='store_true', help='前回中断したところから再開')
+    parser.add_argument('--dedup-index', default=':memory:', help='実行をまたいで重複を除くための索引ファイル')
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("ぐるなび Webスクレイピングツール (課題1-1 改善版)")
     print("=" * 60)
@@ -346,35 +258,20 @@ def main():
     print(f"目標: 50件")
     print("\n開始...")
     
-    # スクレイピング実行
-    restaurants_data = scrape_restaurant_list(search_url, max_records=50)
+    # スクレイピング実行（採用した店舗はその都度CSVに追記する）
+    with csv_sink.CSVSink('1-1.csv') as sink:
+        restaurants_data = scrape_restaurant_list(search_url, max_records=50, resume=args.resume,
+                                                  on_record=sink.write, dedup_path=args.dedup_index)
     
     # 結果
     print("\n" + "=" * 60)
     print(f"完了！取得: {len(restaurants_data)} 件")
     print("=" * 60)
     
-    if restaurants_data:
-        # DataFrameに変換
-        df = pd.DataFrame(restaurants_data)
-        
-        # カラムの順序
-        columns_order = ['店舗名', '電話番号', 'メールアドレス', '都道府県', '市区町村', '番地', '建物名', 'URL', 'SSL']
-        df = df[columns_order]
-        
-        # CSV出力
-        output_file = '1-1.csv'
-        df.to_csv(output_file, index=False, encoding='utf-8-sig')
-        
-        print(f"\n✓ 保存: {output_file}")
+    if sink.rows:
+        print(f"\n{sink.summary()}")
         print("\nサンプル:")
-        print(df.head(3).to_string())
-        
-        # 取得できたデータの統計
-        print(f"\n統計:")
-        print(f"  店舗名あり: {df['店舗名'].notna().sum()} 件")
-        print(f"  電話番号あり: {df['電話番号'].notna().sum()} 件")
-        print(f"  都道府県あり: {df['都道府県'].notna().sum()} 件")
+        print(pd.DataFrame(sink.sample).to_string())
     else:
         print("\n✗ データなし")
 
@@ -0,0 +1,156 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+WAIT_TIMEOUT = 15  # どの待機もこれ以上は待たない（以前の固定sleepの最長は10秒）
+QUIET_PERIOD = 0.5  # DOMの変更・通信がこの秒数なければ落ち着いたとみなす
+POLL_INTERVAL = 0.1
+IDLE_TIMEOUT = 3  # page_ready: DOMが落ち着いてから通信の終わりをこの秒数まで待つ（ポーリングし続けるページは通信が途切れない）
+SCROLL_TIMEOUT = 2  # スクロール後、ページが伸びるのをこの秒数まで待つ
+SCROLL_ROUNDS = 10
+HISTOGRAM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, WAIT_TIMEOUT)
+
+# 最後にDOMが変わってからの経過ミリ秒（初回は MutationObserver を仕掛ける）
+_DOM_QUIET_JS = """
+if (window.__lastMutation === undefined) {
+    window.__lastMutation = performance.now();
+    new MutationObserver(() => { window.__lastMutation = performance.now(); })
+        .observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+return performance.now() - window.__lastMutation;
+"""
+
+# 最後の通信が終わってからの経過ミリ秒（読み込み中なら -1）
+_NETWORK_QUIET_JS = """
+if (document.readyState !== 'complete') return -1;
+if (window.__resourceBuffer === undefined) {
+    window.__resourceBuffer = true;
+    performance.setResourceTimingBufferSize(10000);
+}
+const last = performance.getEntriesByType('resource').reduce((t, e) => Math.max(t, e.responseEnd), 0);
+return performance.now() - last;
+"""
+
+_SCROLL_HEIGHT_JS = 'return document.body.scrollHeight;'
+
+# page_ready が通信の終わりを待たずに準備完了とした（IDLE_TIMEOUT を過ぎた）ときの戻り値（真として扱われる）
+NETWORK_BUSY = 'network-busy'
+
+
+class WaitStats:
+    """待機ごとの所要時間を種類（label）別に集めてヒストグラムで表示する（スレッド間で共有できる）"""
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        self._samples = defaultdict(list)
+        self._timeouts = defaultdict(int)
+        self._busy = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, label, seconds, timed_out=False, busy=False):
+        with self._lock:
+            self._samples[label].append(seconds)
+            if timed_out:
+                self._timeouts[label] += 1
+            if busy:
+                self._busy[label] += 1
+
+    def report(self):
+        """種類ごとの件数・平均・p50/p90・最大・タイムアウト・通信待ちの打ち切りと、秒数の分布を表示"""
+        with self._lock:
+            samples = {label: sorted(values) for label, values in self._samples.items()}
+            timeouts = dict(self._timeouts)
+            busy = dict(self._busy)
+        if not samples:
+            return
+
+        print("\n待機時間（秒）")
+        for label, values in samples.items():
+            count = len(values)
+            print(f"  {label}: {count} 回 / 合計 {sum(values):.1f} / 平均 {sum(values) / count:.2f}"
+                  f" / p50 {values[count // 2]:.2f} / p90 {values[min(count - 1, count * 9 // 10)]:.2f}"
+                  f" / 最大 {values[-1]:.2f} / タイムアウト {timeouts.get(label, 0)}"
+                  f" / 通信待ち打ち切り {busy.get(label, 0)}")
+            counts = [0] * len(self.buckets)
+            for value in values:
+                counts[min(bisect_left(self.buckets, value), len(self.buckets) - 1)] += 1
+            for bound, bucket_count in zip(self.buckets, counts):
+                print(f"    ≤{bound:<5g} {'█' * round(40 * bucket_count / count):<40} {bucket_count}")
+
+
+stats = WaitStats()
+
+
+def wait_until(driver, label, condition, timeout=WAIT_TIMEOUT):
+    """condition(driver) が真になるまで待ち、かかった時間を stats に記録する
+
+    タイムアウトしても例外にせず None を返す（以前の固定sleepと同じく、待った後はそのまま続ける）
+    condition が NETWORK_BUSY を返したら（page_ready が通信の終わりを待たずに返した）その回数も数える
+    """
+    start = time.perf_counter()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(condition)
+        timed_out = False
+    except TimeoutException:
+        result = None
+        timed_out = True
+    stats.record(label, time.perf_counter() - start, timed_out, busy=result is NETWORK_BUSY)
+    return result
+
+
+def dom_settled(quiet=QUIET_PERIOD):
+    """quiet 秒のあいだDOMが変わっていない"""
+    def condition(driver):
+        return driver.execute_script(_DOM_QUIET_JS) >= quiet * 1000
+    return condition
+
+
+def network_idle(quiet=QUIET_PERIOD):
+    """読み込みが終わり、最後の通信が終わってから quiet 秒たった"""
+    def condition(driver):
+        return driver.execute_script(_NETWORK_QUIET_JS) >= quiet * 1000
+    return condition
+
+
+def page_ready(locator=None, quiet=QUIET_PERIOD, idle_timeout=IDLE_TIMEOUT):
+    """locator の要素があり（指定したとき）、DOMと通信が落ち着いている
+
+    ポーリングし続けるページは通信が落ち着かないので、DOMが落ち着いてから idle_timeout 秒たっても
+    通信が続いていたら NETWORK_BUSY を返して準備完了とする（WAIT_TIMEOUT まで待たない）
+    """
+    settled = dom_settled(quiet)
+    idle = network_idle(quiet)
+    settled_since = None
+
+    def condition(driver):
+        nonlocal settled_since
+        if locator and not driver.find_elements(*locator):
+            return False
+        if not settled(driver):
+            settled_since = None
+            return False
+        if idle(driver):
+            return True
+        if settled_since is None:
+            settled_since = time.monotonic()
+        return NETWORK_BUSY if time.monotonic() - settled_since >= idle_timeout else False
+    return condition
+
+
+def scroll_to_end(driver, label='scroll', max_rounds=SCROLL_ROUNDS, timeout=SCROLL_TIMEOUT):
+    """一番下までスクロールし、ページが伸びなくなるまで繰り返す（無限スクロール用）
+
+    最後の1回は伸びないことを確かめるため timeout 秒待つ（stats ではタイムアウトとして数える）
+    """
+    height = driver.execute_script(_SCROLL_HEIGHT_JS)
+    for _ in range(max_rounds):
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        grown = wait_until(driver, label, lambda d: d.execute_script(_SCROLL_HEIGHT_JS) > height, timeout)
+        if not grown:
+            return
+        height = driver.execute_script(_SCROLL_HEIGHT_JS)
@@ -0,0 +1,150 @@
+import atexit
+import socket
+import sqlite3
+import ssl
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+
+TLS_CACHE_PATH = '.tls_cache.sqlite'
+TLS_CACHE_TTL = 7 * 24 * 60 * 60  # 証明書が確認できたホストはこの秒数だけ再確認しない
+TLS_FAILURE_TTL = 60 * 60  # 失敗（タイムアウト等の一時的なものを含む）は短めに持つ
+PROBE_TIMEOUT = 5
+MAX_PROBES = 16  # 同時に行うハンドシェイクの上限
+
+
+def host_key(url):
+    """URLから (ホスト名, ポート) を返す（httpsでなければNone）"""
+    if not url:
+        return None
+    parts = urlsplit(url)
+    if parts.scheme.lower() != 'https' or not parts.hostname:
+        return None
+    try:
+        port = parts.port or 443
+    except ValueError:
+        return None
+    return parts.hostname.lower(), port
+
+
+class TLSProbe:
+    """公式URLのSSL証明書をホスト単位で確認するサービス
+
+    同じホストへのハンドシェイクは実行中のものを共有して1回だけ行い、スレッドプールで並行実行する。
+    SSLContext は全ホストで共有し、結果はTTL付きでSQLiteに保存して次回の実行でも使う。
+    """
+
+    def __init__(self, path=TLS_CACHE_PATH, ttl=TLS_CACHE_TTL, failure_ttl=TLS_FAILURE_TTL,
+                 timeout=PROBE_TIMEOUT, max_workers=MAX_PROBES):
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.timeout = timeout
+        self.context = ssl.create_default_context()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tls-probe')
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS tls_hosts (host TEXT, port INTEGER, ok INTEGER, checked_at REAL,'
+                ' PRIMARY KEY (host, port))'
+            )
+            self._conn.commit()
+        self.stats = {'cached': 0, 'shared': 0, 'probed': 0}
+
+    def _cached(self, key):
+        if self._conn is None:
+            return None
+        row = self._conn.execute(
+            'SELECT ok, checked_at FROM tls_hosts WHERE host = ? AND port = ?', key
+        ).fetchone()
+        if row is None:
+            return None
+        ok, checked_at = bool(row[0]), row[1]
+        if time.time() - checked_at >= (self.ttl if ok else self.failure_ttl):
+            return None
+        return ok
+
+    def submit(self, url):
+        """URLのホストの確認を開始して Future[bool] を返す（すぐに返り、結果は後から受け取る）"""
+        key = host_key(url)
+        if key is None:
+            return _done(False)
+
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                self.stats['shared'] += 1
+                return future
+            ok = self._cached(key)
+            if ok is not None:
+                self.stats['cached'] += 1
+                return _done(ok)
+            self.stats['probed'] += 1
+            future = self._executor.submit(self._probe, key)
+            self._pending[key] = future
+        return future
+
+    def check(self, url):
+        """URLのSSL証明書の有無をチェック（check_ssl と同じくboolを返す）"""
+        return self.submit(url).result()
+
+    def fill_ssl(self, records):
+        """レコードの URL をまとめて確認し、結果が揃ったら SSL 列に入れる"""
+        futures = [(record, self.submit(record.get('URL'))) for record in records]
+        for record, future in futures:
+            record['SSL'] = future.result()
+        return records
+
+    def _probe(self, key):
+        hostname, port = key
+        try:
+            with socket.create_connection((hostname, port), timeout=self.timeout) as sock:
+                with self.context.wrap_socket(sock, server_hostname=hostname):
+                    ok = True
+        except Exception:
+            ok = False
+
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO tls_hosts VALUES (?, ?, ?, ?)', (hostname, port, ok, time.time())
+                )
+                self._conn.commit()
+            del self._pending[key]
+        return ok
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _done(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+_default_probe = None
+_default_lock = threading.Lock()
+
+
+def default_probe():
+    """プロセス内で共有するTLSProbe（終了時に閉じる）"""
+    global _default_probe
+    with _default_lock:
+        if _default_probe is None:
+            _default_probe = TLSProbe()
+            atexit.register(_default_probe.close)
+        return _default_probe
+
+
+def check_ssl(url):
+    """URLのSSL証明書の有無をチェック（各スクリプトの check_ssl の置き換え）"""
+    return default_probe().check(url)
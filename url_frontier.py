@@ -0,0 +1,173 @@
+import hashlib
+import math
+import re
+import sqlite3
+from urllib.parse import urljoin
+
+
+GNAVI_BASE_URL = 'https://r.gnavi.co.jp'
+STORE_HOST = 'r.gnavi.co.jp'
+INITIAL_CAPACITY = 100_000  # 最初のブルームフィルタに入れる件数（超えたら2倍の容量のフィルタを足す）
+ERROR_RATE = 0.001  # 最初のフィルタの偽陽性率（足すフィルタは半分ずつ厳しくし、全体で 2 * ERROR_RATE 以下）
+GROWTH = 2
+TIGHTENING = 0.5
+
+# 店舗ページ（とその下のページ）のURL。店舗IDは英数字で数字を必ず含む（e454933, gak5831, 130erss50000 など）
+# /plan/<ID>/... や旧形式の /restaurant/<ID>/ も、その次の階層を店舗IDとみなす
+_STORE_URL = re.compile(
+    r'^(?:(?:https?:)?//r\.gnavi\.co\.jp(?::(?:80|443))?)?/'
+    r'(?:(?:plan|restaurant)/)?((?=[a-z]*[0-9])[0-9a-z]{6,16})(?:[/?#]|$)',
+    re.IGNORECASE,
+)
+
+
+def store_id(url, base=GNAVI_BASE_URL):
+    """ぐるなびの店舗ページ（とその下のページ）のURLから店舗IDを返す（店舗ページでなければNone）
+
+    https://r.gnavi.co.jp/e454933/, /e454933/menu/, /plan/e454933/plan-reserve/...,
+    ?sc_lid=... などのクエリ付き、末尾の / なし、相対URL はどれも同じIDになる
+    """
+    if not url:
+        return None
+    url = url.strip()
+    match = _STORE_URL.match(url)
+    if match is None and not url.startswith(('/', 'http:', 'https:')):
+        # "e454933/" のような相対パスは urljoin してから（まれなので遅くてよい）
+        match = _STORE_URL.match(urljoin(base + '/', url))
+    return match.group(1).lower() if match else None
+
+
+def canonical_store_url(url, base=GNAVI_BASE_URL):
+    """店舗ページのURLを https://r.gnavi.co.jp/<ID>/ の形にそろえる（店舗ページでなければNone）"""
+    sid = store_id(url, base)
+    return f"https://{STORE_HOST}/{sid}/" if sid else None
+
+
+class BloomFilter:
+    """容量 capacity 件で偽陽性率が error_rate になるブルームフィルタ（ビット列は bytearray）"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.count = 0
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, key):
+        # ハッシュ2つからk個の位置を作る（Kirsch-Mitzenmacher）
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self._array[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def nbytes(self):
+        return len(self._array)
+
+
+class ScalableBloomFilter:
+    """件数が増えたら容量 growth 倍・偽陽性率 tightening 倍のフィルタを足していくブルームフィルタ"""
+
+    def __init__(self, capacity=INITIAL_CAPACITY, error_rate=ERROR_RATE, growth=GROWTH, tightening=TIGHTENING):
+        self.growth = growth
+        self.tightening = tightening
+        self.filters = [BloomFilter(capacity, error_rate)]
+
+    def add(self, key):
+        last = self.filters[-1]
+        if last.count >= last.capacity:
+            last = BloomFilter(last.capacity * self.growth, last.error_rate * self.tightening)
+            self.filters.append(last)
+        last.add(key)
+
+    def __contains__(self, key):
+        return any(key in bloom for bloom in self.filters)
+
+    def __len__(self):
+        return sum(bloom.count for bloom in self.filters)
+
+    def nbytes(self):
+        return sum(bloom.nbytes() for bloom in self.filters)
+
+
+class URLFrontier:
+    """見つけた店舗URLを店舗IDで重複除去する（同じ店を2回取得しない）
+
+    メモリにはブルームフィルタだけを持ち、正確な店舗IDの一覧は SQLite（ディスク）に置く。
+    フィルタにないIDは新規と確定するのでディスクを読まず、フィルタにあったときだけ
+    SQLite で確かめる（偽陽性で新しい店を取りこぼさない）。
+    path=''（既定）は閉じると消える一時ファイル。パスを指定すれば次の実行でも続きから使える。
+    """
+
+    def __init__(self, path='', capacity=INITIAL_CAPACITY, error_rate=ERROR_RATE):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY) WITHOUT ROWID')
+        self.bloom = ScalableBloomFilter(capacity, error_rate)
+        for (sid,) in self.conn.execute('SELECT id FROM seen'):
+            self.bloom.add(sid.encode())
+        self.stats = {'checked': 0, 'new': 0, 'disk_lookups': 0, 'false_positives': 0}
+
+    def _seen(self, sid):
+        if sid.encode() not in self.bloom:
+            return False
+        self.stats['disk_lookups'] += 1
+        if self.conn.execute('SELECT 1 FROM seen WHERE id = ?', (sid,)).fetchone():
+            return True
+        self.stats['false_positives'] += 1
+        return False
+
+    def __contains__(self, url):
+        sid = store_id(url)
+        return sid is not None and self._seen(sid)
+
+    def add_many(self, urls):
+        """urls のうち初めて見た店舗の正規化URLを順番どおりに返す（店舗ページでないURLは除く）"""
+        added = []
+        new_ids = {}  # この呼び出しで見つけたID（SQLite にはまとめて書く）
+        for url in urls:
+            sid = store_id(url)
+            if sid is None:
+                continue
+            self.stats['checked'] += 1
+            if sid in new_ids or self._seen(sid):
+                continue
+            self.bloom.add(sid.encode())
+            new_ids[sid] = None
+            added.append(f"https://{STORE_HOST}/{sid}/")
+        if new_ids:
+            with self.conn:
+                self.conn.executemany('INSERT OR IGNORE INTO seen VALUES (?)', ((sid,) for sid in new_ids))
+            self.stats['new'] += len(new_ids)
+        return added
+
+    def add(self, url):
+        """初めて見た店舗なら正規化URLを、既に見た店舗・店舗ページでないURLならNoneを返す"""
+        added = self.add_many([url])
+        return added[0] if added else None
+
+    def __len__(self):
+        return len(self.bloom)
+
+    def summary(self):
+        stats = self.stats
+        return (f"URL: {stats['checked']} 件中 新規 {stats['new']} 件 / ディスク照合 {stats['disk_lookups']} 回"
+                f"（偽陽性 {stats['false_positives']}）/ フィルタ {self.bloom.nbytes() / 1024 / 1024:.1f} MB")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()